@@ -0,0 +1,174 @@
+"""
+种子名 → imdbID 的持久别名表（output/aliases.sqlite）。
+
+_do_get_imdb_info 每次成功解析（精确命中、模糊命中、AI 兜底命中）的结论过去在本轮结束后就丢了，
+同一个发布名下次运行、或换个种子名再出现时，又要把整条搜索阶梯走一遍。
+这里把解析结果按两类键记下来：
+  - t:<归一化片名> <年份>   —— 与去重键同口径，换个种子（不同压制组/分辨率）也能命中
+  - r:<种子原名指纹>         —— 原名去掉大小写与标点后的 SHA1 前缀，名字解析规则调整后仍能认出
+并记录是哪一步找到的（exact / fuzzy / ai / torrent），便于排查误命中。
+之后的运行先查别名表，命中就直接走 ?i=（或响应缓存），仍经过与种子自带 ID 相同的相似度校验；
+校验不通过或 ID 已失效的别名当场作废，回退完整搜索。
+
+全部别名在首次使用时一次性读入内存（条目数与历史候选数同量级），写入逐条落盘。
+只依赖标准库（sqlite3），不读取配置。
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+ALIAS_PATH = os.path.join("output", "aliases.sqlite")
+
+# 解析结论来自哪一步
+STAGE_EXACT, STAGE_FUZZY, STAGE_AI, STAGE_TORRENT = "exact", "fuzzy", "ai", "torrent"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    key         TEXT PRIMARY KEY,
+    imdb_id     TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    name        TEXT,
+    hits        INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL NOT NULL
+);
+"""
+
+
+def _title_key(name: str) -> Optional[str]:
+    """"Title Year" → t:<归一化片名> <年份>；没有年份时不建键（无年份的候选本来就不查询）。"""
+    parts = name.rsplit(" ", 1)
+    if len(parts) != 2 or not parts[1].isdigit():
+        return None
+    t = parts[0].lower().strip()
+    t = re.sub(r'\band\b', '&', t)
+    t = re.sub(r"[^\w& ]", ' ', t)
+    t = re.sub(r'\s+', ' ', t).strip()
+    return f"t:{t} {parts[1]}" if t else None
+
+
+def _raw_key(raw_name: Optional[str]) -> Optional[str]:
+    """种子原名指纹：只保留字母数字词，大小写、点号/下划线分隔的差异不影响。"""
+    if not raw_name:
+        return None
+    tokens = re.findall(r"[^\W_]+", raw_name.lower())
+    if not tokens:
+        return None
+    return "r:" + hashlib.sha1(" ".join(tokens).encode("utf-8")).hexdigest()[:16]
+
+
+def keys_for(movie: MovieRecord) -> List[str]:
+    return [k for k in (_title_key(movie.name), _raw_key(movie.raw_name)) if k]
+
+
+class AliasStore:
+    def __init__(self, path: str = ALIAS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._aliases: Optional[Dict[str, Tuple[str, str]]] = None
+        self.hits = self.learned = self.invalidated = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _load(self) -> Dict[str, Tuple[str, str]]:
+        """调用方须持有 _lock。"""
+        if self._aliases is None:
+            self._aliases = {}
+            try:
+                conn = self._connect()
+                try:
+                    for key, imdb_id, stage in conn.execute("SELECT key, imdb_id, stage FROM aliases"):
+                        self._aliases[key] = (imdb_id, stage)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ 读取别名表失败，本轮不使用: {e}")
+        return self._aliases
+
+    def peek(self, movie: MovieRecord) -> Optional[Tuple[str, str]]:
+        """查别名但不计命中（成本预测用）。返回 (imdb_id, stage) 或 None。"""
+        with self._lock:
+            aliases = self._load()
+            for key in keys_for(movie):
+                if key in aliases:
+                    return aliases[key]
+        return None
+
+    def lookup(self, movie: MovieRecord) -> Optional[Tuple[str, str]]:
+        """查询前调用：命中则计数并返回 (imdb_id, stage)。"""
+        hit = self.peek(movie)
+        if hit:
+            with self._lock:
+                self.hits += 1
+            self._write("UPDATE aliases SET hits = hits + 1 WHERE key = ?",
+                        [(k,) for k in keys_for(movie)], many=True)
+        return hit
+
+    def learn(self, movie: MovieRecord, imdb_id: str, stage: str):
+        """记下一次成功解析；各键已指向同一 imdbID 时不重复写。"""
+        now = time.time()
+        with self._lock:
+            aliases = self._load()
+            rows = [(key, imdb_id, stage, movie.name, now)
+                    for key in keys_for(movie) if aliases.get(key, (None,))[0] != imdb_id]
+            for key, *_ in rows:
+                aliases[key] = (imdb_id, stage)
+            if rows:
+                self.learned += 1
+        if rows:
+            self._write(
+                "INSERT INTO aliases (key, imdb_id, stage, name, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET imdb_id = excluded.imdb_id, stage = excluded.stage, "
+                "name = excluded.name, hits = 0, updated_at = excluded.updated_at",
+                rows, many=True,
+            )
+
+    def invalidate(self, movie: MovieRecord, imdb_id: str):
+        """别名指向的 imdbID 未通过相似度校验或已失效：删除本片各键上指向它的别名。"""
+        with self._lock:
+            aliases = self._load()
+            keys = [k for k in keys_for(movie) if aliases.get(k, (None,))[0] == imdb_id]
+            for key in keys:
+                del aliases[key]
+            if keys:
+                self.invalidated += 1
+        if keys:
+            logger.info(f"🔖 别名作废: {movie.name} ↛ {imdb_id}")
+            self._write("DELETE FROM aliases WHERE key = ? AND imdb_id = ?",
+                        [(k, imdb_id) for k in keys], many=True)
+
+    def _write(self, sql: str, params, many: bool = False):
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    if many:
+                        conn.executemany(sql, params)
+                    else:
+                        conn.execute(sql, params)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 写入别名表失败: {e}")
+
+    def log_summary(self):
+        with self._lock:
+            hits, learned, invalidated = self.hits, self.learned, self.invalidated
+            self.hits = self.learned = self.invalidated = 0
+        if hits or learned or invalidated:
+            logger.info(f"🔖 别名表：命中 {hits} 部（跳过搜索），新学习 {learned} 部，作废 {invalidated} 部 → {self.path}")
+
+
+aliases = AliasStore()
@@ -0,0 +1,82 @@
+"""
+阶段间中间产物（JSONL）读写。
+
+每个阶段把结果写到 output/ 下的一个 JSONL 文件，首行是头信息：
+  {"artifact": "<阶段名>", "version": 1, "created": "...", "count": N, ...}
+之后每行一条记录。这样任意阶段都能单独重跑，不必从头抓取。
+
+本模块只依赖标准库，render 等轻量阶段导入它不会拖慢启动。
+"""
+import os
+import json
+import time
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+ARTIFACT_DIR = "output"
+
+# 阶段产物 → 文件名
+ARTIFACT_FILES = {
+    "list":       "stage_list.jsonl",        # fetch-list 输出：候选电影列表
+    "enriched":   "stage_enriched.jsonl",    # enrich 输出：OMDb 详情
+    "translated": "stage_translated.jsonl",  # translate 输出：含中文简介
+}
+
+
+class ArtifactError(Exception):
+    """产物缺失、版本不符或格式损坏。"""
+
+
+def artifact_path(name: str) -> str:
+    return os.path.join(ARTIFACT_DIR, ARTIFACT_FILES[name])
+
+
+def write_artifact(name: str, records: List[dict], **meta) -> str:
+    """
+    原子写入产物：先写临时文件再 os.replace，
+    中途崩溃不会留下半截文件让下一阶段读到。
+    """
+    path = artifact_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = {
+        "artifact": name,
+        "version":  ARTIFACT_VERSION,
+        "created":  time.strftime('%Y-%m-%d %H:%M:%S'),
+        "count":    len(records),
+        **meta,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    logger.info(f"💾 已写入产物 {path}（{len(records)} 条）")
+    return path
+
+
+def read_artifact(name: str) -> Tuple[dict, List[dict]]:
+    """读取产物，返回 (头信息, 记录列表)。缺失或版本不符时抛 ArtifactError。"""
+    path = artifact_path(name)
+    if not os.path.exists(path):
+        raise ArtifactError(f"产物不存在: {path}，请先运行生成它的上游阶段")
+
+    with open(path, encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+            records = [json.loads(line) for line in f if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ArtifactError(f"产物格式损坏: {path} ({e})")
+
+    if header.get("artifact") != name:
+        raise ArtifactError(f"产物类型不符: {path} 是 '{header.get('artifact')}'，期望 '{name}'")
+    if header.get("version") != ARTIFACT_VERSION:
+        raise ArtifactError(
+            f"产物版本不符: {path} 为 v{header.get('version')}，当前程序需要 v{ARTIFACT_VERSION}，请重跑上游阶段"
+        )
+    if header.get("count") != len(records):
+        raise ArtifactError(f"产物不完整: {path} 头信息记录 {header.get('count')} 条，实际 {len(records)} 条")
+    return header, records
@@ -0,0 +1,193 @@
+"""
+HTTP 录制/回放传输层（位于共享 HTTP 客户端之下）。
+
+    ./run.sh --record output/cassettes/run.jsonl.gz            # 正常联网运行，同时录下所有请求/响应
+    ./run.sh --replay output/cassettes/run.jsonl.gz            # 完全离线重放，按原始耗时返回
+    ./run.sh --replay output/cassettes/run.jsonl.gz --replay-latency zero   # 零延迟，只剩 CPU 侧开销
+
+- 所有经 http_client 共享 Session 的请求（OMDb、LLM、列表源）都会被录制；Playwright 浏览器抓取不经过这里
+- 录制内容：方法、URL、请求体哈希、状态码、少量响应头、响应体、耗时，或网络异常类型；
+  URL 中的 apikey / key 等参数与鉴权头不落盘，匹配时同样按脱敏后的 URL 比较
+- 回放按 (方法, 脱敏 URL, 请求体哈希) 匹配，同一请求多次出现时按录制顺序依次返回；
+  找不到记录的请求按连接错误处理（翻译池会自然转到录制时实际使用的提供商）
+- 文件为 gzip 压缩的 JSON Lines
+
+熔断、自适应超时、对冲都在这一层之上，回放时照常生效。只依赖标准库与 requests。
+"""
+import os
+import re
+import gzip
+import json
+import time
+import atexit
+import base64
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+RECORD, REPLAY = "record", "replay"
+
+# 需要脱敏的查询参数（小写比较）
+_SECRET_PARAMS = {"apikey", "api_key", "key", "token", "access_token"}
+# 回放需要的响应头，其余不录（响应体录的是解压后的内容，Content-Encoding 不录）
+_KEPT_HEADERS = ("Content-Type", "Retry-After", "ETag")
+# 异常信息里常带完整 URL，同样要抹掉密钥
+_SECRET_IN_TEXT = re.compile(r"\b((?:apikey|api_key|key|token|access_token)=)[^&\s'\"]+", re.IGNORECASE)
+
+_mode: Optional[str] = None
+_cassette = None
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [(k, "REDACTED" if k.lower() in _SECRET_PARAMS else v)
+             for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _body_hash(body) -> str:
+    if not body:
+        return ""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def _match_key(request: requests.PreparedRequest) -> tuple:
+    return request.method, redact_url(request.url), _body_hash(request.body)
+
+
+class _Recorder:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                logger.info(f"📼 已录制 {self.count} 个 HTTP 交互 → {self.path}")
+
+    def wrap(self, send: Callable) -> Callable:
+        def recording_send(request, **kwargs):
+            method, url, body_hash = _match_key(request)
+            entry = {"m": method, "u": url, "b": body_hash}
+            started = time.monotonic()
+            try:
+                resp = send(request, **kwargs)
+                content = resp.content  # 读完整个响应体；stream=True 的调用方随后从缓存读取
+            except requests.RequestException as e:
+                entry.update(t=round(time.monotonic() - started, 4), e=type(e).__name__,
+                             em=_SECRET_IN_TEXT.sub(r"\1REDACTED", str(e))[:300])
+                self.write(entry)
+                raise
+            entry.update(
+                t=round(time.monotonic() - started, 4),
+                s=resp.status_code,
+                h={k: resp.headers[k] for k in _KEPT_HEADERS if k in resp.headers},
+            )
+            try:
+                entry["c"] = content.decode("utf-8")
+            except UnicodeDecodeError:
+                entry["c64"] = base64.b64encode(content).decode("ascii")
+            self.write(entry)
+            return resp
+        return recording_send
+
+
+class _Player:
+    def __init__(self, path: str, zero_latency: bool):
+        self.path = path
+        self.zero_latency = zero_latency
+        self._entries: Dict[tuple, deque] = defaultdict(deque)
+        self._lock = threading.Lock()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                e = json.loads(line)
+                self._entries[(e["m"], e["u"], e["b"])].append(e)
+        total = sum(len(q) for q in self._entries.values())
+        logger.info(f"📼 回放 {path}：{total} 个 HTTP 交互（{'零延迟' if zero_latency else '原始延迟'}）")
+
+    def close(self):
+        with self._lock:
+            left = sum(len(q) for q in self._entries.values())
+        if left:
+            logger.info(f"📼 回放结束，{left} 个录制的交互未被请求")
+
+    def wrap(self, send: Callable) -> Callable:
+        def replaying_send(request, **kwargs):
+            key = _match_key(request)
+            with self._lock:
+                queue = self._entries.get(key)
+                entry = queue.popleft() if queue else None
+            if entry is None:
+                raise requests.ConnectionError(f"cassette 中没有该请求: {key[0]} {key[1]}", request=request)
+            if not self.zero_latency:
+                time.sleep(entry["t"])
+            if "e" in entry:
+                exc_type = getattr(requests.exceptions, entry["e"], requests.ConnectionError)
+                raise exc_type(entry.get("em", ""), request=request)
+            return self._build_response(request, entry)
+        return replaying_send
+
+    @staticmethod
+    def _build_response(request: requests.PreparedRequest, entry: dict) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = entry["s"]
+        resp.headers = CaseInsensitiveDict(entry.get("h", {}))
+        resp._content = entry["c"].encode("utf-8") if "c" in entry else base64.b64decode(entry["c64"])
+        resp._content_consumed = True
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.reason = ""
+        resp.elapsed = timedelta(seconds=entry["t"])
+        return resp
+
+
+def configure(record: Optional[str] = None, replay: Optional[str] = None, latency: str = "original"):
+    """在创建任何 Session 之前调用；两个参数都为空时不做任何事。"""
+    global _mode, _cassette
+    if record:
+        _mode, _cassette = RECORD, _Recorder(record)
+    elif replay:
+        _mode, _cassette = REPLAY, _Player(replay, zero_latency=(latency == "zero"))
+    else:
+        return
+    atexit.register(_cassette.close)
+
+
+def active() -> bool:
+    """正在录制或回放：调用方据此关闭会让请求序列随历史数据变化的自适应行为。"""
+    return _mode is not None
+
+
+def replaying_without_latency() -> bool:
+    """零延迟回放：调用方据此跳过为礼貌限速而加的 sleep，只留下 CPU 侧开销。"""
+    return _mode == REPLAY and _cassette.zero_latency
+
+
+def wrap_transport(send: Callable) -> Callable:
+    """包装适配器的底层发送函数：录制模式下记录，回放模式下完全替代网络请求。"""
+    return _cassette.wrap(send) if _cassette is not None else send
@@ -0,0 +1,177 @@
+"""
+已补全电影目录的本地导出。
+
+- output/catalog.ndjson：本次运行的最终目录（每行一部，顺序同页面）
+- output/catalog.sqlite：按 imdbID 累积的本地库，每次运行 upsert，
+  保留历次见过的电影及更新时间，供其它工具、预过滤和缓存复用。
+  updated_at 是最近一次写入的时间（电影还在榜上就会刷新）；fetched_at 是评分等数据
+  最近一次真正取自 OMDb 的时间，复用库中数据写回时保持不变。时效判断一律看 fetched_at，
+  否则每周都上榜的电影会一直命中本地库，评分永远停在第一次查询时。
+
+只依赖标准库（json / sqlite3），不读取配置。
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+NDJSON_PATH = os.path.join("output", "catalog.ndjson")
+SQLITE_PATH = os.path.join("output", "catalog.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    imdb_id     TEXT PRIMARY KEY,
+    name        TEXT NOT NULL,
+    year        INTEGER,
+    rating      REAL,
+    metascore   INTEGER,
+    summary_en  TEXT,
+    summary_cn  TEXT,
+    image_url   TEXT,
+    source      TEXT,
+    rank        INTEGER,
+    updated_at  REAL NOT NULL,
+    fetched_at  REAL
+);
+CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies(rating);
+CREATE INDEX IF NOT EXISTS idx_movies_year ON movies(year);
+"""
+
+
+def _to_number(value, cast):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def export_ndjson(records: Iterable[MovieRecord], path: str = NDJSON_PATH) -> int:
+    """原子写出本次目录（临时文件 + os.replace）。"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r.to_dict(), ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def connect(path: str = SQLITE_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    if "fetched_at" not in {row[1] for row in conn.execute("PRAGMA table_info(movies)")}:
+        # 旧库：以 updated_at 作为初值（可能偏新，至多让这些条目晚一个周期重新查询）
+        with conn:
+            conn.execute("ALTER TABLE movies ADD COLUMN fetched_at REAL")
+            conn.execute("UPDATE movies SET fetched_at = updated_at")
+    return conn
+
+
+def export_sqlite(records: Iterable[MovieRecord], path: str = SQLITE_PATH) -> int:
+    """
+    按 imdbID upsert；没有 imdbID 的记录无法可靠去重，不入库。
+    fetched_at 取记录自带的值，记录没有（来源不明）时保留库中原值。
+    """
+    now = time.time()
+    rows = [
+        (
+            r.imdb_id, r.display_name, r.year,
+            _to_number(r.rating, float), _to_number(r.metascore, int),
+            r.summary_en, r.summary_cn, r.image_url, r.source, r.rank, now, r.fetched_at,
+        )
+        for r in records if r.imdb_id
+    ]
+    with connect(path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO movies (imdb_id, name, year, rating, metascore, summary_en, summary_cn,
+                                image_url, source, rank, updated_at, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(imdb_id) DO UPDATE SET
+                name = excluded.name, year = excluded.year, rating = excluded.rating,
+                metascore = excluded.metascore, summary_en = excluded.summary_en,
+                summary_cn = COALESCE(excluded.summary_cn, movies.summary_cn),
+                image_url = excluded.image_url, source = excluded.source,
+                rank = excluded.rank, updated_at = excluded.updated_at,
+                fetched_at = COALESCE(excluded.fetched_at, movies.fetched_at)
+            """,
+            rows,
+        )
+    conn.close()
+    return len(rows)
+
+
+def export_catalog(records: List[MovieRecord]):
+    n_json = export_ndjson(records)
+    n_sql = export_sqlite(records)
+    logger.info(f"📤 目录已导出: {NDJSON_PATH}（{n_json} 部）, {SQLITE_PATH}（upsert {n_sql} 部）")
+
+
+def load_ndjson(path: str = NDJSON_PATH) -> List[MovieRecord]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [MovieRecord.from_dict(json.loads(line)) for line in f if line.strip()]
+
+
+def load_sqlite(path: str = SQLITE_PATH) -> List[MovieRecord]:
+    if not os.path.exists(path):
+        return []
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT imdb_id, name, rating, metascore, summary_en, summary_cn, image_url, source, rank "
+            "FROM movies ORDER BY rank"
+        ).fetchall()
+    finally:
+        conn.close()
+    records = []
+    for imdb_id, name, rating, metascore, summary_en, summary_cn, image_url, source, rank in rows:
+        records.append(MovieRecord(
+            name, source=source or "", rank=rank or 0, imdb_id=imdb_id, official_name=name,
+            rating=f"{rating:.1f}" if rating is not None else "N/A",
+            metascore=str(metascore) if metascore is not None else "N/A",
+            summary_en=summary_en, summary_cn=summary_cn, image_url=image_url,
+        ))
+    return records
+
+
+def lookup(imdb_ids: Iterable[str], max_age_days: Optional[float] = None,
+           path: str = SQLITE_PATH) -> Dict[str, MovieRecord]:
+    """按 imdbID 批量查本地库；max_age_days 限定只要 max_age_days 天内从 OMDb 取得过数据的条目。"""
+    ids = [i for i in set(imdb_ids) if i]
+    if not ids or not os.path.exists(path):
+        return {}
+    min_fetched = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    found: Dict[str, MovieRecord] = {}
+    conn = connect(path)
+    try:
+        # SQLite 默认最多 999 个参数，分块查询
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT imdb_id, name, rating, metascore, summary_en, summary_cn, image_url, fetched_at "
+                f"FROM movies WHERE (? IS NULL OR fetched_at >= ?) "
+                f"AND imdb_id IN ({','.join('?' * len(chunk))})",
+                [min_fetched, min_fetched, *chunk],
+            ).fetchall()
+            for imdb_id, name, rating, metascore, summary_en, summary_cn, image_url, fetched_at in rows:
+                found[imdb_id] = MovieRecord(
+                    name, imdb_id=imdb_id, official_name=name,
+                    rating=f"{rating:.1f}" if rating is not None else "N/A",
+                    metascore=str(metascore) if metascore is not None else "N/A",
+                    summary_en=summary_en, summary_cn=summary_cn, image_url=image_url,
+                    fetched_at=fetched_at,
+                )
+    finally:
+        conn.close()
+    return found
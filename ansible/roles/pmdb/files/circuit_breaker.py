@@ -0,0 +1,167 @@
+"""
+进程级的按主机熔断器 + 重试预算。
+
+urllib3 Retry 与 retry.with_retry 都是"每次调用各自重试"：OMDb 或某个 LLM 提供商宕机时，
+十个工作线程会各自退避重试，整轮运行把时间耗在等一个死掉的主机上，还白白消耗额度。
+这里按主机（hostname）维护共享状态：
+
+熔断器（closed → open → half-open）
+  - 连续失败（连接错误/超时/429/5xx）达到阈值 → open，冷却期内请求直接抛 CircuitOpenError，
+    不发网络请求；调用方据此立即转向缓存、其它提供商或其它来源
+  - 冷却结束 → half-open，只放行一个探测请求：成功则恢复 closed，失败则冷却时间翻倍后重新 open
+
+重试预算
+  - 滑动窗口内的重试次数不得超过 成功请求数 × 比例 + 少量保底
+  - 主机大面积失败时成功数上不去，重试自然被掐断，不会放大流量
+
+所有经共享 Session（http_client）的请求都自动接入；应用层 with_retry 传入 host 后同样受预算约束。
+"""
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 连续失败多少次后熔断
+FAILURE_THRESHOLD = 5
+# 首次熔断冷却时间（秒），half-open 探测失败后翻倍，封顶 _MAX_COOLDOWN
+_BASE_COOLDOWN = 30.0
+_MAX_COOLDOWN = 300.0
+
+# 重试预算：窗口内允许的重试数 = 成功数 × _RETRY_RATIO + _MIN_RETRIES
+_BUDGET_WINDOW = 60.0
+_RETRY_RATIO = 0.2
+_MIN_RETRIES = 5
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """目标主机处于熔断状态，请求未发出。按网络错误处理的调用方无需改动即可降级。"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} 已熔断，{retry_in:.0f} 秒后再探测")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def is_failure_status(status: int) -> bool:
+    """计入熔断的 HTTP 状态：限流与服务端错误（4xx 是调用方问题，不算主机故障）。"""
+    return status == 429 or status >= 500
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or url
+
+
+class HostCircuit:
+    """单个主机的熔断状态与重试预算，所有方法线程安全。"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = _BASE_COOLDOWN
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        # 滑动窗口：重试与成功请求的时间戳
+        self._retries: deque = deque()
+        self._successes: deque = deque()
+        self._lock = threading.Lock()
+
+    # ── 熔断 ────────────────────────────────────────────────
+    def before_request(self):
+        """请求发出前调用；熔断中直接抛 CircuitOpenError。"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            remaining = self.opened_at + self.cooldown - now
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+                logger.info(f"🔌 {self.host} 冷却结束，放行一个探测请求")
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.host, max(remaining, 0.0))
+
+    def record_success(self):
+        now = time.monotonic()
+        with self._lock:
+            self._successes.append(now)
+            self._trim(now)
+            if self.state != CLOSED:
+                logger.info(f"✅ {self.host} 探测成功，熔断恢复")
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = _BASE_COOLDOWN
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, _MAX_COOLDOWN)
+                self._open()
+            elif self.state == CLOSED and self.failures >= FAILURE_THRESHOLD:
+                self._open()
+
+    def release_probe(self):
+        """
+        请求没有得出主机好坏的结论就中断了（时间预算用尽、回放未命中等非网络异常）：
+        释放探测名额，否则 half-open 状态会一直认为有探测在途，之后的请求全被拒绝。
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+        logger.warning(
+            f"⛔ {self.host} 连续失败 {self.failures} 次，熔断 {self.cooldown:.0f} 秒"
+            f"（期间请求直接失败，转用缓存/其它来源）"
+        )
+
+    # ── 重试预算 ────────────────────────────────────────────
+    def try_acquire_retry(self) -> bool:
+        """申请一次重试额度；熔断中或预算用尽返回 False。"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state != CLOSED:
+                return False
+            self._trim(now)
+            allowed = len(self._successes) * _RETRY_RATIO + _MIN_RETRIES
+            if len(self._retries) >= allowed:
+                logger.debug("%s 重试预算已用尽（%s/%.0f），放弃重试", self.host, len(self._retries), allowed)
+                return False
+            self._retries.append(now)
+            return True
+
+    def _trim(self, now: float):
+        horizon = now - _BUDGET_WINDOW
+        for q in (self._retries, self._successes):
+            while q and q[0] < horizon:
+                q.popleft()
+
+
+_circuits: Dict[str, HostCircuit] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit(host: str) -> HostCircuit:
+    with _registry_lock:
+        circuit = _circuits.get(host)
+        if circuit is None:
+            circuit = _circuits[host] = HostCircuit(host)
+        return circuit
+
+
+def allow_retry(host: Optional[str]) -> bool:
+    """应用层重试前调用；host 为空时不做限制。"""
+    return host is None or get_circuit(host).try_acquire_retry()
@@ -5,6 +5,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _require(section, keys, section_name: str, allow_empty: bool = False):
+    """
+    必填项缺失或为空时直接退出（configparser 的 get/getint 对缺失项返回 None，不会自己报错）。
+    allow_empty=True 时空值有含义（如留空表示不启用），只要求配置项存在。
+    """
+    missing = [k for k in keys if section.get(k) is None or not (allow_empty or section.get(k).strip())]
+    if missing:
+        logger.error(f"❌ 缺少必填 [{section_name}] 配置项: {', '.join(missing)}")
+        sys.exit(1)
+
+
 def _load_config(config_file: str = "config.ini") -> dict:
     """
     读取 config.ini（由 Ansible 从 ansible/secrets.yml + config.ini.j2 生成）并返回配置字典。
@@ -47,6 +59,14 @@ def _load_config(config_file: str = "config.ini") -> dict:
                 sys.exit(1)
             result[key] = val
 
+        # 翻译池：在所有凭据有效的提供商之间分流与故障转移
+        _require(ai, ["translate_pool"], "AI")
+        try:
+            result['translate_pool'] = ai.getboolean("translate_pool")
+        except ValueError as e:
+            logger.error(f"❌ translate_pool 格式错误（应为 true/false）: {e}")
+            sys.exit(1)
+
         if not result.get('imdb_lookup_model'):
             logger.error("❌ 未配置 imdb_lookup_model")
             sys.exit(1)
@@ -81,13 +101,33 @@ def _load_config(config_file: str = "config.ini") -> dict:
             sys.exit(1)
         
         settings = config["Settings"]
+        _require(settings, ["fill_to_target", "hedge_requests", "entity_fuzzy_threshold",
+                            "daemon_refresh_minutes", "daemon_host", "daemon_port",
+                            "run_deadline_minutes", "stage_budget_weights",
+                            "omdb_daily_limit", "llm_daily_requests", "llm_daily_tokens"], "Settings")
+        _require(settings, ["work_queue"], "Settings", allow_empty=True)
         try:
             result['max_workers']        = settings.getint("max_workers")
             result['max_movies']         = settings.getint("max_movies")
+            result['fill_to_target']     = settings.getboolean("fill_to_target")
             result['mistral_batch_size'] = settings.getint("mistral_batch_size")
             result['request_timeout']    = settings.getint("request_timeout")
+            result['hedge_requests']     = settings.getboolean("hedge_requests")
             result['retry_delay_min']    = settings.getfloat("retry_delay_min")
             result['retry_delay_max']    = settings.getfloat("retry_delay_max")
+            result['entity_fuzzy_threshold'] = settings.getfloat("entity_fuzzy_threshold")
+            result['daemon_refresh_minutes'] = settings.getint("daemon_refresh_minutes")
+            result['daemon_host']        = settings.get("daemon_host").strip()
+            result['daemon_port']        = settings.getint("daemon_port")
+            result['work_queue']         = settings.get("work_queue").strip()
+            result['run_deadline_minutes'] = settings.getint("run_deadline_minutes")
+            result['omdb_daily_limit']   = settings.getint("omdb_daily_limit")
+            result['llm_daily_requests'] = settings.getint("llm_daily_requests")
+            result['llm_daily_tokens']   = settings.getint("llm_daily_tokens")
+            weights = [float(w) for w in settings.get("stage_budget_weights").split(',') if w.strip()]
+            if len(weights) != 4:
+                raise ValueError("stage_budget_weights 需要 4 个权重 (fetch-list, enrich, translate, render)")
+            result['stage_budget_weights'] = dict(zip(("fetch-list", "enrich", "translate", "render"), weights))
         except ValueError as e:
             logger.error(f"❌ [Settings] 某些配置项缺失或格式错误: {e}")
             sys.exit(1)
@@ -113,6 +153,21 @@ def _load_config(config_file: str = "config.ini") -> dict:
         result['yts_quality'] = config["Sources"].get("yts_quality").strip()
         result['yts_minimum_rating'] = float(config["Sources"].get("yts_minimum_rating").strip())
         result['yts_minimum_metascore'] = int(config["Sources"].get("yts_minimum_metascore").strip())
+
+        # ── 大目录抓取参数 ──────────────────────────────────────────────────
+        ingest_mode = config["Sources"].get("ingest_mode", "").strip()
+        if ingest_mode not in ("top100", "catalog"):
+            logger.error(f"❌ ingest_mode 只能是 top100 或 catalog，当前: '{ingest_mode}'")
+            sys.exit(1)
+        result['ingest_mode'] = ingest_mode
+        raw_feeds = config["Sources"].get("apibay_categories", "").strip()
+        result['apibay_categories'] = [c.strip() for c in raw_feeds.split(',') if c.strip()]
+        if not result['apibay_categories']:
+            logger.error("❌ apibay_categories 不能为空")
+            sys.exit(1)
+        _require(config["Sources"], ["yts_pages"], "Sources")
+        result['yts_pages'] = config["Sources"].getint("yts_pages")
+        logger.info(f"✅ 抓取模式: {ingest_mode}, Apibay 榜单: {', '.join(result['apibay_categories'])}, YTS 页数: {result['yts_pages']}")
         logger.info(f"✅ 爬虫源已加载: {len(urls)} 个 URL, YTS 排序: {result['yts_sort_by']}, 质量: {result['yts_quality']}, 最低评分: {result['yts_minimum_rating']}, 最低Metascore: {result['yts_minimum_metascore']}")
 
         logger.info(
@@ -130,3 +185,18 @@ def _load_config(config_file: str = "config.ini") -> dict:
 
 CONFIG = _load_config()
 
+
+def reload_config(config_file: str = "config.ini") -> bool:
+    """
+    重新读取配置并原地更新 CONFIG（各模块持有的是同一个 dict 引用，无需重新导入）。
+    守护进程专用：新配置校验失败时保留旧配置继续运行，而不是退出进程。
+    """
+    try:
+        new_config = _load_config(config_file)
+    except SystemExit:
+        logger.error("❌ 新配置校验失败，继续使用旧配置")
+        return False
+    CONFIG.clear()
+    CONFIG.update(new_config)
+    return True
+
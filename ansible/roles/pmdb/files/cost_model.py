@@ -0,0 +1,129 @@
+"""
+OMDb 查询成本预测与调度顺序。
+
+不同电影的查询成本差别很大：种子自带 imdbID 的一次 ?i= 就结束，
+无 ID、长标题、非 ASCII 的可能走完整条搜索阶梯（20+ 次请求外加 AI 兜底）。
+按列表顺序提交时，便宜的电影常排在一串昂贵电影后面，整批完成时间被拖长。
+
+这里按特征估算每部电影的 OMDb 请求数（单位与 omdb_calls_by_movie 相同）：
+  - 有 imdbID：1 次（缓存命中为 0）
+  - 无年份：直接跳过，0 次
+  - 无 ID：首个精确查询大概率命中；标题越长、含非 ASCII、首个查询已知未命中（负缓存）时，
+    越可能走完剩余阶梯与模糊搜索
+然后按"昂贵优先 + 便宜穿插"排序：昂贵的尽早开始以缩短长尾，便宜的穿插其间让结果尽早产出。
+每轮结束把 预测/实际 写入 output/enrich_costs.jsonl 并输出误差摘要，便于校验模型。
+只依赖标准库。
+"""
+import os
+import json
+import time
+import logging
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+COST_LOG = os.path.join("output", "enrich_costs.jsonl")
+
+# 无 ID 时首个精确查询未命中的基础概率，以及各特征的加成
+_BASE_MISS = 0.15
+_MISS_PER_EXTRA_WORD = 0.1
+_MISS_NON_ASCII = 0.5
+_MAX_MISS = 0.95
+# 有 ID 时相似度拦截后回退搜索的概率
+_ID_FALLBACK = 0.05
+# 每个模糊搜索变体的请求数（?s= + 命中后 ?i=）
+_CALLS_PER_FUZZY = 2
+
+CACHE_HIT, CACHE_NEGATIVE = "hit", "negative"
+
+
+def predict(features: dict) -> float:
+    """
+    features: has_id / has_year / words / non_ascii / ladder（精确查询阶梯长度）/
+              fuzzy（模糊搜索变体数）/ cache（首个查询的缓存状态：hit / negative / None）
+    返回预测的 OMDb 请求数。
+    """
+    tail = max(features["ladder"] - 1, 0) + _CALLS_PER_FUZZY * features["fuzzy"]
+    if features["has_id"]:
+        first = 0.0 if features["cache"] == CACHE_HIT else 1.0
+        return first + _ID_FALLBACK * (1 + tail)
+    if not features["has_year"]:
+        return 0.0
+    if features["cache"] == CACHE_HIT:
+        return 0.0
+    if features["cache"] == CACHE_NEGATIVE:
+        return float(tail)
+    p_miss = _BASE_MISS + _MISS_PER_EXTRA_WORD * max(features["words"] - 3, 0)
+    if features["non_ascii"]:
+        p_miss += _MISS_NON_ASCII
+    return 1.0 + min(p_miss, _MAX_MISS) * tail
+
+
+def schedule(costs: Sequence[float]) -> List[int]:
+    """
+    返回提交顺序（下标列表）：按预测成本降序，交替从最贵端与最便宜端各取一个。
+    线程池按提交顺序取任务，昂贵任务因此最先占满工作线程（缩短完成时间），
+    便宜任务夹在中间，结果不会全部堆到最后才出来。
+    """
+    ranked = sorted(range(len(costs)), key=lambda i: (-costs[i], i))
+    order = []
+    lo, hi = 0, len(ranked) - 1
+    while lo <= hi:
+        order.append(ranked[lo])
+        lo += 1
+        if lo <= hi:
+            order.append(ranked[hi])
+            hi -= 1
+    return order
+
+
+def _ranks(values: Sequence[float]) -> List[float]:
+    """平均秩（并列取平均），用于 Spearman 相关系数。"""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2
+        i = j + 1
+    return ranks
+
+
+def _spearman(xs: Sequence[float], ys: Sequence[float]) -> Optional[float]:
+    if len(xs) < 3:
+        return None
+    rx, ry = _ranks(xs), _ranks(ys)
+    mx, my = sum(rx) / len(rx), sum(ry) / len(ry)
+    cov = sum((a - mx) * (b - my) for a, b in zip(rx, ry))
+    vx = sum((a - mx) ** 2 for a in rx)
+    vy = sum((b - my) ** 2 for b in ry)
+    if not vx or not vy:
+        return None
+    return cov / (vx * vy) ** 0.5
+
+
+def record(predicted: Dict[str, float], features: Dict[str, dict], actual: Dict[str, int],
+           path: str = COST_LOG):
+    """追加本轮每部电影的 预测/实际 请求数，并输出误差摘要。只统计有实际计数的电影。"""
+    names = [n for n in predicted if n in actual]
+    if not names:
+        return
+    ts = time.strftime("%Y-%m-%dT%H:%M:%S")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for n in names:
+            f.write(json.dumps({"ts": ts, "movie": n, "predicted": round(predicted[n], 2),
+                                "actual": actual[n], **features[n]}, ensure_ascii=False) + "\n")
+
+    preds = [predicted[n] for n in names]
+    acts = [actual[n] for n in names]
+    mae = sum(abs(p - a) for p, a in zip(preds, acts)) / len(names)
+    rho = _spearman(preds, acts)
+    logger.info(
+        f"📐 成本模型：{len(names)} 部，预测 {sum(preds):.0f} 次 / 实际 {sum(acts)} 次 OMDb 请求，"
+        f"平均绝对误差 {mae:.2f}" + (f"，秩相关 {rho:.2f}" if rho is not None else "")
+        + f" → {path}"
+    )
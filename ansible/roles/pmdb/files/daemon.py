@@ -0,0 +1,179 @@
+"""
+守护进程模式：定时刷新 + 内置 HTTP 服务。
+
+- 刷新在后台线程执行，共享 Session、OMDb 响应缓存在两次刷新之间保持热状态；
+- config.ini 修改后自动重载（校验失败则保留旧配置），下一轮刷新生效；
+- HTTP 服务只读内存中的当前快照（页面 + 预压缩 gzip + ETag），
+  新页面渲染完成后整体替换快照引用，读请求从不等待刷新；
+- /api/ 下提供目录查询（query_service），索引随快照一起重建、整体替换。
+"""
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# config.ini 变更检测间隔（秒）
+_CONFIG_POLL_SECONDS = 5.0
+
+
+class CatalogSnapshot:
+    """一次渲染结果的不可变快照；替换时整体换引用，读者无需加锁。"""
+    __slots__ = ("body", "gzip_body", "etag", "last_modified")
+
+    def __init__(self, body: bytes, mtime: float):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9)
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.last_modified = formatdate(mtime, usegmt=True)
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["CatalogSnapshot"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            body = f.read()
+        return cls(body, os.path.getmtime(path))
+
+
+class _CatalogHandler(BaseHTTPRequestHandler):
+    server_version = "PMDB"
+    daemon_ref: "PMDBDaemon" = None  # 由 PMDBDaemon 在启动时绑定
+
+    def do_GET(self):
+        self._serve(with_body=True)
+
+    def do_HEAD(self):
+        self._serve(with_body=False)
+
+    def _serve(self, with_body: bool):
+        if self.path.startswith("/api/"):
+            from query_service import handle_api, send_json
+            send_json(self, *handle_api(self.daemon_ref.index, self.path), with_body=with_body)
+            return
+        if self.path.split("?", 1)[0] not in ("/", "/index.html", "/output.html"):
+            self.send_error(404)
+            return
+        snap = self.daemon_ref.snapshot
+        if snap is None:
+            self.send_error(503, "首次刷新尚未完成")
+            return
+
+        if self.headers.get("If-None-Match") == snap.etag:
+            self.send_response(304)
+            self.send_header("ETag", snap.etag)
+            self.end_headers()
+            return
+
+        use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = snap.gzip_body if use_gzip else snap.body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", snap.etag)
+        self.send_header("Last-Modified", snap.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug("HTTP %s - %s", self.address_string(), fmt % args)
+
+
+class PMDBDaemon:
+    def __init__(
+        self,
+        refresh: Callable[[], bool],
+        refresh_seconds: float,
+        host: str,
+        port: int,
+        output_path: str = "output.html",
+        config_file: str = "config.ini",
+        on_config_change: Optional[Callable[[], None]] = None,
+    ):
+        self.refresh = refresh
+        self.refresh_seconds = refresh_seconds
+        self.host = host
+        self.port = port
+        self.output_path = output_path
+        self.config_file = config_file
+        self.on_config_change = on_config_change
+        self.snapshot: Optional[CatalogSnapshot] = CatalogSnapshot.from_file(output_path)
+        self.index = self._load_index()
+        self._stop = threading.Event()
+        self._config_mtime = self._mtime(config_file)
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    @staticmethod
+    def _load_index():
+        from catalog_store import load_ndjson
+        from query_service import CatalogIndex
+        records = load_ndjson()
+        return CatalogIndex(records) if records else None
+
+    def _check_config(self):
+        mtime = self._mtime(self.config_file)
+        if mtime == self._config_mtime:
+            return
+        self._config_mtime = mtime
+        logger.info(f"🔄 检测到 {self.config_file} 变更，重新加载配置")
+        from config_reader import reload_config
+        if reload_config(self.config_file) and self.on_config_change:
+            self.on_config_change()
+
+    def _refresh_once(self):
+        started = time.monotonic()
+        logger.info("⏰ 开始定时刷新...")
+        try:
+            ok = self.refresh()
+        except Exception as e:
+            logger.error(f"❌ 刷新失败，继续提供旧页面: {type(e).__name__} - {e}", exc_info=True)
+            return
+        if not ok:
+            logger.warning("⚠️ 本轮刷新未产出新页面，继续提供旧页面")
+            return
+        snap = CatalogSnapshot.from_file(self.output_path)
+        if snap is not None:
+            self.snapshot = snap  # 原子替换引用
+            self.index = self._load_index()
+            logger.info(f"✅ 刷新完成，耗时 {time.monotonic() - started:.0f} 秒，新页面已上线 (ETag {snap.etag})")
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            self._refresh_once()
+            deadline = time.monotonic() + self.refresh_seconds
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                self._check_config()
+                self._stop.wait(min(_CONFIG_POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+
+    def serve_forever(self):
+        _CatalogHandler.daemon_ref = self
+        server = ThreadingHTTPServer((self.host, self.port), _CatalogHandler)
+        server.daemon_threads = True
+        worker = threading.Thread(target=self._refresh_loop, name="pmdb-refresh", daemon=True)
+        worker.start()
+        logger.info(
+            f"🌐 PMDB 守护进程已启动: http://{self.host}:{self.port}/ "
+            f"（每 {self.refresh_seconds / 60:.0f} 分钟刷新一次）"
+        )
+        try:
+            server.serve_forever()
+        finally:
+            self._stop.set()
+            server.server_close()
@@ -0,0 +1,109 @@
+"""
+整轮运行的截止时间与各阶段时间预算（协作式取消）。
+
+各层都有自己的超时与重试（HTTP 超时、with_retry 退避、429 等待、Playwright 超时），
+单独看都合理，叠在一起碰上 OMDb 变慢、提供商限流时，一次定时任务可能跑上几个小时。
+这里给整轮运行设一个截止时间，再按权重分给四个阶段：
+  - 阶段预算 = 整轮剩余时间 × 本阶段权重 / (本阶段及之后各阶段权重之和)，
+    前面阶段省下的时间自动顺延给后面的阶段，后面的阶段也总能分到自己那一份
+  - HTTP 超时按 clamp() 收紧到预算剩余时间；退避等待若会超出预算则不再等待
+  - 预算用尽时抛出 DeadlineExceeded。它继承 BaseException（同 asyncio.CancelledError），
+    不会被各层的 `except Exception` 当成普通网络错误吞掉或误记为"查无此片"；
+    由阶段内的取消点（OMDb 工作线程、翻译批次、列表源）接住并保留已完成的部分结果
+
+未开启（run_deadline_minutes = 0）或不在 run() 内时，所有函数都是空操作。
+只依赖标准库。
+"""
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch-list", "enrich", "translate", "render")
+# 收紧后的超时下限（秒）：预算只剩零头时仍给请求一个能完成的机会
+_MIN_TIMEOUT = 1.0
+
+
+class DeadlineExceeded(BaseException):
+    """当前阶段的时间预算已用尽。"""
+
+
+_run_expires: Optional[float] = None
+_weights: Dict[str, float] = {}
+_stage_name: Optional[str] = None
+_stage_expires: Optional[float] = None
+
+
+@contextmanager
+def run(seconds: float, weights: Dict[str, float]):
+    """整轮运行的截止时间；seconds <= 0 表示不限时。"""
+    global _run_expires, _weights
+    if seconds <= 0:
+        yield
+        return
+    _run_expires = time.monotonic() + seconds
+    _weights = {s: max(weights.get(s, 0.0), 0.0) for s in STAGES}
+    logger.info(f"⏳ 本轮时间预算 {seconds / 60:.0f} 分钟")
+    try:
+        yield
+    finally:
+        _run_expires = None
+
+
+@contextmanager
+def stage(name: str):
+    """在阶段预算内运行；不在 run() 内时为空上下文。"""
+    global _stage_name, _stage_expires
+    if _run_expires is None:
+        yield
+        return
+    now = time.monotonic()
+    left = max(_run_expires - now, 0.0)
+    later = sum(_weights[s] for s in STAGES[STAGES.index(name):])
+    budget = left * _weights[name] / later if later else left
+    _stage_name, _stage_expires = name, now + budget
+    logger.info(f"⏳ [{name}] 阶段预算 {budget:.0f} 秒（本轮剩余 {left:.0f} 秒）")
+    try:
+        yield
+    finally:
+        overrun = time.monotonic() - _stage_expires
+        if overrun >= 1:  # 取消点之间的零头不报
+            logger.warning(f"⏳ [{name}] 超出阶段预算 {overrun:.0f} 秒")
+        _stage_name = _stage_expires = None
+
+
+def remaining() -> Optional[float]:
+    """当前阶段剩余秒数；未限时返回 None。"""
+    expires = _stage_expires
+    return None if expires is None else expires - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check():
+    """取消点：预算已用尽时抛出 DeadlineExceeded。"""
+    if expired():
+        raise DeadlineExceeded(f"[{_stage_name}] 阶段时间预算已用尽")
+
+
+def allows(seconds: float) -> bool:
+    """等待 seconds 秒后是否仍在预算内（用于退避、限流等待前判断）。"""
+    left = remaining()
+    return left is None or left > seconds
+
+
+def clamp(timeout):
+    """把超时（秒，或 requests 的 (连接, 读取) 元组）收紧到阶段剩余时间；预算已用尽时抛出。"""
+    left = remaining()
+    if left is None:
+        return timeout
+    check()
+    cap = max(left, _MIN_TIMEOUT)
+    if isinstance(timeout, tuple):
+        return tuple(min(t, cap) for t in timeout)
+    return min(timeout, cap)
@@ -0,0 +1,164 @@
+"""
+查询 OMDb 之前的实体归并。
+
+同一部电影在 BT 站常以多个种子名出现（不同压制组、不同标点、带/不带副标题），
+scraper 的去重只认 标准化标题+年份 完全相同，其余的会各自完整走一遍 OMDb 查询。
+这里在 enrich 之前把候选归成实体组：
+  1. 种子自带的 imdbID 相同 → 同组
+  2. 标准化标题+年份相同 → 同组
+  3. 模糊近似：按 (年份, 标题首词) 分块，块内 difflib 相似度 ≥ 阈值 → 同组
+每组只查询代表条目一次，结果再展开回组内所有候选。
+"""
+import re
+import difflib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+# 代表条目没有请求计数时（例如从断点恢复的），按至少 1 次请求估算节省量
+_MIN_CALLS_PER_LOOKUP = 1
+
+
+class EntityGroup:
+    __slots__ = ("representative", "members")
+
+    def __init__(self, representative: MovieRecord, members: List[MovieRecord]):
+        self.representative = representative
+        self.members = members
+
+
+def _norm_title(title: str) -> str:
+    t = title.lower().strip()
+    t = re.sub(r'\band\b', '&', t)
+    t = re.sub(r"[^\w& ]", ' ', t)
+    return re.sub(r'\s+', ' ', t).strip()
+
+
+def _split_name(name: str) -> Tuple[str, str]:
+    parts = name.rsplit(" ", 1)
+    if len(parts) == 2 and parts[1].isdigit():
+        return parts[0], parts[1]
+    return name, ""
+
+
+class _UnionFind:
+    """并查集：合并时拒绝把两个不同的种子 imdbID 并进同一组（同年同名的翻拍片）。"""
+
+    def __init__(self, records: List[MovieRecord]):
+        self.parent = list(range(len(records)))
+        self.imdb = [r.imdb for r in records]
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return True
+        ia, ib = self.imdb[ra], self.imdb[rb]
+        if ia and ib and ia != ib:
+            return False
+        # 根节点取排名靠前者，保证组代表/顺序稳定
+        if rb < ra:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.imdb[ra] = ia or ib
+        return True
+
+
+def resolve_entities(candidates: Iterable[MovieRecord], fuzzy_threshold: float = 0.92) -> List[EntityGroup]:
+    """把候选归并成实体组，组按首个成员的原始顺序排列。"""
+    records = list(candidates)
+    uf = _UnionFind(records)
+    by_imdb: Dict[str, int] = {}
+    by_key: Dict[str, int] = {}
+    blocks: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
+
+    for i, r in enumerate(records):
+        title, year = _split_name(r.name)
+        norm = _norm_title(title)
+        if r.imdb:
+            if r.imdb in by_imdb:
+                uf.union(by_imdb[r.imdb], i)
+            else:
+                by_imdb[r.imdb] = i
+        key = f"{norm} {year}"
+        if key in by_key:
+            uf.union(by_key[key], i)
+        else:
+            by_key[key] = i
+        first_word = norm.split(" ", 1)[0] if norm else ""
+        blocks.setdefault((year, first_word), []).append((i, norm))
+
+    # 模糊阶段只在块内两两比较，块通常只有几条，整体接近线性
+    for block in blocks.values():
+        for a in range(len(block)):
+            for b in range(a + 1, len(block)):
+                (i, ni), (j, nj) = block[a], block[b]
+                if uf.find(i) == uf.find(j):
+                    continue
+                if difflib.SequenceMatcher(None, ni, nj).ratio() >= fuzzy_threshold:
+                    uf.union(i, j)
+
+    grouped: Dict[int, List[MovieRecord]] = {}
+    for i, r in enumerate(records):
+        grouped.setdefault(uf.find(i), []).append(r)
+
+    groups = []
+    for root in sorted(grouped):
+        members = grouped[root]
+        # 代表条目：优先带种子 imdbID 的（一次 ?i= 就能查到），其次排名最靠前的
+        rep = next((m for m in members if m.imdb), members[0])
+        groups.append(EntityGroup(rep, members))
+    return groups
+
+
+def expand_groups(groups: List[EntityGroup], enriched: List[MovieRecord]) -> List[MovieRecord]:
+    """
+    把代表条目的 OMDb 结果复制到组内其它成员，返回按原顺序排列的全部成功记录。
+    按名称对应（断点恢复的结果是新建的记录对象，不能按对象身份匹配）。
+    """
+    by_name = {r.name: r for r in enriched}
+    expanded: List[MovieRecord] = []
+    for g in groups:
+        result = by_name.get(g.representative.name)
+        if result is None:
+            continue
+        for m in g.members:
+            if m is g.representative:
+                expanded.append(result)
+                continue
+            m.apply_omdb(result.rating, result.summary_en, result.image_url,
+                         result.imdb_id, result.official_name, result.metascore,
+                         fetched_at=result.fetched_at)
+            expanded.append(m)
+    expanded.sort(key=lambda r: r.rank)
+    return expanded
+
+
+def report_savings(groups: List[EntityGroup], calls_by_name: Optional[Dict[str, int]] = None):
+    """报告本次归并省掉的查询：每个非代表成员按其代表实际消耗的 OMDb 请求数计。"""
+    calls_by_name = calls_by_name or {}
+    lookups_saved = 0
+    calls_saved = 0
+    for g in groups:
+        extra = len(g.members) - 1
+        if not extra:
+            continue
+        lookups_saved += extra
+        rep_calls = calls_by_name.get(g.representative.name, _MIN_CALLS_PER_LOOKUP)
+        calls_saved += extra * max(rep_calls, _MIN_CALLS_PER_LOOKUP)
+    if lookups_saved:
+        logger.info(
+            f"🧩 实体归并：{sum(len(g.members) for g in groups)} 个候选 → {len(groups)} 个实体，"
+            f"少查 {lookups_saved} 部电影，约节省 {calls_saved} 次 OMDb 请求"
+        )
+    else:
+        logger.info("🧩 实体归并：未发现重复候选")
+    return lookups_saved, calls_saved
@@ -0,0 +1,256 @@
+"""
+历次运行排名与评分的只追加列式历史库（output/history/）。
+
+每次运行都会覆盖 output/movies_cache.json 与 output.html，排名、评分怎么变化过没有留下记录。
+这里每轮追加一份快照（来源排名、imdbID、评分、Metascore、来源），按列存成定长二进制文件：
+  imdb.col       uint32  imdbID 的数字部分（tt0111161 → 111161）
+  rank.col       uint16  来源排名（MovieRecord.rank，1 起；缺失时用在列表中的位置）
+  rating.col     uint8   IMDb 评分 × 10，255 = 暂无
+  metascore.col  uint8   Metascore，255 = 暂无
+  source.col     uint8   来源编号，对应 sources.json 中的下标
+  runs.idx       每轮一条定长索引 (运行时间 float64, 起始行 uint32, 行数 uint32)
+每天一轮、每轮百部左右时，十年也只有几十万行、每列几 MB。读取时各列按 mmap 映射，
+趋势查询只按索引切出涉及的那几轮的行，不把整个历史读进内存。
+
+追加顺序：先追加各列，fsync 后再追加 runs.idx 的一条记录 —— 索引记录是提交点。
+中途崩溃留下的多余列数据在下次打开时按索引截掉，已提交的快照不受影响。
+只依赖标准库，不读取配置。
+"""
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+from array import array
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = os.path.join("output", "history")
+
+# 列名 → array 类型码（定长，本机字节序；x86 / ARM 均为小端）
+_COLUMNS = (("imdb", "I"), ("rank", "H"), ("rating", "B"), ("metascore", "B"), ("source", "B"))
+_INDEX = struct.Struct("<dII")
+_MISSING = 255
+_MAX_SOURCES = 255
+
+
+class Run(NamedTuple):
+    ts: float
+    start: int
+    count: int
+
+
+class Entry(NamedTuple):
+    imdb_id: str
+    rank: int
+    rating: Optional[float]
+    metascore: Optional[int]
+    source: str
+
+
+def _imdb_number(imdb_id: Optional[str]) -> Optional[int]:
+    if not imdb_id or not imdb_id.startswith("tt") or not imdb_id[2:].isdigit():
+        return None
+    n = int(imdb_id[2:])
+    return n if n < 2 ** 32 else None
+
+
+def _imdb_id(n: int) -> str:
+    return f"tt{n:07d}"
+
+
+def _encode_rating(value) -> int:
+    try:
+        return min(max(round(float(value) * 10), 0), _MISSING - 1)
+    except (TypeError, ValueError):
+        return _MISSING
+
+
+def _encode_metascore(value) -> int:
+    try:
+        return min(max(int(value), 0), _MISSING - 1)
+    except (TypeError, ValueError):
+        return _MISSING
+
+
+class HistoryStore:
+    def __init__(self, path: str = HISTORY_DIR):
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _sources(self) -> List[str]:
+        try:
+            with open(self._file("sources.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def runs(self) -> List[Run]:
+        """全部已提交的运行（索引很小，直接整体读入）。"""
+        try:
+            with open(self._file("runs.idx"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        usable = len(data) - len(data) % _INDEX.size
+        return [Run(*_INDEX.unpack_from(data, off)) for off in range(0, usable, _INDEX.size)]
+
+    # ── 写入 ───────────────────────────────────────────────
+    def append(self, records: Sequence[MovieRecord], ts: Optional[float] = None) -> int:
+        """追加一轮快照（records 按页面顺序），没有 imdbID 的记录跳过。返回写入的行数。"""
+        os.makedirs(self.path, exist_ok=True)
+        runs = self.runs()
+        committed = runs[-1].start + runs[-1].count if runs else 0
+
+        # 0 号来源留给"未知"，来源种类超出 uint8 编码范围时也归入它
+        sources = self._sources() or [""]
+        cols = {name: array(code) for name, code in _COLUMNS}
+        for position, r in enumerate(records, 1):
+            n = _imdb_number(r.imdb_id)
+            if n is None:
+                continue
+            source = r.source or ""
+            if source not in sources:
+                if len(sources) < _MAX_SOURCES:
+                    sources.append(source)
+                else:
+                    source = ""
+            cols["imdb"].append(n)
+            cols["rank"].append(min(r.rank or position, 2 ** 16 - 1))
+            cols["rating"].append(_encode_rating(r.rating))
+            cols["metascore"].append(_encode_metascore(r.metascore))
+            cols["source"].append(sources.index(source))
+        count = len(cols["imdb"])
+        if not count:
+            return 0
+
+        tmp_path = self._file("sources.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sources, f, ensure_ascii=False)
+        os.replace(tmp_path, self._file("sources.json"))
+
+        for name, code in _COLUMNS:
+            with open(self._file(f"{name}.col"), "ab") as f:
+                # 截掉上次崩溃时写了一半、未提交的行
+                f.truncate(committed * array(code).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(cols[name].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        with open(self._file("runs.idx"), "ab") as f:
+            f.truncate(len(runs) * _INDEX.size)
+            f.seek(0, os.SEEK_END)
+            f.write(_INDEX.pack(time.time() if ts is None else ts, committed, count))
+            f.flush()
+            os.fsync(f.fileno())
+        return count
+
+    # ── 读取 ───────────────────────────────────────────────
+    @contextmanager
+    def _columns(self):
+        """把各列 mmap 成 memoryview（按类型码 cast），退出时释放映射。"""
+        files, maps, views = [], [], {}
+        try:
+            for name, code in _COLUMNS:
+                f = open(self._file(f"{name}.col"), "rb")
+                files.append(f)
+                if os.fstat(f.fileno()).st_size == 0:
+                    views[name] = memoryview(b"").cast("B").cast(code)
+                    continue
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                maps.append(m)
+                view = memoryview(m)
+                usable = len(view) - len(view) % array(code).itemsize
+                views[name] = view[:usable].cast(code)
+            yield views
+        finally:
+            for view in views.values():
+                view.release()
+            for m in maps:
+                m.close()
+            for f in files:
+                f.close()
+
+    def snapshot(self, run: Run, cols=None) -> Dict[str, Entry]:
+        """某一轮的快照：imdbID → Entry。"""
+        if cols is None:
+            with self._columns() as cols:
+                return self.snapshot(run, cols)
+        sources = self._sources()
+        out = {}
+        for row in range(run.start, run.start + run.count):
+            rating, metascore = cols["rating"][row], cols["metascore"][row]
+            imdb_id = _imdb_id(cols["imdb"][row])
+            out[imdb_id] = Entry(
+                imdb_id, cols["rank"][row],
+                None if rating == _MISSING else rating / 10,
+                None if metascore == _MISSING else metascore,
+                sources[cols["source"][row]] if cols["source"][row] < len(sources) else "",
+            )
+        return out
+
+    def _window(self, days: float) -> Tuple[Optional[Run], List[Run]]:
+        """(窗口开始前的最后一轮, 最近 days 天内的各轮)。"""
+        runs = self.runs()
+        since = time.time() - days * 86400
+        inside = [r for r in runs if r.ts >= since]
+        before = [r for r in runs if r.ts < since]
+        return (before[-1] if before else None), inside
+
+    def new_entries(self, days: float = 7) -> List[Tuple[Entry, float]]:
+        """
+        最近 days 天内新上榜的电影：窗口内任一轮出现过、但窗口开始前最后一轮没有的。
+        返回 [(首次出现时的条目, 首次出现时间)]，按首次出现时间、当时的排名排序。
+        """
+        baseline, inside = self._window(days)
+        if not inside:
+            return []
+        with self._columns() as cols:
+            before = set(self.snapshot(baseline, cols)) if baseline else set()
+            first: Dict[str, Tuple[Entry, float]] = {}
+            for run in inside:
+                for imdb_id, entry in self.snapshot(run, cols).items():
+                    if imdb_id not in before and imdb_id not in first:
+                        first[imdb_id] = (entry, run.ts)
+        return sorted(first.values(), key=lambda item: (item[1], item[0].rank))
+
+    def rating_movers(self, days: float = 7, limit: int = 20) -> List[Tuple[Entry, float]]:
+        """
+        最近 days 天内 IMDb 评分变化最大的电影：最新一轮的评分与窗口内（含窗口前最后一轮）
+        最早的评分相比。返回 [(最新条目, 变化量)]，按变化绝对值降序。
+        """
+        baseline, inside = self._window(days)
+        if not inside:
+            return []
+        with self._columns() as cols:
+            latest = self.snapshot(inside[-1], cols)
+            earliest: Dict[str, float] = {}
+            for run in ([baseline] if baseline else []) + inside[:-1]:
+                for imdb_id, entry in self.snapshot(run, cols).items():
+                    if imdb_id in latest and entry.rating is not None:
+                        earliest.setdefault(imdb_id, entry.rating)
+        movers = [
+            (entry, round(entry.rating - earliest[imdb_id], 1))
+            for imdb_id, entry in latest.items()
+            if entry.rating is not None and imdb_id in earliest and entry.rating != earliest[imdb_id]
+        ]
+        movers.sort(key=lambda item: (-abs(item[1]), item[0].rank))
+        return movers[:limit]
+
+
+def append_snapshot(records: Sequence[MovieRecord], path: str = HISTORY_DIR):
+    """每轮流水线末尾调用；历史库写失败不影响本轮结果。"""
+    try:
+        n = HistoryStore(path).append(records)
+    except OSError as e:
+        logger.warning(f"⚠️ 写入历史快照失败: {e}")
+        return
+    if n:
+        logger.info(f"🗂️ 历史快照已追加: {path}（{n} 部）")
@@ -2,22 +2,28 @@
 HTML 输出生成器。
 
 模板结构（output/ 子目录）：
-  output/template.html  — Jinja2 HTML 骨架，含 {{ styles }} 占位符
+  output/template.html  — Jinja2 HTML 骨架，含 {{ styles }} / {{ scripts }} / {{ search_index }} 占位符
   output/template.css   — 独立 CSS 文件，渲染时内联注入
+  output/template.js    — 页面搜索脚本，渲染时内联注入
 
-输出文件 output.html 为自包含单文件（内联 CSS），无需依赖外部资源。
+搜索索引由 search_index.py 在渲染时按卡片顺序生成，以 JSON 内嵌进页面，
+页面脚本直接在索引上做前缀查询与评分/年份过滤，不扫描 DOM。
+输出文件 output.html 为自包含单文件（内联 CSS / JS / 索引），无需依赖外部资源。
 """
 import os
 import logging
 import webbrowser
 from jinja2 import Environment, FileSystemLoader, Template
 
+from search_index import index_json
+
 logger = logging.getLogger(__name__)
 
 # ── 默认模板目录（相对于本文件所在目录）────────────────────
 _DEFAULT_TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "output")
 _DEFAULT_HTML_NAME    = "template.html"
 _DEFAULT_CSS_NAME     = "template.css"
+_DEFAULT_JS_NAME      = "template.js"
 _DEFAULT_OUTPUT_PATH  = "output.html"
 
 # ── 内置后备模板（output/ 目录缺失时使用）───────────────────
@@ -59,9 +65,9 @@ _FALLBACK_HTML = """\
     {% for movie in movies %}
     <div class="movie-item">
         {% set img = movie.image_url if movie.image_url and movie.image_url != 'N/A' else 'https://via.placeholder.com/300x445?text=No+Poster' %}
-        <img src='{{ img }}' alt='{{ movie.name }}' ondblclick="openImage('{{ img }}')" onerror="this.src='https://via.placeholder.com/300x445?text=No+Poster'">
+        <img src='{{ img }}' alt='{{ movie.display_name }}' ondblclick="openImage('{{ img }}')" onerror="this.src='https://via.placeholder.com/300x445?text=No+Poster'">
         <div class="movie-content">
-            <div class="movie-title">{{ movie.name }}</div>
+            <div class="movie-title">{{ movie.display_name }}</div>
             {% set r = movie.rating | float(default=0.0) %}
             {% set w = r * 10 %}
             {% if r >= 8.0 %}{% set fc='fill-high' %}{% set sc='rating-high' %}
@@ -85,32 +91,38 @@ _FALLBACK_HTML = """\
 </html>"""
 
 
-def _load_template_and_css(
+def _read_asset(path: str, kind: str) -> str:
+    """读取内联资源（CSS / JS），不存在时返回空串。"""
+    if not os.path.exists(path):
+        logger.warning(f"⚠️ {kind} 文件不存在 ({path})，内容将为空")
+        return ""
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    logger.debug(f"✅ 已加载 {kind}: {path}")
+    return content
+
+
+def _load_template_and_assets(
     template_dir: str,
     html_name: str,
     css_name: str,
-) -> tuple[Environment, str, str]:
+    js_name: str,
+) -> tuple[Environment, str, str, str]:
     """
-    加载模板目录中的 HTML 和 CSS。
-    返回 (jinja2_env, html_template_name, css_content)。
+    加载模板目录中的 HTML、CSS 和 JS。
+    返回 (jinja2_env, html_template_name, css_content, js_content)。
     失败时抛出 FileNotFoundError。
     """
     html_path = os.path.join(template_dir, html_name)
-    css_path  = os.path.join(template_dir, css_name)
 
     if not os.path.exists(html_path):
         raise FileNotFoundError(f"HTML 模板不存在: {html_path}")
 
-    css_content = ""
-    if os.path.exists(css_path):
-        with open(css_path, encoding="utf-8") as f:
-            css_content = f.read()
-        logger.debug(f"✅ 已加载 CSS: {css_path}")
-    else:
-        logger.warning(f"⚠️ CSS 文件不存在 ({css_path})，样式将为空")
+    css_content = _read_asset(os.path.join(template_dir, css_name), "CSS")
+    js_content  = _read_asset(os.path.join(template_dir, js_name), "JS")
 
     env = Environment(loader=FileSystemLoader(template_dir))
-    return env, html_name, css_content
+    return env, html_name, css_content, js_content
 
 
 def generate_html(
@@ -118,6 +130,7 @@ def generate_html(
     template_dir:  str = _DEFAULT_TEMPLATE_DIR,
     html_name:     str = _DEFAULT_HTML_NAME,
     css_name:      str = _DEFAULT_CSS_NAME,
+    js_name:       str = _DEFAULT_JS_NAME,
     output_path:   str = _DEFAULT_OUTPUT_PATH,
     open_browser:  bool = True,
 ) -> bool:
@@ -125,32 +138,24 @@ def generate_html(
     从 results 生成 output.html。
 
     Args:
-        results:      [(name, rating, summary_cn, summary_en, image_url), ...]
-        template_dir: 模板目录（含 template.html + template.css）
+        results:      [MovieRecord, ...]（模板通过属性访问 display_name / rating / summary_cn 等）
+        template_dir: 模板目录（含 template.html + template.css + template.js）
         html_name:    HTML 模板文件名
         css_name:     CSS 文件名
+        js_name:      页面脚本文件名
         output_path:  输出文件路径
         open_browser: 生成后是否自动在浏览器打开
 
     Returns:
         True 表示成功，False 表示失败
     """
-    # 整理数据
-    movies = [
-        {
-            "name":       name,
-            "rating":     rating,
-            "summary_cn": summary_cn,
-            "summary_en": summary_en,
-            "image_url":  image_url,
-        }
-        for name, rating, summary_cn, summary_en, image_url in results
-    ]
+    # 记录对象直接交给模板，不再另行拷贝成 dict
+    movies = results
 
     # 加载模板（失败时使用内置后备模板）
     try:
-        env, html_name_used, css_content = _load_template_and_css(
-            template_dir, html_name, css_name
+        env, html_name_used, css_content, js_content = _load_template_and_assets(
+            template_dir, html_name, css_name, js_name
         )
         template = env.get_template(html_name_used)
         logger.info(f"✅ 使用模板: {os.path.join(template_dir, html_name_used)}")
@@ -158,22 +163,27 @@ def generate_html(
         logger.warning(f"⚠️ {e}，使用内置后备模板")
         template    = Template(_FALLBACK_HTML)
         css_content = _FALLBACK_CSS
+        js_content  = ""
 
-    # 渲染（CSS 内联注入到 {{ styles }} 占位符）
+    # 渲染（CSS / JS / 搜索索引内联注入到对应占位符）
     try:
         html_content = template.render(
             title="🎬 PMDB 热门电影榜单",
             movies=movies,
             styles=css_content,
+            scripts=js_content,
+            search_index=index_json(movies),
         )
     except Exception as e:
         logger.error(f"❌ 模板渲染失败: {e}")
         return False
 
-    # 写入输出文件
+    # 写入输出文件（先写临时文件再替换，守护进程/浏览器不会读到半截页面）
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write(html_content)
+        os.replace(tmp_path, output_path)
         logger.info(f"✅ HTML 已生成: {output_path}（{len(movies)} 部电影）")
     except OSError as e:
         logger.error(f"❌ 写入文件失败: {e}")
@@ -0,0 +1,95 @@
+"""
+进程级共享 HTTP 客户端。
+
+所有 OMDb / LLM / 列表源请求共用 requests.Session（带 urllib3 重试与连接池），
+一次性运行时避免每部电影都重新握手；守护进程模式下连接在两次刷新之间保持热状态。
+每个请求都经过按主机的熔断器（circuit_breaker）：主机熔断时直接抛 CircuitOpenError，
+urllib3 内部重试也要先向该主机的重试预算申请额度。
+最底层的发送函数可由 cassette 替换为录制/回放实现（--record / --replay）。
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from cassette import wrap_transport
+from circuit_breaker import get_circuit, host_of, is_failure_status
+
+# 连接池大小：需覆盖 max_workers 个并发工作线程 + 翻译池并行批次
+_POOL_MAXSIZE = 32
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+class _BudgetedRetry(Retry):
+    """urllib3 每次内部重试前先向目标主机的重试预算申请额度，申请不到就此放弃。"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        host = getattr(_pool, "host", None)
+        if host and not get_circuit(host).try_acquire_retry():
+            raise MaxRetryError(_pool, url, error or ResponseError("重试预算已用尽"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class _CircuitBreakerAdapter(HTTPAdapter):
+    """发请求前检查主机熔断状态，完成后按结果（含 urllib3 重试后的最终结果）记成功/失败。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._transport = wrap_transport(super().send)
+
+    def send(self, request, **kwargs):
+        circuit = get_circuit(host_of(request.url))
+        circuit.before_request()
+        try:
+            resp = self._transport(request, **kwargs)
+        except requests.RequestException:
+            circuit.record_failure()
+            raise
+        except BaseException:
+            # 含 DeadlineExceeded（BaseException）：不算主机故障，但必须释放 half-open 探测名额
+            circuit.release_probe()
+            raise
+        if is_failure_status(resp.status_code):
+            circuit.record_failure()
+        else:
+            circuit.record_success()
+        return resp
+
+
+def _build_session(retry: bool) -> requests.Session:
+    session = requests.Session()
+    retries = _BudgetedRetry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"]
+    ) if retry else 0
+    adapter = _CircuitBreakerAdapter(max_retries=retries, pool_connections=16, pool_maxsize=_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(retry: bool = True) -> requests.Session:
+    """
+    返回进程内共享的 Session（首次调用时创建）。
+    retry=False 的 Session 不做 urllib3 重试，用于逐个探测镜像的场景：
+    失败就换下一个节点，比在同一个节点上退避更快。两者共用同一套熔断状态。
+    """
+    with _lock:
+        session = _sessions.get(retry)
+        if session is None:
+            session = _sessions[retry] = _build_session(retry)
+        return session
+
+
+def reset_session():
+    """丢弃当前 Session（例如配置变更后），下次 get_session 时重建。"""
+    with _lock:
+        old = list(_sessions.values())
+        _sessions.clear()
+    for session in old:
+        session.close()
@@ -0,0 +1,113 @@
+"""
+追加式断点日志（journal）。
+
+长耗时阶段（OMDb 查询、翻译）每完成一条就追加一行 JSON：
+  {"k": "<条目键>", "v": <结果>}
+写入后立即 flush，fsync 按条数/时间批量做，兼顾掉电安全与吞吐。
+运行被中断（Ctrl-C、Key 耗尽、提供商故障）后，下次运行读取 journal，
+已经付费拿到的结果直接复用，只处理剩下的条目；阶段正常完成后删除 journal。
+"""
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.path.join("output", "journal")
+
+# 超过这个时长的残留 journal 视为过期，不再续跑（榜单和评分都已变化）
+_MAX_AGE_SECONDS = 24 * 3600
+
+# 进程内所有打开的 journal，供 os._exit 之前统一落盘
+_OPEN_JOURNALS: List["Journal"] = []
+_REGISTRY_LOCK = threading.Lock()
+
+
+class Journal:
+    def __init__(self, name: str, fsync_every: int = 20, fsync_interval: float = 2.0):
+        self.path = os.path.join(JOURNAL_DIR, f"{name}.jsonl")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._file = None
+
+    def load(self) -> Dict[str, Any]:
+        """读取已完成的条目。末行可能因崩溃被截断，解析失败的行直接跳过。"""
+        if not os.path.exists(self.path):
+            return {}
+        if time.time() - os.path.getmtime(self.path) > _MAX_AGE_SECONDS:
+            logger.info(f"🗑️ 断点日志已过期，忽略: {self.path}")
+            os.remove(self.path)
+            return {}
+
+        entries: Dict[str, Any] = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                    entries[rec["k"]] = rec["v"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+        if entries:
+            logger.info(f"♻️ 从断点日志恢复 {len(entries)} 条已完成结果: {self.path}")
+        return entries
+
+    def append(self, key: str, value: Any):
+        line = json.dumps({"k": key, "v": value}, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(JOURNAL_DIR, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                with _REGISTRY_LOCK:
+                    _OPEN_JOURNALS.append(self)
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            # fsync 批量做：每条都 fsync 在 SD 卡上太慢，完全不做又扛不住断电
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+
+    def _sync_locked(self):
+        if self._file is None or not self._pending:
+            return
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync_locked()
+            self._file.close()
+            self._file = None
+        with _REGISTRY_LOCK:
+            if self in _OPEN_JOURNALS:
+                _OPEN_JOURNALS.remove(self)
+
+    def discard(self):
+        """阶段已完整完成，结果已写入产物，删除 journal 避免下次误续跑。"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def flush_all():
+    """os._exit 会跳过 finally/atexit，退出前必须显式调用，保证已付费结果落盘。"""
+    with _REGISTRY_LOCK:
+        journals = list(_OPEN_JOURNALS)
+    for j in journals:
+        try:
+            j.sync()
+        except OSError as e:
+            logger.error(f"❌ 断点日志落盘失败 {j.path}: {e}")
@@ -0,0 +1,195 @@
+"""
+按端点（主机）的延迟统计、自适应超时与对冲请求。
+
+request_timeout（60 秒）是按大模型调用定的，OMDb 与列表源通常不到一秒就返回；
+一个卡住的连接就能让工作线程空等一分钟。这里对每个主机记录最近的请求耗时：
+  - 连接超时固定为较短的 _CONNECT_TIMEOUT（握手不随接口快慢变化）
+  - 读取超时 = max(p99 × 2, p50 × 4)，夹在 [_MIN_READ_TIMEOUT, request_timeout] 之间；
+    样本不足时退回 request_timeout
+  - 自适应读取超时触发后，用完整的 request_timeout 再试一次（消耗一次重试预算），
+    避免把偶发慢请求直接判为失败
+对冲（仅用于幂等 GET）：首个请求超过该主机 p95 仍未返回时，再发一个相同请求，谁先返回用谁；
+对冲次数受预算限制（约为请求数的 _HEDGE_RATIO），不会让流量翻倍。
+"""
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Tuple
+
+import requests
+
+import deadline
+from circuit_breaker import allow_retry, host_of
+
+logger = logging.getLogger(__name__)
+
+_CONNECT_TIMEOUT = 3.05
+_MIN_READ_TIMEOUT = 1.0
+# 开始按百分位计算前至少需要的样本数
+_MIN_SAMPLES = 20
+_WINDOW = 200
+# 对冲预算：对冲次数 ≤ 请求数 × _HEDGE_RATIO + 1
+_HEDGE_RATIO = 0.05
+# 对冲请求的线程池：OMDb 工作线程数 × 2 以内
+_HEDGE_WORKERS = 32
+
+
+class EndpointLatency:
+    """单个主机最近 _WINDOW 次请求的耗时与对冲计数，线程安全。"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.samples: deque = deque(maxlen=_WINDOW)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+            self.requests += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < _MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+    def timeouts(self, ceiling: float) -> Tuple[float, float]:
+        """返回 (连接超时, 读取超时)。"""
+        connect = min(_CONNECT_TIMEOUT, ceiling)
+        p50, p99 = self.percentile(0.50), self.percentile(0.99)
+        if p50 is None:
+            return connect, ceiling
+        read = max(p99 * 2, p50 * 4, _MIN_READ_TIMEOUT)
+        return connect, min(read, ceiling)
+
+    def hedge_delay(self) -> Optional[float]:
+        p95 = self.percentile(0.95)
+        return max(p95, 0.05) if p95 is not None else None
+
+    def record_hedge_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.requests * _HEDGE_RATIO + 1:
+                return False
+            self.hedges += 1
+            return True
+
+
+_stats: Dict[str, EndpointLatency] = {}
+_stats_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def stats_for(host: str) -> EndpointLatency:
+    with _stats_lock:
+        stats = _stats.get(host)
+        if stats is None:
+            stats = _stats[host] = EndpointLatency(host)
+        return stats
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _stats_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _executor
+
+
+def _get_once(session: requests.Session, url: str, stats: EndpointLatency,
+              timeout: Tuple[float, float], kwargs: dict) -> requests.Response:
+    started = time.monotonic()
+    try:
+        resp = session.get(url, timeout=timeout, **kwargs)
+    except requests.Timeout:
+        # 超时样本按所用的超时值计入（删失数据），超时过紧时百分位会随之抬高
+        stats.record(timeout[1])
+        raise
+    stats.record(time.monotonic() - started)
+    return resp
+
+
+def _close_quietly(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _get_hedged(session: requests.Session, url: str, stats: EndpointLatency,
+                timeout: Tuple[float, float], kwargs: dict) -> requests.Response:
+    delay = stats.hedge_delay()
+    if delay is None:
+        return _get_once(session, url, stats, timeout, kwargs)
+
+    pool = _get_executor()
+    # 复制调用方上下文，后台线程里的日志保留同一个关联 ID
+    primary = pool.submit(contextvars.copy_context().run, _get_once, session, url, stats, timeout, kwargs)
+    done, _ = wait([primary], timeout=delay)
+    if done or not stats.try_hedge():
+        return primary.result()
+
+    logger.debug("⏱️ %s 超过 p95 (%.2fs) 未返回，发出对冲请求", stats.host, delay)
+    backup = pool.submit(contextvars.copy_context().run, _get_once, session, url, stats, timeout, kwargs)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winners = [f for f in done if f.exception() is None]
+        if winners:
+            winner = winners[0]
+            # 落败者（已返回或仍在途）的响应一律关闭，释放连接
+            for loser in winners[1:]:
+                _close_quietly(loser)
+            for other in pending:
+                other.add_done_callback(_close_quietly)
+            if winner is backup:
+                stats.record_hedge_win()
+            return winner.result()
+        error = next(iter(done)).exception()
+    raise error
+
+
+def timed_get(session: requests.Session, url: str, ceiling: float, hedge: bool = False,
+              **kwargs) -> requests.Response:
+    """
+    按主机自适应超时发出 GET；hedge=True 时对慢请求发起对冲（仅限幂等请求）。
+    ceiling 为读取超时上限（通常是 request_timeout），实际超时不超过阶段时间预算的剩余时间。
+    """
+    host = host_of(url)
+    stats = stats_for(host)
+    # 超时同时受阶段时间预算约束
+    timeout = deadline.clamp(stats.timeouts(ceiling))
+    try:
+        if hedge:
+            return _get_hedged(session, url, stats, timeout, kwargs)
+        return _get_once(session, url, stats, timeout, kwargs)
+    except requests.Timeout:
+        deadline.check()
+        full = deadline.clamp((timeout[0], ceiling))
+        if full[1] <= timeout[1] or not allow_retry(host):
+            raise
+        logger.debug("%s 自适应读取超时 %.1fs 触发，以 %.0fs 重试一次", host, timeout[1], full[1])
+        return _get_once(session, url, stats, full, kwargs)
+
+
+def log_summary():
+    """输出各主机的延迟分位与对冲情况（阶段结束时调用）。"""
+    with _stats_lock:
+        all_stats = list(_stats.values())
+    for s in all_stats:
+        p50, p95, p99 = s.percentile(0.50), s.percentile(0.95), s.percentile(0.99)
+        if p50 is None:
+            continue
+        logger.info(
+            f"⏱️ {s.host}: p50 {p50:.2f}s / p95 {p95:.2f}s / p99 {p99:.2f}s，"
+            f"{s.requests} 次请求，对冲 {s.hedges} 次（胜出 {s.hedge_wins} 次）"
+        )
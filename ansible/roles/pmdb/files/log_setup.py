@@ -0,0 +1,149 @@
+"""
+非阻塞日志：工作线程只把 LogRecord 放进队列，格式化与写盘由后台线程完成。
+
+- 根 logger 只挂一个 QueueHandler；QueueListener 后台线程写出到
+    pmdb.log      JSON Lines，DEBUG 及以上，按大小轮转
+    stdout        人类可读格式，INFO 及以上
+- QueueHandler 不在调用线程里预先格式化消息（标准实现会），
+  %-风格参数留到后台线程才拼接；热路径上请写 logger.debug("... %s", x) 而不是 f-string
+- correlation(...) 为当前线程设置关联 ID（按电影），同一部电影的所有日志行带相同 cid
+- audit(...) 写审计事件（被拦截/失败的电影）到 output/audit.jsonl：
+  独立队列 + MemoryHandler 攒批落盘，取代工作线程里逐条打开文件追加
+
+只依赖标准库。
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOG_FILE = "pmdb.log"
+AUDIT_FILE = os.path.join("output", "audit.jsonl")
+_LOG_MAX_BYTES = 10 * 1024 * 1024
+_LOG_BACKUPS = 5
+# 审计事件攒够这么多条才落盘一次（退出时全部落盘）
+_AUDIT_BUFFER = 200
+
+# (cid, 电影名)；未设置时为 None
+_correlation: contextvars.ContextVar = contextvars.ContextVar("pmdb_correlation", default=None)
+
+_listeners = []
+_audit_logger = logging.getLogger("pmdb.audit")
+_setup_lock = threading.Lock()
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """入队前只盖上关联 ID，不格式化；消息拼接、异常栈渲染都在监听线程完成。"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        corr = _correlation.get()
+        record.cid, record.movie = corr if corr else (None, None)
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        cid = getattr(record, "cid", None)
+        if cid:
+            entry["cid"] = cid
+            entry["movie"] = record.movie
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _AuditFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"), "event": record.getMessage()}
+        if getattr(record, "cid", None):
+            entry["cid"] = record.cid
+        entry.update(getattr(record, "audit", {}))
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _start_listener(logger: logging.Logger, *handlers: logging.Handler):
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(_DeferredQueueHandler(q))
+    listener = QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+def setup_logging(log_file: str = LOG_FILE):
+    """配置日志：JSON 文件（轮转）+ 控制台，全部经后台线程写出。重复调用无副作用。"""
+    with _setup_lock:
+        if _listeners:
+            return
+        root = logging.getLogger()
+        root.setLevel(logging.DEBUG)
+        for h in list(root.handlers):
+            root.removeHandler(h)
+
+        file_handler = RotatingFileHandler(
+            log_file, maxBytes=_LOG_MAX_BYTES, backupCount=_LOG_BACKUPS, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        console = logging.StreamHandler(sys.stdout)
+        console.setLevel(logging.INFO)
+        console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        _start_listener(root, file_handler, console)
+
+        # 审计事件走独立队列，不混进主日志，也不受控制台级别影响
+        os.makedirs(os.path.dirname(AUDIT_FILE), exist_ok=True)
+        audit_file = logging.FileHandler(AUDIT_FILE, encoding="utf-8", delay=True)
+        audit_file.setFormatter(_AuditFormatter())
+        buffered = MemoryHandler(_AUDIT_BUFFER, flushLevel=logging.CRITICAL + 1, target=audit_file)
+        _audit_logger.setLevel(logging.INFO)
+        _audit_logger.propagate = False
+        _start_listener(_audit_logger, buffered)
+
+        logging.getLogger('urllib3').setLevel(logging.WARNING)
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """停止后台线程并把队列中剩余的日志、审计缓冲全部落盘（可重复调用）。"""
+    with _setup_lock:
+        listeners = list(_listeners)
+        _listeners.clear()
+    for listener in listeners:
+        listener.stop()
+        for h in listener.handlers:
+            target = getattr(h, "target", None)  # MemoryHandler 关闭时只落盘缓冲，不关闭目标
+            h.flush()
+            h.close()
+            if target is not None:
+                target.close()
+
+
+@contextmanager
+def correlation(movie_name: str):
+    """在 with 块内为当前线程的日志附加该电影的关联 ID。"""
+    cid = hashlib.sha1(movie_name.encode("utf-8")).hexdigest()[:8]
+    token = _correlation.set((cid, movie_name))
+    try:
+        yield cid
+    finally:
+        _correlation.reset(token)
+
+
+def audit(event: str, movie: Optional[str] = None, **fields):
+    """记录一条审计事件（rejected / failed ...），附带当前关联 ID。"""
+    if movie is not None:
+        fields["movie"] = movie
+    _audit_logger.info(event, extra={"audit": fields})
@@ -1,13 +1,22 @@
 import sys
+import time
+import argparse
+import functools
 import logging
-from config_reader import CONFIG
-from translate_service import translate_texts
-from scraper import get_top100_with_fallback
-from movie_api_service import fetch_imdb_info_batch
-from html_generator import generate_html
+import deadline
+import profiler
+import quota
+from artifacts import ArtifactError, read_artifact, write_artifact
+from journal import Journal
+from log_setup import setup_logging
+from movie_record import MovieBatch, MovieRecord
 
+# 注意：scraper / movie_api_service / translate_service / html_generator / config_reader
+# 都在各自阶段函数内部按需导入。它们会拉起 Playwright、BeautifulSoup、Jinja2，
+# config_reader 还会在导入时校验配置并可能 sys.exit —— 只重跑 render 时这些都不需要。
 
-def dedup_by_imdb_id(results: list) -> list:
+
+def dedup_by_imdb_id(results: list[MovieRecord]) -> list[MovieRecord]:
     """
     按 imdbID 对 OMDb 命中的电影进行二次去重。
     - 同一 imdbID 的多条记录 → 保留 rating 不为 N/A 的那条，都有评分则保留先到的。
@@ -16,7 +25,7 @@ def dedup_by_imdb_id(results: list) -> list:
     seen_ids: dict = {}
     unique: list = []
     for r in results:
-        iid = r.get('imdb_id')
+        iid = r.imdb_id
         if not iid:
             unique.append(r)  # 未命中的保留原样
             continue
@@ -27,103 +36,374 @@ def dedup_by_imdb_id(results: list) -> list:
             # 已有相同 ID：尝试用数据更完整的替换
             existing_idx = seen_ids[iid]
             existing = unique[existing_idx]
-            if existing['rating'] == 'N/A' and r['rating'] != 'N/A':
+            if existing.rating == 'N/A' and r.rating != 'N/A':
                 unique[existing_idx] = r
     return unique
 
 
-def setup_logging():
-    """配置日志：同时输出到文件和控制台。"""
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('pmdb.log', encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 各阶段：读取上游产物 → 处理 → 写出本阶段产物
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _stage(name: str):
+    """
+    阶段包装：在本阶段时间预算内运行（run_all 设置了整轮截止时间时），--profile 时在剖析器下运行。
+    各阶段自己在取消点收尾并保留部分结果；仍有 DeadlineExceeded 漏出时按本阶段无结果处理。
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with deadline.stage(name), profiler.stage(name):
+                try:
+                    return fn(*args, **kwargs)
+                except deadline.DeadlineExceeded as e:
+                    logger.error(f"❌ {e}，阶段 {name} 提前结束")
+                    return None
+        return wrapper
+    return decorator
+
+
+def _configure_quota():
+    """把配置中的每日额度上限交给额度记账（守护进程重载配置后每轮重新读取）。"""
+    from config_reader import CONFIG
+    quota.ledger.configure(CONFIG["omdb_daily_limit"], CONFIG["llm_daily_requests"], CONFIG["llm_daily_tokens"])
+
+
+@_stage("fetch-list")
+def stage_fetch_list() -> MovieBatch:
+    """[阶段 1] 从 BT 站获取电影列表，写出 list 产物。"""
+    from scraper import get_top100_with_fallback
+
+    logger.info("\n[阶段 fetch-list] 从 BT 站获取电影列表（支持多源 Fallback）...")
+    movie_list = get_top100_with_fallback()
+    if not movie_list:
+        logger.error("❌ 无法获取电影列表")
+        return MovieBatch()
+    write_artifact("list", movie_list.to_dicts())
+    return movie_list
+
+
+@_stage("enrich")
+def stage_enrich(movie_list: MovieBatch = None) -> list[MovieRecord]:
+    """[阶段 2] 并行获取 OMDb 信息 + IMDb ID 去重，写出 enriched 产物。"""
+    from config_reader import CONFIG
+    from movie_api_service import (
+        fetch_imdb_info_batch, fetch_imdb_info_queued, omdb_calls_by_movie, prefilter_candidates,
+        resolve_from_catalog,
     )
-    logging.getLogger('urllib3').setLevel(logging.WARNING)
+    from entity_resolver import expand_groups, report_savings, resolve_entities
+    from latency import log_summary
+    from alias_store import aliases
 
+    if movie_list is None:
+        _, records = read_artifact("list")
+        movie_list = MovieBatch.from_dicts(records)
+    _configure_quota()
 
-logger = logging.getLogger(__name__)
+    max_movies = CONFIG["max_movies"]
+    # 凑满目标模式：不截断候选，按排名依次查询直到 max_movies 部通过校验
+    fill_to_target = CONFIG["fill_to_target"] and not CONFIG["work_queue"]
+    if CONFIG["fill_to_target"] and CONFIG["work_queue"]:
+        logger.warning("⚠️ 共享工作队列模式下不支持凑满目标，按 max_movies 截断候选")
+    if not fill_to_target and len(movie_list) > max_movies:
+        logger.info(f"电影列表过长，仅处理前 {max_movies} 部")
+        movie_list = movie_list[:max_movies]
 
+    # ── 实体归并：同一部电影的多个种子只查一次 OMDb ─────────
+    groups = resolve_entities(movie_list, CONFIG["entity_fuzzy_threshold"])
+    representatives = [g.representative for g in groups]
+    # ── 预过滤：列表评分 / 本地库 / 缓存已确定不达标的，不再查 OMDb ──
+    representatives, prefiltered = prefilter_candidates(representatives)
+    # ── 本地目录命中（带 imdbID 且近期查过的）直接复用，不发请求 ──
+    local_results, representatives, local_failed = resolve_from_catalog(
+        representatives, target=max_movies if fill_to_target else None)
 
-def main():
+    logger.info(f"\n[阶段 enrich] 开始并行获取 {len(representatives)} 部电影的 OMDb 信息...")
+    # 断点日志：中断后重跑只查询剩下的电影；阶段完成并写出产物后才删除
+    # 配置了共享工作队列时由队列承担断点续跑，查询分摊给所有 worker
+    journal = Journal("enrich")
     try:
-        setup_logging()
-        logger.info("=" * 60)
-        logger.info("PMDB - 个人电影数据库工具 启动")
-        logger.info("=" * 60)
+        if CONFIG["work_queue"]:
+            raw_results, failed_movies = fetch_imdb_info_queued(representatives, CONFIG["work_queue"])
+        else:
+            raw_results, failed_movies = fetch_imdb_info_batch(
+                representatives, journal=journal,
+                target=max_movies if fill_to_target else None,
+                have=local_results,
+            )
+    finally:
+        journal.close()
+    raw_results = local_results + raw_results
+    failed_movies = prefiltered + local_failed + failed_movies
+    report_savings(groups, omdb_calls_by_movie)
+    aliases.log_summary()
+    log_summary()
+    raw_results = expand_groups(groups, raw_results)
 
-        # ── 步骤 1：读取配置（在 import 时已完成校验） ─────────────
-        logger.info("\n[步骤 1/4] 加载配置文件 (已通过模块自动加载并校验)...")
-        max_movies = CONFIG["max_movies"]
-        batch_size = CONFIG["mistral_batch_size"]
-        provider   = CONFIG["translate_provider"]
+    if not raw_results:
+        logger.error("❌ 未能获取任何有效电影信息")
+        return []
 
-        # ── 步骤 2：获取电影列表 ─────────────────────────────────
-        logger.info("\n[步骤 2/4] 从 BT 站获取电影列表（支持多源 Fallback）...")
-        movie_list = get_top100_with_fallback()
+    logger.info(f"✅ 成功获取 {len(raw_results)}/{len(movie_list)} 部电影信息")
 
-        if not movie_list:
-            logger.error("❌ 无法获取电影列表，程序退出")
-            return
+    if failed_movies:
+        logger.warning(f"\n⚠️ 以下 {len(failed_movies)} 部电影未找到满足条件的信息：")
+        for movie_reason in failed_movies:
+            logger.warning(f"  - {movie_reason}")
+
+    # ── IMDb ID 二次去重（合并同一部电影的不同 BT 站条目）────
+    before_dedup = len(raw_results)
+    raw_results = dedup_by_imdb_id(raw_results)
+    valid_count = len(raw_results)
+    if valid_count < before_dedup:
+        logger.info(f"🔁 IMDb ID 去重：{before_dedup} → {valid_count} 部（合并了 {before_dedup - valid_count} 条重复）")
+    if fill_to_target and valid_count > max_movies:
+        # 停止提交时仍在途的查询也可能通过，按来源排名只保留前 max_movies 部（列表顺序不变）
+        keep = {id(r) for r in sorted(raw_results, key=lambda r: r.rank)[:max_movies]}
+        raw_results = [r for r in raw_results if id(r) in keep]
+
+    write_artifact("enriched", [r.to_dict() for r in raw_results], failed=failed_movies)
+    journal.discard()
+    return raw_results
+
+
+@_stage("translate")
+def stage_translate(raw_results: list[MovieRecord] = None) -> list[MovieRecord]:
+    """[阶段 3] 批量翻译英文简介，写出 translated 产物。"""
+    from config_reader import CONFIG
+    from translate_service import llm_budget_covers, translate_texts
+    from catalog_store import export_catalog, lookup as catalog_lookup
+
+    if raw_results is None:
+        _, records = read_artifact("enriched")
+        raw_results = [MovieRecord.from_dict(d) for d in records]
+
+    _configure_quota()
+    logger.info(f"\n[阶段 translate] 使用 {CONFIG['translate_provider']} 批量翻译简介...")
+    summaries_en = [r.summary_en for r in raw_results]
+    # LLM 额度不够翻译全部简介时，原文未变的优先复用本地目录库中的旧译文
+    reused = {}
+    if not llm_budget_covers(summaries_en, CONFIG["mistral_batch_size"]):
+        stored = catalog_lookup(r.imdb_id for r in raw_results)
+        for i, r in enumerate(raw_results):
+            old = stored.get(r.imdb_id)
+            if old and old.summary_cn and old.summary_en == r.summary_en and not old.summary_cn.startswith("["):
+                reused[i] = old.summary_cn
+        logger.info(f"💳 LLM 今日额度不足以翻译全部 {len(summaries_en)} 条简介，复用本地目录库中 {len(reused)} 条旧译文")
+    journal = Journal("translate")
+    try:
+        chinese_summaries = translate_texts(
+            ["" if i in reused else s for i, s in enumerate(summaries_en)],
+            CONFIG["mistral_batch_size"], journal=journal,
+        )
+    finally:
+        journal.close()
+
+    if len(chinese_summaries) != len(raw_results):
+        logger.error("❌ 翻译结果数量不匹配")
+        return []
+    for i, cn in reused.items():
+        chinese_summaries[i] = cn
+
+    for r, cn in zip(raw_results, chinese_summaries):
+        r.summary_cn = cn
+    write_artifact("translated", [r.to_dict() for r in raw_results])
+    journal.discard()
+    # 导出 NDJSON / SQLite 供查询服务与其它工具使用
+    export_catalog(raw_results)
+    return raw_results
+
+
+@_stage("render")
+def stage_render(translated: list[MovieRecord] = None, open_browser: bool = True) -> bool:
+    """[阶段 4] 用模板渲染 output.html。不读配置、不发网络请求，适合反复调模板。"""
+    from html_generator import generate_html
+
+    if translated is None:
+        _, records = read_artifact("translated")
+        translated = [MovieRecord.from_dict(d) for d in records]
 
-        if len(movie_list) > max_movies:
-            logger.info(f"电影列表过长，仅处理前 {max_movies} 部")
-            movie_list = movie_list[:max_movies]
+    logger.info("\n[阶段 render] 正在生成 HTML...")
+    if not translated:
+        logger.error("❌ 没有有效结果可生成 HTML")
+        return False
 
-        # ── 步骤 3：并行获取 IMDb 信息 ───────────────────────────
-        logger.info(f"\n[步骤 3/4] 开始并行获取 {len(movie_list)} 部电影的 OMDb 信息...")
-        
-        raw_results, failed_movies = fetch_imdb_info_batch(movie_list)
+    ok = generate_html(translated, open_browser=open_browser)
+    if ok:
+        logger.info(f"\n✅ 任务完成！成功处理 {len(translated)} 部电影")
+    return ok
 
+
+def run_all(open_browser: bool = True) -> bool:
+    """
+    完整流水线：四个阶段依次执行，数据在内存中直接传递，同时落盘各阶段产物。
+    配置了 run_deadline_minutes 时整轮限时，超时的阶段带着已完成的部分结果进入下一阶段。
+    """
+    from config_reader import CONFIG
+    from history_store import append_snapshot
+
+    with deadline.run(CONFIG["run_deadline_minutes"] * 60, CONFIG["stage_budget_weights"]):
+        movie_list = stage_fetch_list()
+        if not movie_list:
+            return False
+        raw_results = stage_enrich(movie_list)
         if not raw_results:
-            logger.error("❌ 未能获取任何有效电影信息")
-            return
-
-        logger.info(f"✅ 成功获取 {len(raw_results)}/{len(movie_list)} 部电影信息")
-
-        if failed_movies:
-            logger.warning(f"\n⚠️ 以下 {len(failed_movies)} 部电影未找到满足条件的信息：")
-            for movie_reason in failed_movies:
-                logger.warning(f"  - {movie_reason}")
-
-        # ── IMDb ID 二次去重（合并同一部电影的不同 BT 站条目）────
-        before_dedup = len(raw_results)
-        raw_results = dedup_by_imdb_id(raw_results)
-        valid_count = len(raw_results)
-        if valid_count < before_dedup:
-            logger.info(f"🔁 IMDb ID 去重：{before_dedup} → {valid_count} 部（合并了 {before_dedup - valid_count} 条重复）")
-
-        # ── 步骤 4：批量翻译 ─────────────────────────────────────
-        logger.info(f"\n[步骤 4/4] 使用 {provider} 批量翻译简介...")
-        summaries_en = [r['summary_en'] for r in raw_results]
-        chinese_summaries = translate_texts(summaries_en, batch_size)
-
-        if len(chinese_summaries) != valid_count:
-            logger.error("❌ 翻译结果数量不匹配，程序退出")
-            return
-
-        # ── 合并结果并生成 HTML ──────────────────────────────────
-        logger.info("正在合并结果并生成 HTML...")
-        final_results = [
-            (
-                raw_results[i]['name'],
-                raw_results[i]['rating'],
-                chinese_summaries[i],
-                raw_results[i]['summary_en'],
-                raw_results[i]['image_url'],
-            )
-            for i in range(valid_count)
-        ]
+            return False
+        translated = stage_translate(raw_results)
+        if not translated:
+            return False
+        # 排名/评分快照每轮完整流水线只追加一次；单独重跑 translate 不会重复记一轮
+        append_snapshot(translated)
+        return stage_render(translated, open_browser=open_browser)
+
+
+def run_daemon():
+    """守护进程：定时刷新整条流水线，并通过内置 HTTP 服务提供最新页面。"""
+    from config_reader import CONFIG
+    from daemon import PMDBDaemon
+    from movie_api_service import key_manager
+
+    def _refresh() -> bool:
+        # OMDb 额度按天恢复：每轮刷新重新从第一个 Key 开始尝试
+        key_manager.reset(CONFIG["omdb_api_keys"])
+        return run_all(open_browser=False)
+
+    PMDBDaemon(
+        refresh=_refresh,
+        refresh_seconds=CONFIG["daemon_refresh_minutes"] * 60,
+        host=CONFIG["daemon_host"],
+        port=CONFIG["daemon_port"],
+        on_config_change=lambda: key_manager.reset(CONFIG["omdb_api_keys"]),
+    ).serve_forever()
+
+
+def run_worker(queue_path: str = None):
+    """分布式 enrich 的 worker：从共享队列认领电影查询 OMDb，队列清空后退出。"""
+    from config_reader import CONFIG
+    from movie_api_service import run_queue_worker
+
+    queue_path = queue_path or CONFIG["work_queue"]
+    if not queue_path:
+        logger.error("❌ 未配置工作队列：请在 config.ini 设置 work_queue，或用 --queue 指定")
+        return
+    _configure_quota()
+    run_queue_worker(queue_path)
+
+
+def run_query_server(host: str, port: int, use_sqlite: bool):
+    """只读查询服务：载入已导出的目录建索引，不读配置、不发网络请求。"""
+    from catalog_store import NDJSON_PATH, SQLITE_PATH, load_ndjson, load_sqlite
+    from query_service import serve
+
+    records = load_sqlite() if use_sqlite else load_ndjson()
+    if not records:
+        logger.error(f"❌ 没有可查询的目录，请先运行完整流水线生成 {SQLITE_PATH if use_sqlite else NDJSON_PATH}")
+        return
+    serve(records, host, port)
+
+
+def run_history(days: float, limit: int):
+    """历史趋势：最近 days 天新上榜的电影与评分变化最大的电影。只读本地历史库，不读配置。"""
+    from catalog_store import lookup as catalog_lookup
+    from history_store import HISTORY_DIR, HistoryStore
+
+    store = HistoryStore()
+    runs = store.runs()
+    if not runs:
+        logger.error(f"❌ 还没有历史快照，请先运行完整流水线生成 {HISTORY_DIR}")
+        return
+    logger.info(f"🗂️ 历史库共 {len(runs)} 轮快照，最早 {time.strftime('%Y-%m-%d', time.localtime(runs[0].ts))}")
+
+    new = store.new_entries(days)
+    movers = store.rating_movers(days, limit)
+    names = catalog_lookup([e.imdb_id for e, _ in new] + [e.imdb_id for e, _ in movers])
+
+    def _name(imdb_id: str) -> str:
+        rec = names.get(imdb_id)
+        return rec.display_name if rec else imdb_id
+
+    logger.info(f"\n🆕 最近 {days:g} 天新上榜 {len(new)} 部：")
+    for entry, ts in new[:limit]:
+        logger.info(f"  {time.strftime('%m-%d', time.localtime(ts))}  #{entry.rank:<3} {_name(entry.imdb_id)}"
+                    f"  ⭐ {entry.rating if entry.rating is not None else 'N/A'}")
+    logger.info(f"\n📈 最近 {days:g} 天评分变化最大的 {len(movers)} 部：")
+    for entry, delta in movers:
+        logger.info(f"  {delta:+.1f}  → {entry.rating}  #{entry.rank:<3} {_name(entry.imdb_id)}")
+
+
+def _parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="PMDB - 个人电影数据库工具。不带子命令时运行完整流水线。",
+    )
+    parser.add_argument("--no-browser", action="store_true", help="生成 HTML 后不自动打开浏览器")
+    parser.add_argument("--profile", action="store_true",
+                        help="逐阶段剖析 CPU（采样调用栈）与内存（tracemalloc），结果写入 output/profile/")
+    tape = parser.add_mutually_exclusive_group()
+    tape.add_argument("--record", metavar="FILE", help="录制本次运行的全部 HTTP 交互（密钥脱敏）到 FILE")
+    tape.add_argument("--replay", metavar="FILE", help="离线回放 FILE 中录制的 HTTP 交互，不访问网络")
+    parser.add_argument("--replay-latency", choices=["original", "zero"], default="original",
+                        help="回放时按录制的原始耗时返回，或零延迟（只测 CPU 侧开销）")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("all", help="运行全部阶段（默认）")
+    sub.add_parser("fetch-list", help="抓取电影列表 → output/stage_list.jsonl")
+    sub.add_parser("enrich", help="读取列表产物，查询 OMDb → output/stage_enriched.jsonl")
+    sub.add_parser("translate", help="读取 enriched 产物，翻译简介 → output/stage_translated.jsonl")
+    sub.add_parser("render", help="读取 translated 产物，渲染 output.html（无网络、无配置校验）")
+    sub.add_parser("daemon", help="常驻运行：定时刷新 + 内置 HTTP 服务（地址与刷新间隔见 config.ini）")
+    worker = sub.add_parser("worker", help="分布式 enrich：从共享工作队列认领电影查询 OMDb，队列清空后退出")
+    worker.add_argument("--queue", metavar="FILE", help="工作队列文件（默认取 config.ini 的 work_queue）")
+    query = sub.add_parser("query-serve", help="基于已导出的目录提供 JSON 查询接口 /api/movies（无网络、无配置校验）")
+    query.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    query.add_argument("--port", type=int, default=8766, help="监听端口（默认 8766）")
+    query.add_argument("--all", action="store_true", dest="use_sqlite",
+                       help="查询 SQLite 累积库中历次见过的全部电影，而不只是本次目录")
+    history = sub.add_parser("history", help="历史趋势：最近几天新上榜与评分变化最大的电影（只读 output/history/）")
+    history.add_argument("--days", type=float, default=7, help="时间窗口（天，默认 7）")
+    history.add_argument("--limit", type=int, default=20, help="每类最多列出几部（默认 20）")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None):
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    command = args.command or "all"
+    open_browser = not args.no_browser
+
+    try:
+        setup_logging()
+        if args.profile:
+            profiler.enable()
+        if args.record or args.replay:
+            from cassette import configure
+            configure(record=args.record, replay=args.replay, latency=args.replay_latency)
+        logger.info("=" * 60)
+        logger.info(f"PMDB - 个人电影数据库工具 启动（{command}）")
+        logger.info("=" * 60)
 
-        if final_results:
-            generate_html(final_results)
-            logger.info(f"\n✅ 任务完成！成功处理 {len(final_results)} 部电影")
+        if command == "fetch-list":
+            stage_fetch_list()
+        elif command == "enrich":
+            stage_enrich()
+        elif command == "translate":
+            stage_translate()
+        elif command == "render":
+            stage_render(open_browser=open_browser)
+        elif command == "daemon":
+            run_daemon()
+        elif command == "worker":
+            run_worker(args.queue)
+        elif command == "query-serve":
+            run_query_server(args.host, args.port, args.use_sqlite)
+        elif command == "history":
+            run_history(args.days, args.limit)
         else:
-            logger.error("❌ 没有有效结果可生成 HTML")
+            run_all(open_browser=open_browser)
 
+    except ArtifactError as e:
+        logger.error(f"❌ {e}")
     except KeyboardInterrupt:
         logger.warning("\n⚠️ 用户中断程序")
     except Exception as e:
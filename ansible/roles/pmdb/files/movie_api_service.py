@@ -1,17 +1,32 @@
 import requests
 import re
-import os
+import hashlib
+import math
 import sys
 import threading
 import time
 import random
 import logging
-from typing import Tuple, Optional, List, Dict
+from typing import Tuple, Optional, List, Dict, Sequence
 import difflib
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from config_reader import CONFIG
+from journal import Journal
+from http_client import get_session
+from circuit_breaker import CircuitOpenError
+from cassette import active as cassette_active, replaying_without_latency
+from latency import timed_get
+from log_setup import audit, correlation
+from work_queue import WorkQueue, run_worker
+import cost_model
+import deadline
+import prefilter
+import quota
+from catalog_store import lookup as catalog_lookup
+from alias_store import STAGE_AI, STAGE_EXACT, STAGE_FUZZY, STAGE_TORRENT, aliases
+from search_planner import EXACT, FUZZY, NO_YEAR, SHORT, VARIANT, YEAR_ADJ, Step, planner, title_shape
+from movie_record import MovieRecord
 
 # OMDb API 版本 - 替代 IMDb 网页抓取
 # IMDb 已改为纯 JS 渲染，requests 直接请求只能拿到空壳 HTML
@@ -23,6 +38,10 @@ class SkipMovieException(Exception):
     pass
 
 
+class KeyExhaustedException(SkipMovieException):
+    """Key 耗尽导致的跳过：不是电影本身的结论，续跑时需要重新查询。"""
+
+
 class OMDBKeyManager:
     def __init__(self, keys: List[str]):
         self.keys = keys
@@ -35,7 +54,19 @@ class OMDBKeyManager:
                 return self.keys[self.current_idx]
             return None
 
+    def reset(self, keys: List[str]):
+        """配置重载或新一轮刷新时重新启用全部 Key（OMDb 额度按天恢复）。"""
+        with self.lock:
+            self.keys = keys
+            self.current_idx = 0
+
+    def active_keys(self) -> List[str]:
+        """尚未耗尽的 Key（当前及之后的）。"""
+        with self.lock:
+            return self.keys[self.current_idx:]
+
     def mark_exhausted(self, key: str):
+        quota.ledger.mark_spent(key)
         with self.lock:
             if self.current_idx < len(self.keys) and self.keys[self.current_idx] == key:
                 self.current_idx += 1
@@ -62,17 +93,8 @@ NOISE_PATTERNS = [
 
 
 def get_session_with_retries() -> requests.Session:
-    session = requests.Session()
-    retries = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"]
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount('https://', adapter)
-    session.mount('http://', adapter)
-    return session
+    """共享 Session（连接池 + urllib3 重试），见 http_client。"""
+    return get_session()
 
 
 def clean_title_for_search(title: str) -> str:
@@ -119,54 +141,68 @@ def normalize_title_variants(title: str) -> List[str]:
     return unique
 
 
-def _build_search_queries(title: str, year: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+def _search_steps(title: str, year: Optional[str]) -> List[Step]:
     """
-    构建有序搜索策略：
-    1. 完整清理标题 × 精确年份
-    2. 各变体 × 精确年份
-    3. 各变体 × 年份±1（OMDb 年份录入误差）
-    4. 前3词短标题 × 精确年份（针对过长标题）
-    5. 各变体 × 不限年份（最终兜底）
+    构建固定搜索阶梯，每步标注类型（见 search_planner）：
+    1. 完整清理标题 × 精确年份（exact）
+    2. 各变体 × 精确年份（variant）
+    3. 各变体 × 年份±1（year_adj，OMDb 年份录入误差）
+    4. 前3词短标题 × 精确年份/±1（short，针对过长标题）
+    5. 各变体 × 不限年份（no_year）
+    6. 各变体模糊搜索 ?s=（fuzzy）
     """
     cleaned = clean_title_for_search(title)
     all_variants = normalize_title_variants(cleaned)
 
-    queries: List[Tuple[str, Optional[str]]] = []
+    steps: List[Step] = []
 
     # 精确年份
-    for v in all_variants:
-        queries.append((v, year))
+    for i, v in enumerate(all_variants):
+        steps.append((EXACT if i == 0 else VARIANT, v, year))
 
     # 年份 ±1
     if year and year.isdigit():
         y = int(year)
         for v in all_variants:
-            queries.append((v, str(y - 1)))
-            queries.append((v, str(y + 1)))
+            steps.append((YEAR_ADJ, v, str(y - 1)))
+            steps.append((YEAR_ADJ, v, str(y + 1)))
 
     # 前3词（针对过长标题）
     words = cleaned.split()
     if len(words) > 3:
         short = " ".join(words[:3])
-        queries.append((short, year))
+        steps.append((SHORT, short, year))
         if year and year.isdigit():
-            queries.append((short, str(int(year) - 1)))
-            queries.append((short, str(int(year) + 1)))
+            steps.append((SHORT, short, str(int(year) - 1)))
+            steps.append((SHORT, short, str(int(year) + 1)))
 
     # 无年份兜底
     for v in all_variants:
-        queries.append((v, None))
+        steps.append((NO_YEAR, v, None))
 
-    # 去重保序
+    # 去重保序（同一查询保留最先出现的类型）
     seen = set()
     unique = []
-    for q in queries:
-        if q not in seen:
-            seen.add(q)
-            unique.append(q)
+    for kind, t, y in steps:
+        if (t, y) not in seen:
+            seen.add((t, y))
+            unique.append((kind, t, y))
+
+    # 模糊搜索
+    for v in all_variants:
+        unique.append((FUZZY, v, None))
     return unique
 
 
+def _build_search_queries(title: str, year: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """固定阶梯中的精确查询 (标题, 年份)，不含模糊搜索。"""
+    return [(t, y) for kind, t, y in _search_steps(title, year) if kind != FUZZY]
+
+
+# 响应里没有 usage 时，一次 AI 兜底按这么多 token 记账（提示词约 120 token + 简短回答）
+_AI_LOOKUP_TOKENS = 150
+
+
 def _get_ai_imdb_id(
     name: str,
     session: requests.Session,
@@ -199,15 +235,17 @@ def _get_ai_imdb_id(
                 "tools": [{"google_search": {}}],
                 "generationConfig": {"temperature": 0.1}
             }
-            resp = session.post(url, json=payload, timeout=timeout)
+            resp = session.post(url, json=payload, timeout=deadline.clamp(timeout))
             resp.raise_for_status()
-            candidates = resp.json().get('candidates', [])
+            data = resp.json()
+            quota.ledger.record_llm(quota.tokens_used(data, _AI_LOOKUP_TOKENS))
+            candidates = data.get('candidates', [])
             if not candidates: return None
             content = candidates[0]['content']['parts'][0]['text'].strip()
         else:
             api_key = CONFIG.get(f"{provider}_api_key")
             if not api_key:
-                logger.debug(f"AI兜底跳过: {provider}_api_key为空")
+                logger.debug("AI兜底跳过: %s_api_key为空", provider)
                 return None
             endpoint = CONFIG.get(f"{provider}_endpoint")
             headers = {
@@ -219,18 +257,144 @@ def _get_ai_imdb_id(
                 "messages": [{"role": "user", "content": prompt}],
                 "temperature": 0.1,
             }
-            resp = session.post(endpoint, headers=headers, json=payload, timeout=timeout)
+            resp = session.post(endpoint, headers=headers, json=payload, timeout=deadline.clamp(timeout))
             resp.raise_for_status()
-            content = resp.json()['choices'][0]['message']['content'].strip()
+            data = resp.json()
+            quota.ledger.record_llm(quota.tokens_used(data, _AI_LOOKUP_TOKENS))
+            content = data['choices'][0]['message']['content'].strip()
 
         logger.info(f"🤖 AI 兜底 '{name}' ({provider}) → {content}")
         match = re.search(r'tt\d{7,10}', content)
         return match.group(0) if match else None
     except Exception as e:
-        logger.debug(f"AI 兜底失败: {e}")
+        logger.debug("AI 兜底失败: %s", e)
         return None
 
 
+OMDB_URL = "https://www.omdbapi.com/"
+_NO_POSTER = "https://placehold.co/150x220?text=No+Poster"
+_NO_SUMMARY = ("N/A", "No summary available.", None, "")
+DEADLINE_REASON = "时间预算用尽，未查询"
+QUOTA_REASON = "OMDb 额度用尽，未查询"
+# 降级查询没查到：不是"查无此片"的结论，额度恢复后重新查询
+DEGRADED_REASON = "额度紧张，未走完整搜索阶梯"
+# 本地目录库中这么多天内更新过、字段齐全的电影直接复用，不再查询 OMDb
+_CATALOG_FRESH_DAYS = 7
+
+# 每个工作线程当前电影已发出的 OMDb 请求数（用于统计节省的调用次数）
+_call_counter = threading.local()
+# 每个工作线程当前电影的 imdbID 是哪一步解析出来的（写入别名表）
+_resolution = threading.local()
+# 最近一次 fetch_imdb_info_batch 中每部电影实际消耗的 OMDb 请求数（按电影名）
+omdb_calls_by_movie: Dict[str, int] = {}
+
+
+class _ResponseCache:
+    """
+    OMDb 响应的内存 LRU 缓存（带过期时间）。
+    键不含 apikey，换 Key 不影响命中；守护进程模式下跨刷新保留，重复查询不再发请求。
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 6 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(params: dict) -> tuple:
+        return tuple(sorted((k, v) for k, v in params.items() if k != "apikey"))
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if time.monotonic() - hit[0] > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def peek(self, key: tuple) -> Optional[dict]:
+        """只读查看（不刷新 LRU 顺序），供成本预测使用。"""
+        with self._lock:
+            hit = self._data.get(key)
+        if hit is None or time.monotonic() - hit[0] > self.ttl:
+            return None
+        return hit[1]
+
+    def put(self, key: tuple, value: dict):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+_omdb_cache = _ResponseCache()
+
+
+def _omdb_get(session: requests.Session, params: dict, timeout: int) -> dict:
+    """所有 OMDb 请求的统一出口：缓存 + 计数 + 状态码检查 + JSON 解析。"""
+    cache_key = _ResponseCache.key(params)
+    cached = _omdb_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    _call_counter.count = getattr(_call_counter, "count", 0) + 1
+    # 按 OMDb 实测延迟收紧超时；timeout（request_timeout）只作为上限
+    resp = timed_get(session, OMDB_URL, timeout, hedge=CONFIG["hedge_requests"], params=params)
+    resp.raise_for_status()
+    quota.ledger.record_omdb(params["apikey"])
+    data = resp.json()
+    # OMDb 的"未找到"也是 200 + Response=False，同样值得缓存；错误信息里带额度提示的不缓存
+    if data.get("Response") == "True" or "not found" in str(data.get("Error", "")).lower():
+        _omdb_cache.put(cache_key, data)
+    return data
+
+
+def _cost_features(movie: MovieRecord) -> dict:
+    """成本预测用的特征（见 cost_model.predict），与 _fetch_single_movie 的查询路径一一对应。"""
+    parts = movie.name.rsplit(" ", 1)
+    title = parts[0]
+    year = parts[1] if len(parts) > 1 and parts[1].isdigit() else None
+    alias = None if movie.imdb else aliases.peek(movie)
+    imdb_id = movie.imdb or (alias and alias[0])
+    if imdb_id:
+        first = {"i": imdb_id, "plot": "full"}
+    else:
+        first = {"t": clean_title_for_search(title), "type": "movie", "plot": "full"}
+        if year:
+            first["y"] = year
+    cached = _omdb_cache.peek(_ResponseCache.key(first))
+    # 按规划后（不含随机探索）的阶梯计数，剪掉的步骤不计成本
+    steps = planner.plan(title_shape(clean_title_for_search(title)), _search_steps(title, year),
+                         adaptive=not cassette_active(), explore=False, tally=False) if year else []
+    if cached is None:
+        cache = None
+    elif cached.get("Response") == "True":
+        cache = cost_model.CACHE_HIT
+    else:
+        cache = cost_model.CACHE_NEGATIVE
+    return {
+        "has_id": bool(imdb_id),
+        "has_year": year is not None,
+        "words": len(title.split()),
+        "non_ascii": not title.isascii(),
+        "ladder": sum(kind != FUZZY for kind, _, _ in steps),
+        "fuzzy": sum(kind == FUZZY for kind, _, _ in steps),
+        "cache": cache,
+    }
+
+
+def _plan(movies: Sequence[MovieRecord]) -> Tuple[List[int], Dict[str, float], Dict[str, dict]]:
+    """预测每部电影的查询成本，返回 (提交顺序, 预测值, 特征)。"""
+    features = {m.name: _cost_features(m) for m in movies}
+    predicted = {name: cost_model.predict(f) for name, f in features.items()}
+    order = cost_model.schedule([predicted[m.name] for m in movies])
+    return order, predicted, features
+
+
 def _fetch_omdb_by_id(
     imdb_id: str,
     omdb_api_key: str,
@@ -241,13 +405,7 @@ def _fetch_omdb_by_id(
     """通过 IMDb ID 向 OMDb 获取详情。"""
     if delay:
         time.sleep(delay)
-    resp = session.get(
-        "https://www.omdbapi.com/",
-        params={"apikey": omdb_api_key, "i": imdb_id, "plot": "full"},
-        timeout=timeout
-    )
-    resp.raise_for_status()
-    data = resp.json()
+    data = _omdb_get(session, {"apikey": omdb_api_key, "i": imdb_id, "plot": "full"}, timeout)
     return data if data.get("Response") == "True" else None
 
 
@@ -263,7 +421,7 @@ def _extract_result(data: dict) -> Tuple[str, str, str, Optional[str], str]:
     year_str  = data.get("Year", "").strip()
     official_name = f"{title_str} {year_str}".strip() if title_str else ""
     if not image_url or image_url == "N/A":
-        image_url = "https://placehold.co/150x220?text=No+Poster"
+        image_url = _NO_POSTER
     
     metascore = data.get("Metascore", "N/A")
     return rating, summary, image_url, imdb_id, official_name, metascore
@@ -277,6 +435,7 @@ def _do_get_imdb_info(
     使用 OMDb API 获取电影信息，四阶段搜索策略：
     1. 精确 title+year 搜索（多变体 × 年份±1）
     2. 模糊搜索（OMDb ?s= 接口）取第一个匹配
+       （1、2 的先后与取舍由 search_planner 按同类标题的历史命中率规划）
     3. AI 推理 IMDb ID（Mistral 兜底）
     4. 全部失败返回 None
 
@@ -301,79 +460,102 @@ def _do_get_imdb_info(
     delay_max = CONFIG["retry_delay_max"]
 
     def _delay() -> float:
+        deadline.check()  # 每次请求前的取消点
+        if replaying_without_latency():
+            return 0.0
         d = random.uniform(delay_min, delay_max)
         time.sleep(d)
         return d
 
-    # ── 阶段 1：精确搜索（t=, y=）────────────────────────────
-    queries = _build_search_queries(title, year)
-    for search_title, search_year in queries:
-        params = {
-            "apikey": omdb_api_key,
-            "t": search_title,
-            "type": "movie",
-            "plot": "full",
-        }
-        if search_year:
-            params["y"] = search_year
-        try:
-            _delay()
-            resp = session.get("https://www.omdbapi.com/", params=params, timeout=timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            if data.get("Response") == "True":
-                rating, summary, image_url, imdb_id, official_name, metascore = _extract_result(data)
-                if summary in ("N/A", "No summary available.", None, ""):
-                    logger.debug(f"找到但简介为空: '{search_title}' (y={search_year})，继续尝试")
+    # ── 阶段 1+2：精确搜索（t=, y=）与模糊搜索（s=），顺序由 planner 按历史命中率规划 ──
+    shape = title_shape(clean_title_for_search(title))
+    steps = planner.plan(shape, _search_steps(title, year), adaptive=not cassette_active())
+    # 额度紧张时按档位收窄阶梯（见 quota 模块）
+    level = quota.ledger.level(key_manager.active_keys())
+    if level >= quota.NARROW:
+        steps = [step for step in steps if step[0] != NO_YEAR]
+    tried: List[str] = []
+    hit_kind = None
+    try:
+        for kind, search_title, search_year in steps:
+            if level >= quota.MINIMAL and getattr(_call_counter, "count", 0) >= quota.MINIMAL_QUERIES:
+                logger.debug("💳 额度紧张，已达每部请求上限，停止搜索: %s", name)
+                raise KeyExhaustedException(DEGRADED_REASON)
+            if kind == FUZZY:
+                logger.debug("🔍 模糊搜索: '%s'", search_title)
+                try:
+                    _delay()
+                    search_data = _omdb_get(
+                        session, {"apikey": omdb_api_key, "s": search_title, "type": "movie"}, timeout
+                    )
+                    tried.append(kind)
+                    if search_data.get("Response") == "True" and search_data.get("Search"):
+                        imdb_id = search_data["Search"][0].get("imdbID")
+                        if imdb_id:
+                            data = _fetch_omdb_by_id(imdb_id, omdb_api_key, session, timeout, _delay())
+                            if data:
+                                rating, summary, image_url, imdb_id, official_name, metascore = _extract_result(data)
+                                logger.debug("✅ 模糊命中: '%s' → %s", search_title, imdb_id)
+                                _resolution.stage = STAGE_FUZZY
+                                hit_kind = kind
+                                return rating, summary, image_url, imdb_id, official_name, metascore
+                except CircuitOpenError:
+                    raise
+                except requests.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 401:
+                        raise e
+                    logger.debug("模糊搜索异常: %s", e)
                     continue
-                logger.debug(f"✅ 精确命中: '{search_title}' (y={search_year})")
-                return rating, summary, image_url, imdb_id, official_name, metascore
-            else:
-                logger.debug(f"OMDb 未命中: '{search_title}' (y={search_year}) → {data.get('Error')}")
-        except requests.HTTPError as e:
-            if e.response is not None and e.response.status_code == 401:
-                raise e
-            logger.warning(f"网络错误 [{name}]: {e}")
-            return None, None, None, None, None, None
-        except (requests.ConnectionError, requests.Timeout) as e:
-            logger.warning(f"网络错误 [{name}]: {e}")
-            return None, None, None, None, None, None
-        except Exception as e:
-            logger.warning(f"未知错误 [{name}]: {e}")
-            return None, None, None, None, None, None
+                except Exception as e:
+                    logger.debug("模糊搜索异常: %s", e)
+                    continue
+                continue
+
+            params = {
+                "apikey": omdb_api_key,
+                "t": search_title,
+                "type": "movie",
+                "plot": "full",
+            }
+            if search_year:
+                params["y"] = search_year
+            try:
+                _delay()
+                data = _omdb_get(session, params, timeout)
+                tried.append(kind)
+                if data.get("Response") == "True":
+                    rating, summary, image_url, imdb_id, official_name, metascore = _extract_result(data)
+                    if summary in _NO_SUMMARY:
+                        logger.debug("找到但简介为空: '%s' (y=%s)，继续尝试", search_title, search_year)
+                        continue
+                    logger.debug("✅ 精确命中: '%s' (y=%s)", search_title, search_year)
+                    _resolution.stage = STAGE_EXACT
+                    hit_kind = kind
+                    return rating, summary, image_url, imdb_id, official_name, metascore
+                else:
+                    logger.debug("OMDb 未命中: '%s' (y=%s) → %s", search_title, search_year, data.get('Error'))
+            except CircuitOpenError:
+                raise
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 401:
+                    raise e
+                logger.warning(f"网络错误 [{name}]: {e}")
+                return None, None, None, None, None, None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logger.warning(f"网络错误 [{name}]: {e}")
+                return None, None, None, None, None, None
+            except Exception as e:
+                logger.warning(f"未知错误 [{name}]: {e}")
+                return None, None, None, None, None, None
+    finally:
+        planner.observe(shape, tried, hit_kind)
 
-    # ── 阶段 2：模糊搜索（s=）────────────────────────────────
-    cleaned = clean_title_for_search(title)
-    for fuzzy_title in normalize_title_variants(cleaned):
-        logger.debug(f"🔍 模糊搜索: '{fuzzy_title}'")
-        try:
-            _delay()
-            resp = session.get(
-                "https://www.omdbapi.com/",
-                params={"apikey": omdb_api_key, "s": fuzzy_title, "type": "movie"},
-                timeout=timeout
-            )
-            resp.raise_for_status()
-            search_data = resp.json()
-            if search_data.get("Response") == "True" and search_data.get("Search"):
-                imdb_id = search_data["Search"][0].get("imdbID")
-                if imdb_id:
-                    data = _fetch_omdb_by_id(imdb_id, omdb_api_key, session, timeout, _delay())
-                    if data:
-                        rating, summary, image_url, imdb_id, official_name, metascore = _extract_result(data)
-                        logger.debug(f"✅ 模糊命中: '{fuzzy_title}' → {imdb_id}")
-                        return rating, summary, image_url, imdb_id, official_name, metascore
-        except requests.HTTPError as e:
-            if e.response is not None and e.response.status_code == 401:
-                raise e
-            logger.debug(f"模糊搜索异常: {e}")
-            continue
-        except Exception as e:
-            logger.debug(f"模糊搜索异常: {e}")
-            continue
     # ── 阶段 3：AI 推理兜底 ───────────────────────────────────
+    if level >= quota.NO_AI or not quota.ledger.llm_plentiful():
+        logger.debug("💳 额度紧张，跳过 AI 兜底: %s", name)
+        raise KeyExhaustedException(DEGRADED_REASON)
     provider = CONFIG.get("imdb_lookup_provider", "mistral").lower()
-    logger.debug(f"🤖 所有搜索失败，尝试 AI 兜底 ({provider}): '{name}'")
+    logger.debug("🤖 所有搜索失败，尝试 AI 兜底 (%s): '%s'", provider, name)
     ai_imdb_id = _get_ai_imdb_id(name, session, timeout)
     if ai_imdb_id:
         try:
@@ -381,15 +563,18 @@ def _do_get_imdb_info(
             if data:
                 rating, summary, image_url, _, official_name, metascore = _extract_result(data)
                 if rating and summary:
-                    logger.debug(f"✅ AI 兜底命中: '{name}' → {ai_imdb_id}")
+                    logger.debug("✅ AI 兜底命中: '%s' → %s", name, ai_imdb_id)
+                    _resolution.stage = STAGE_AI
                     return rating, summary, image_url, ai_imdb_id, official_name, metascore
+        except CircuitOpenError:
+            raise
         except requests.HTTPError as e:
             if e.response is not None and e.response.status_code == 401:
                 raise e
-            logger.debug(f"AI 兜底 OMDb 验证异常: {e}")
+            logger.debug("AI 兜底 OMDb 验证异常: %s", e)
         except Exception as e:
-            logger.debug(f"AI 兜底 OMDb 验证异常: {e}")
-    logger.debug(f"❌ 所有搜索均失败: {name}")
+            logger.debug("AI 兜底 OMDb 验证异常: %s", e)
+    logger.debug("❌ 所有搜索均失败: %s", name)
     return None, None, None, None, None, None
 
 
@@ -397,7 +582,8 @@ def get_imdb_info(name: str) -> Tuple[Optional[str], Optional[str], Optional[str
     while True:
         api_key = key_manager.get_key()
         if not api_key:
-            os._exit(1)
+            # 不再退出进程：由调用方停止提交，已完成的结果照常进入后续阶段
+            raise KeyExhaustedException(QUOTA_REASON)
         try:
             return _do_get_imdb_info(name, api_key)
         except requests.HTTPError as e:
@@ -408,23 +594,35 @@ def get_imdb_info(name: str) -> Tuple[Optional[str], Optional[str], Optional[str
             return None, None, None, None, None, None
 
 
-def _fetch_single_movie(movie: Dict) -> Optional[Tuple[str, str, str, str, Optional[str], str]]:
-    """线程工作函数：获取单部电影的 IMDb 信息。"""
-    name = movie['name']
-    imdb_id_from_torrent = movie.get('imdb')
-    
+def _fetch_single_movie(movie: MovieRecord) -> MovieRecord:
+    """线程工作函数：获取单部电影的 IMDb 信息，原地写入 movie 并返回。"""
+    name = movie.name
+    imdb_id_from_torrent = movie.imdb
+    _resolution.stage = None
+    # 种子没带 ID 时查别名表：以前解析过的同名/同种子直接走 ?i=，同样要过相似度校验
+    alias = None
+    if not imdb_id_from_torrent:
+        alias = aliases.lookup(movie)
+        if alias:
+            imdb_id_from_torrent = alias[0]
+            logger.debug("🔖 别名命中: %s → %s (%s)", name, *alias)
+
     if imdb_id_from_torrent:
         # 1. 有 ID 的情况，直达 OMDb
         session = get_session_with_retries()
         timeout = CONFIG["request_timeout"]
         data = None
+        answered = False  # OMDb 明确答复过（区分 ID 无效与网络错误）
         while True:
             api_key = key_manager.get_key()
             if not api_key:
-                raise SkipMovieException("API Key 耗尽")
+                raise KeyExhaustedException(QUOTA_REASON)
             try:
                 data = _fetch_omdb_by_id(imdb_id_from_torrent, api_key, session, timeout)
+                answered = True
                 break
+            except CircuitOpenError:
+                raise
             except requests.HTTPError as e:
                 if e.response is not None and e.response.status_code == 401:
                     key_manager.mark_exhausted(api_key)
@@ -449,103 +647,397 @@ def _fetch_single_movie(movie: Dict) -> Optional[Tuple[str, str, str, str, Optio
             threshold = float(CONFIG.get("similarity_threshold", 0.70))
             if similarity >= threshold and rating != "N/A":
                 # 完美命中
-                pass
+                _resolution.stage = alias[1] if alias else STAGE_TORRENT
             else:
                 if similarity < threshold:
-                    msg = f"⚠️ 相似度拦截: 种子 [{name}] 与 OMDb [{official_name}] 相似度仅为 {similarity:.2f}！尝试回退模糊搜索。"
-                    logger.warning(msg)
-                    try:
-                        os.makedirs("output", exist_ok=True)
-                        with open("output/rejected_movies.log", "a", encoding="utf-8") as f:
-                            f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {msg}\n")
-                    except Exception:
-                        pass
+                    logger.warning(
+                        "⚠️ 相似度拦截: 种子 [%s] 与 OMDb [%s] 相似度仅为 %.2f！尝试回退模糊搜索。",
+                        name, official_name, similarity,
+                    )
+                    audit("rejected", name, reason="similarity", imdb_id=imdb_id,
+                          omdb_name=official_name, similarity=round(similarity, 3))
+                    if alias:
+                        aliases.invalidate(movie, alias[0])
                 else:
-                    logger.debug(f"ID命中但无评分(N/A)，尝试回退模糊搜索: {name}")
+                    logger.debug("ID命中但无评分(N/A)，尝试回退模糊搜索: %s", name)
                 rating, summary, image_url, imdb_id, official_name, metascore = get_imdb_info(name)
         else:
             logger.warning(f"⚠️ 提供的 IMDb ID 无效或超时: {imdb_id_from_torrent} ({name})，尝试回退模糊搜索。")
+            if alias and answered:
+                aliases.invalidate(movie, alias[0])
             rating, summary, image_url, imdb_id, official_name, metascore = get_imdb_info(name)
     else:
         # 2. 没有 ID 的情况，走原有的搜索逻辑
         rating, summary, image_url, imdb_id, official_name, metascore = get_imdb_info(name)
 
+    # 解析出的 imdbID 记入别名表（评分是否达标不影响这个结论）
+    if imdb_id and _resolution.stage:
+        aliases.learn(movie, imdb_id, _resolution.stage)
+
     # image_url 可能为空（OMDb 新片海报未收录），不纳入必要条件
     if rating and summary:
-        # 在拿到 OMDb 实时评分后，进行二次严格校验
-        min_rating = CONFIG.get("yts_minimum_rating", 0.0)
-        
-        # 拒绝暂无评分的新片
-        if rating == "N/A":
-            raise SkipMovieException("暂无评分 (未上映或无大众评分)")
-            
-        # 拒绝评分低于要求的老片
-        try:
-            if float(rating) < min_rating:
-                raise SkipMovieException(f"评分过低 ({rating} < {min_rating})")
-        except ValueError:
-            pass
-            
-        # 增加 Metascore 过滤 (免疫粉丝刷榜)
-        min_metascore = CONFIG.get("yts_minimum_metascore", 40)
-        
-        if metascore == "N/A":
-            raise SkipMovieException("无 Metascore (非主流院线或刷榜片)")
-        try:
-            if int(metascore) < min_metascore:
-                raise SkipMovieException(f"Metascore 过低 ({metascore} < {min_metascore})")
-        except ValueError:
-            pass
-            
-        return name, rating, summary, image_url, imdb_id, official_name
+        # 同一 imdbID 时，OMDb 缺简介/海报的用列表来源（YTS）自带的补上
+        if imdb_id and imdb_id == movie.imdb:
+            if summary in _NO_SUMMARY and movie.summary_en:
+                summary = movie.summary_en
+            if image_url == _NO_POSTER and movie.image_url:
+                image_url = movie.image_url
+        _check_thresholds(rating, metascore)
+        movie.apply_omdb(rating, summary, image_url, imdb_id, official_name, metascore,
+                         fetched_at=time.time())
+        return movie
 
     raise SkipMovieException("查无此片或详情不完整")
 
 
-def fetch_imdb_info_batch(movie_list: List[Dict]) -> Tuple[List[dict], List[str]]:
+def _check_thresholds(rating: str, metascore: str):
+    """拿到实时评分后的严格校验，不达标时抛出 SkipMovieException。"""
+    min_rating = CONFIG.get("yts_minimum_rating", 0.0)
+
+    # 拒绝暂无评分的新片
+    if rating == "N/A":
+        raise SkipMovieException("暂无评分 (未上映或无大众评分)")
+
+    # 拒绝评分低于要求的老片
+    try:
+        if float(rating) < min_rating:
+            raise SkipMovieException(f"评分过低 ({rating} < {min_rating})")
+    except ValueError:
+        pass
+
+    # 增加 Metascore 过滤 (免疫粉丝刷榜)
+    min_metascore = CONFIG.get("yts_minimum_metascore", 40)
+
+    if metascore == "N/A":
+        raise SkipMovieException("无 Metascore (非主流院线或刷榜片)")
+    try:
+        if int(metascore) < min_metascore:
+            raise SkipMovieException(f"Metascore 过低 ({metascore} < {min_metascore})")
+    except ValueError:
+        pass
+
+
+def _fetch_counted(movie: MovieRecord) -> MovieRecord:
+    """包一层计数：无论成功或跳过，都记下这部电影消耗了多少次 OMDb 请求。"""
+    _call_counter.count = 0
+    try:
+        with correlation(movie.name):
+            return _fetch_single_movie(movie)
+    finally:
+        omdb_calls_by_movie[movie.name] = _call_counter.count
+
+
+def enrich_one(movie: MovieRecord) -> Tuple[Optional[MovieRecord], Optional[str], bool]:
+    """
+    查询单部电影并归类结果，返回 (补全后的记录, 失败原因, 是否可重试)。
+    可重试的失败（Key 耗尽、OMDb 熔断、时间预算用尽、程序异常）不是电影本身的结论，不应写入断点日志或队列结果。
+    """
+    if deadline.expired():
+        return None, DEADLINE_REASON, True
+    try:
+        result = _fetch_counted(movie)
+    except deadline.DeadlineExceeded:
+        return None, DEADLINE_REASON, True
+    except KeyExhaustedException as exc:
+        return None, str(exc), True
+    except CircuitOpenError as exc:
+        return None, f"OMDb 暂时不可用: {exc}", True
+    except SkipMovieException as exc:
+        return None, str(exc), False
+    except Exception as exc:
+        logger.error(f'\n电影 {movie.name} 处理异常: {type(exc).__name__}')
+        return None, f"程序异常: {type(exc).__name__}", True
+    if result is None:
+        return None, "原因未知: result 为 None", True
+    return result, None, False
+
+
+def _cached_rating(imdb_id: str) -> Optional[Tuple[str, str]]:
+    """内存缓存中该 imdbID 的 (评分, Metascore)，没有缓存时返回 None。"""
+    data = _omdb_cache.peek(_ResponseCache.key({"i": imdb_id, "plot": "full"}))
+    if data is None or data.get("Response") != "True":
+        return None
+    return data.get("imdbRating", "N/A"), data.get("Metascore", "N/A")
+
+
+def prefilter_candidates(movie_list: Sequence[MovieRecord]) -> Tuple[List[MovieRecord], List[str]]:
+    """
+    查询前用廉价信号剔除确定不达标的电影（见 prefilter 模块）。
+    返回 (仍需查询的电影, 剔除说明列表)，并报告省下的查询次数。
+    """
+    min_rating = CONFIG.get("yts_minimum_rating", 0.0)
+    min_metascore = CONFIG.get("yts_minimum_metascore", 40)
+    stored = catalog_lookup((m.imdb for m in movie_list), max_age_days=prefilter.MAX_AGE_DAYS)
+    kept, dropped = prefilter.prefilter(movie_list, min_rating, min_metascore, stored, _cached_rating)
+    if not dropped:
+        logger.info(f"🪓 预过滤：{len(movie_list)} 部均需查询 OMDb")
+        return kept, []
+
+    by_source: Dict[str, int] = {}
+    calls_avoided = 0.0
+    for movie, reason, source in dropped:
+        by_source[source] = by_source.get(source, 0) + 1
+        calls_avoided += cost_model.predict(_cost_features(movie))
+        audit("prefiltered", movie.name, reason=reason, signal=source)
+    sources = "，".join(f"{k} {v} 部" for k, v in sorted(by_source.items()))
+    logger.info(
+        f"🪓 预过滤：{len(movie_list)} 部中 {len(dropped)} 部确定不达标（{sources}），"
+        f"免去 {len(dropped)} 次查询，约 {calls_avoided:.0f} 次 OMDb 请求"
+    )
+    return kept, [f"{m.name} (预过滤: {reason})" for m, reason, _ in dropped]
+
+
+def resolve_from_catalog(movie_list: Sequence[MovieRecord],
+                         target: Optional[int] = None) -> Tuple[List[MovieRecord], List[MovieRecord], List[str]]:
+    """
+    带 imdbID 的候选（YTS 全部带，Apibay 部分带）先查本地目录库：近 _CATALOG_FRESH_DAYS 天内
+    （OMDb 额度紧张时放宽到 prefilter.MAX_AGE_DAYS 天）从 OMDb 取得过且评分、Metascore、简介齐全的，
+    直接套用并做同样的严格校验，不发 OMDb 请求。
+    target 为凑满目标模式的目标部数，用于估算本轮实际要查询的量。
+    返回 (本地补全的记录, 仍需查询的电影, 校验未通过的说明)。
+    """
+    # 额度紧张时优先用本地数据：放宽到预过滤同样的时效
+    need = _expected_need(sum(cost_model.predict(_cost_features(m)) for m in movie_list), len(movie_list), target)
+    fresh_days = _CATALOG_FRESH_DAYS
+    if quota.ledger.forecast(need, key_manager.active_keys()) >= quota.NARROW:
+        fresh_days = prefilter.MAX_AGE_DAYS
+        logger.info(f"💳 OMDb 额度紧张，本地目录库中 {fresh_days} 天内的记录直接复用")
+    stored = catalog_lookup((m.imdb for m in movie_list), max_age_days=fresh_days)
+    resolved, remaining, failed = [], [], []
+    for movie in movie_list:
+        rec = stored.get(movie.imdb) if movie.imdb else None
+        if rec is None or rec.summary_en in _NO_SUMMARY or "N/A" in (rec.rating, rec.metascore):
+            remaining.append(movie)
+            continue
+        try:
+            _check_thresholds(rec.rating, rec.metascore)
+        except SkipMovieException as exc:
+            failed.append(f"{movie.name} ({exc})")
+            audit("skipped", movie.name, reason=str(exc), signal="catalog")
+            continue
+        movie.apply_omdb(rec.rating, rec.summary_en, rec.image_url or movie.image_url or _NO_POSTER,
+                         movie.imdb, rec.official_name, rec.metascore, fetched_at=rec.fetched_at)
+        resolved.append(movie)
+    if resolved or failed:
+        logger.info(
+            f"📦 本地目录命中 {len(resolved) + len(failed)} 部（{len(resolved)} 部通过校验），"
+            f"无需查询 OMDb；其余 {len(remaining)} 部继续查询"
+        )
+    return resolved, remaining, failed
+
+
+def _target_window(need: int, passed: int, finished: int, max_workers: int) -> int:
     """
-    并行获取一批电影的 OMDb 信息。
-    返回 (成功的结果列表, 失败的电影名称列表)
+    凑满目标模式下允许同时在途的查询数：按目前的通过率估算还需要查几部，
+    不多于工作线程数。通过率用 (通过+1)/(完成+2) 平滑，开局按一半估计。
+    """
+    if need <= 0:
+        return 0
+    rate = (passed + 1) / (finished + 2)
+    return max(1, min(max_workers, math.ceil(need / rate)))
+
+
+def _expected_need(unsubmitted_cost: float, unsubmitted: int, target: Optional[int] = None,
+                   counted: int = 0, passed: int = 0, finished: int = 0, in_flight: int = 0) -> float:
+    """
+    预计还需要多少次 OMDb 请求（额度档位的分母）。
+    不设目标时所有未提交的候选都会查询；凑满目标时只会再查约 (target - 已计入) / 通过率 部
+    （通过率同 _target_window 平滑），按未提交候选的平均预测成本折算，
+    不把 catalog 模式下成千上万的候选全部算进去。
+    """
+    if target is None or unsubmitted <= 0:
+        return unsubmitted_cost
+    rate = (passed + 1) / (finished + 2)
+    lookups = min(max(math.ceil(max(target - counted, 0) / rate) - in_flight, 0), unsubmitted)
+    return lookups * unsubmitted_cost / unsubmitted
+
+
+def fetch_imdb_info_batch(movie_list: Sequence[MovieRecord], journal: Optional[Journal] = None,
+                          target: Optional[int] = None,
+                          have: Sequence[MovieRecord] = ()) -> Tuple[List[MovieRecord], List[str]]:
+    """
+    并行获取一批电影的 OMDb 信息（movie_list 可以是 MovieBatch 或 MovieRecord 列表）。
+    传入 journal 时，每完成一部就追加到断点日志；已在日志中的电影直接复用结果不再查询。
+    target 不为空时为"凑满目标"模式：按来源排名依次提交，通过校验的不同 imdbID 达到 target 部
+    即停止提交，在途的查询完成后返回，其余候选不再查询。have（本地目录命中等不需查询的已通过记录）
+    与断点恢复的结果一样按排名并入：排名在下一个待提交候选之前的才计入目标。
+    返回 (补全了 OMDb 字段的记录列表, 失败的电影名称列表)
     """
     max_workers = CONFIG["max_workers"]
     total = len(movie_list)
-    results_ordered = [None] * total
+    results_ordered: List[Optional[MovieRecord]] = [None] * total
     failed_movies = []
     completed = 0
 
+    # ── 断点续跑：恢复上次已完成（含已确认跳过）的电影 ──────────
+    done = journal.load() if journal else {}
+    pending = []
+    for i, movie in enumerate(movie_list):
+        entry = done.get(movie.name)
+        if entry is None:
+            pending.append((i, movie))
+        elif entry.get('result'):
+            results_ordered[i] = MovieRecord.from_dict(entry['result'])
+        else:
+            failed_movies.append(f"{movie.name} ({entry.get('reason')})")
+    completed = total - len(pending)
+    omdb_calls_by_movie.clear()
+
+    # 按预测成本安排提交顺序（结果仍按原顺序输出）；凑满目标时必须按来源排名，
+    # 这样停下时排名在前的候选都已查过，结果就是前 N 部有效电影
+    order, predicted, features = _plan([movie for _, movie in pending])
+    if target is not None:
+        order.sort(key=lambda k: (pending[k][1].rank, k))
+    # 不需查询的已通过记录（本地目录命中、断点恢复的结果）按排名排好，等提交前沿越过它们才计入目标；
+    # 否则排名靠后的本地命中会提前凑满目标，排名在前的候选反而没有查询
+    known = sorted([*have, *(r for r in results_ordered if r is not None)], key=lambda r: r.rank)
+    passed_ids: set = set()
+    passed = finished = cut_short = out_of_quota = 0
+    next_pos = known_pos = 0
+    in_flight: Dict = {}
+
+    def _counted() -> int:
+        """计入目标的不同 imdbID 数：查询通过的 + 排名在下一个待提交候选之前的已知记录。"""
+        nonlocal known_pos
+        frontier = pending[order[next_pos]][1].rank if next_pos < len(order) else math.inf
+        while known_pos < len(known) and known[known_pos].rank < frontier:
+            passed_ids.add(known[known_pos].imdb_id)
+            known_pos += 1
+        return len(passed_ids)
+
+    # 尚未提交的候选的预测成本之和，用于估算剩余额度需求
+    unsubmitted_cost = sum(predicted.get(movie.name, 0.0) for _, movie in pending)
+
+    def _need() -> float:
+        return _expected_need(unsubmitted_cost, len(order) - next_pos, target,
+                              _counted() if target is not None else 0, passed, finished, len(in_flight))
+
+    # 额度紧张时同样按来源排名，额度先花在排名靠前的候选上
+    level = quota.ledger.begin(_need(), key_manager.active_keys())
+    if target is None and level > quota.FULL:
+        order.sort(key=lambda k: (pending[k][1].rank, k))
+
+    def _fill(executor: ThreadPoolExecutor):
+        # 按窗口逐步提交（而不是一次全部提交），时间预算或 OMDb 额度用尽时剩下的直接不再提交
+        nonlocal next_pos, unsubmitted_cost
+        if deadline.expired() or key_manager.get_key() is None:
+            return
+        while next_pos < len(order):
+            limit = max_workers * 2 if target is None else \
+                _target_window(target - _counted(), passed, finished, max_workers)
+            if len(in_flight) >= limit:
+                return
+            k = order[next_pos]
+            next_pos += 1
+            unsubmitted_cost -= predicted.get(pending[k][1].name, 0.0)
+            in_flight[executor.submit(enrich_one, pending[k][1])] = pending[k]
+
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_idx = {
-            executor.submit(_fetch_single_movie, movie): (i, movie['name'])
-            for i, movie in enumerate(movie_list)
-        }
-        for future in as_completed(future_to_idx):
-            i, name = future_to_idx[future]
-            completed += 1
-            print(
-                f"\r正在获取 OMDb 信息: {completed}/{total} "
-                f"({completed * 100 // total}%)",
-                end='', flush=True
-            )
-            try:
-                result = future.result()
+        _fill(executor)
+        while in_flight:
+            done_futures, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                i, movie = in_flight.pop(future)
+                name = movie.name
+                completed += 1
+                finished += 1
+                result, reason, retryable = future.result()
+                if target is None:
+                    quota.ledger.finish(predicted.get(name, 0.0))
                 if result:
-                    _, rating, summary, image_url, imdb_id, official_name = result
-                    results_ordered[i] = {
-                        'name':          official_name if official_name else name,
-                        'rating':        rating,
-                        'summary_en':    summary,
-                        'image_url':     image_url,
-                        'imdb_id':       imdb_id,
-                    }
+                    results_ordered[i] = result
+                    passed += 1
+                    passed_ids.add(result.imdb_id)
+                    if journal:
+                        journal.append(name, {'result': result.to_dict()})
+                elif reason == DEADLINE_REASON:
+                    cut_short += 1
+                elif reason == QUOTA_REASON:
+                    out_of_quota += 1
+                else:
+                    failed_movies.append(f"{name} ({reason})")
+                    if retryable:
+                        audit("failed", name, reason=reason, retryable=True)
+                    else:
+                        audit("skipped", name, reason=reason)
+                        # 已付费得出"跳过"结论的也记下，续跑时不必再查
+                        if journal:
+                            journal.append(name, {'reason': reason})
+                if target is None:
+                    progress = f"{completed}/{total} ({completed * 100 // total}%)"
                 else:
-                    failed_movies.append(f"{name} (原因未知: result 为 None)")
-            except SkipMovieException as exc:
-                failed_movies.append(f"{name} ({exc})")
-            except Exception as exc:
-                logger.error(f'\n电影 {name} 处理异常: {type(exc).__name__}')
-                failed_movies.append(f"{name} (程序异常: {type(exc).__name__})")
+                    progress = f"已通过 {min(_counted(), target)}/{target}，已查询 {finished} 部"
+                print(f"\r正在获取 OMDb 信息: {progress}", end='', flush=True)
+            if target is not None:
+                # 凑满目标：随通过率重新估算还要查几部
+                quota.ledger.reforecast(_need())
+            _fill(executor)
 
     print()  # 换行
 
+    unqueried = len(order) - next_pos
+    if deadline.expired() and (unqueried or cut_short):
+        logger.warning(f"⏳ 时间预算用尽：{unqueried + cut_short} 部未查询，保留已完成的 {passed} 部（下次运行重新查询）")
+        failed_movies.append(f"其余 {unqueried + cut_short} 部 ({DEADLINE_REASON})")
+    elif key_manager.get_key() is None and (unqueried or out_of_quota):
+        logger.warning(f"💳 OMDb 额度用尽：{unqueried + out_of_quota} 部未查询，保留已完成的 {passed} 部（额度恢复后重新查询）")
+        failed_movies.append(f"其余 {unqueried + out_of_quota} 部 ({QUOTA_REASON})")
+    elif target is not None:
+        if unqueried:
+            logger.info(f"🎯 已凑满 {target} 部有效电影，剩余 {unqueried} 部候选未查询")
+        elif _counted() < target:
+            logger.warning(f"⚠️ 候选已全部查询，仅 {_counted()} 部通过校验（目标 {target} 部）")
+
+    if journal:
+        journal.sync()
+    cost_model.record(predicted, features, omdb_calls_by_movie)
+    planner.save()
+    quota.ledger.save()
+
     raw_results = [r for r in results_ordered if r is not None]
     return raw_results, failed_movies
+
+
+def fetch_imdb_info_queued(movie_list: Sequence[MovieRecord], queue_path: str) -> Tuple[List[MovieRecord], List[str]]:
+    """
+    分布式 enrich：把待查询电影发布到共享工作队列，本进程也作为一个 worker 参与，
+    等其它 worker（./run.sh worker）手上的条目全部完成后收集结果。
+    同一批电影重复发布视为续跑，已完成的条目不再查询（队列本身即断点日志）。
+    """
+    queue = WorkQueue(queue_path)
+    run_id = hashlib.sha1("\n".join(m.name for m in movie_list).encode("utf-8")).hexdigest()[:16]
+    # 按预测成本排好发布顺序，worker 按发布顺序认领；collect 仍按这个顺序返回，结果再按原顺序排回
+    order, predicted, features = _plan(movie_list)
+    if quota.ledger.begin(sum(predicted.values()), key_manager.active_keys()) > quota.FULL:
+        order.sort(key=lambda k: (movie_list[k].rank, k))
+    remaining = queue.publish(run_id, [movie_list[k] for k in order])
+    logger.info(f"📮 已发布到工作队列 {queue_path}：{len(movie_list)} 部，其中 {remaining} 部待处理")
+
+    def _process(movie: MovieRecord):
+        try:
+            return enrich_one(movie)
+        finally:
+            quota.ledger.finish(predicted.get(movie.name, 0.0))
+
+    omdb_calls_by_movie.clear()
+    run_worker(queue, _process, CONFIG["max_workers"], calls_by_name=omdb_calls_by_movie,
+               should_stop=lambda: key_manager.get_key() is None or deadline.expired(), wait_for_others=True)
+    results, failed_movies, calls = queue.collect()
+    omdb_calls_by_movie.update(calls)
+    cost_model.record(predicted, features, calls)
+    planner.save()
+    quota.ledger.save()
+    position = {m.name: i for i, m in enumerate(movie_list)}
+    results.sort(key=lambda r: position.get(r.name, len(position)))
+    return results, failed_movies
+
+
+def run_queue_worker(queue_path: str) -> int:
+    """独立 worker：处理共享队列中的条目直到队列清空，返回处理的条目数。"""
+    try:
+        return run_worker(WorkQueue(queue_path), enrich_one, CONFIG["max_workers"],
+                          calls_by_name=omdb_calls_by_movie,
+                          should_stop=lambda: key_manager.get_key() is None)
+    finally:
+        planner.save()
+        quota.ledger.save()
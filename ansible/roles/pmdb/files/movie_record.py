@@ -0,0 +1,177 @@
+"""
+电影记录的统一数据结构。
+
+MovieRecord：单部电影，__slots__ 定义字段，从列表抓取一路传到 HTML 渲染，
+             各阶段原地补全字段，不再在 dict / 元组之间来回转换。
+MovieBatch： 列式批容器，数值列用 array 存、字符串列用 list 存，
+             大目录（数千部候选）时比逐条对象省内存；按下标取出时才生成 MovieRecord。
+
+两者都支持 to_dict / from_dict，直接用于 JSONL 产物、断点日志与列表缓存。
+本模块只依赖标准库。
+"""
+import re
+from array import array
+from typing import Iterable, Iterator, List, Optional
+
+_YEAR_RE = re.compile(r'(\d{4})')
+
+# 列式容器里的占位值（array 不能存 None / "N/A"）
+_UNKNOWN = -1   # 尚未查询（None）
+_NA = -2        # OMDb 返回 "N/A"
+_NO_YEAR = 0
+
+
+class MovieRecord:
+    __slots__ = (
+        "name",           # 候选名 "Title Year"（去重键、断点日志键）
+        "imdb",           # 来源自带的 imdbID（种子/YTS 提供，可能为空）
+        "raw_name",       # 来源原始名称（种子全名）
+        "source",         # 来源标识，如 apibay:207 / yts / web
+        "rank",           # 来源排名（1 起），跨阶段保持不变
+        "rating",         # IMDb 评分字符串，"N/A" 表示暂无
+        "metascore",      # Metascore 字符串，"N/A" 表示暂无
+        "summary_en",
+        "summary_cn",
+        "image_url",
+        "imdb_id",        # OMDb 确认的 imdbID
+        "official_name",  # OMDb 官方 "Title Year"
+        "list_rating",    # 来源列表自带的评分（YTS rating，即 IMDb 评分快照），只用于查询前预过滤
+        "fetched_at",     # 评分等 OMDb 数据实际取自 OMDb 的时间（epoch 秒）；复用本地目录库时沿用库中原值
+    )
+
+    def __init__(self, name: str, imdb: Optional[str] = None, raw_name: str = "",
+                 source: str = "", rank: int = 0, **fields):
+        self.name = name
+        self.imdb = imdb or None
+        self.raw_name = raw_name or name
+        self.source = source
+        self.rank = rank
+        self.rating = fields.get("rating")
+        self.metascore = fields.get("metascore")
+        self.summary_en = fields.get("summary_en")
+        self.summary_cn = fields.get("summary_cn")
+        self.image_url = fields.get("image_url")
+        self.imdb_id = fields.get("imdb_id")
+        self.official_name = fields.get("official_name")
+        self.list_rating = fields.get("list_rating")
+        self.fetched_at = fields.get("fetched_at")
+
+    @property
+    def display_name(self) -> str:
+        """展示用片名：OMDb 官方片名优先，没有则用候选名。"""
+        return self.official_name or self.name
+
+    @property
+    def year(self) -> Optional[int]:
+        match = _YEAR_RE.search(self.official_name or "") or _YEAR_RE.search(self.name.rsplit(" ", 1)[-1])
+        return int(match.group(1)) if match else None
+
+    def apply_omdb(self, rating, summary, image_url, imdb_id, official_name, metascore,
+                   fetched_at: Optional[float] = None):
+        """写入 OMDb 查询结果（字段顺序与 _extract_result 一致）；fetched_at 为这份数据取自 OMDb 的时间。"""
+        self.fetched_at = fetched_at
+        self.rating = rating
+        self.summary_en = summary
+        self.image_url = image_url
+        self.imdb_id = imdb_id
+        self.official_name = official_name
+        self.metascore = metascore
+
+    def to_dict(self) -> dict:
+        """只序列化非空字段，产物和日志更紧凑。"""
+        return {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) not in (None, "")}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "MovieRecord":
+        return cls(**{k: v for k, v in d.items() if k in cls.__slots__})
+
+    def __repr__(self):
+        return f"MovieRecord({self.display_name!r}, imdb_id={self.imdb_id!r}, rating={self.rating!r})"
+
+
+class MovieBatch:
+    """
+    列式电影批容器。
+    - 字符串列用 list（同一来源标识等重复字符串共享同一对象）
+    - 排名/年份/评分/Metascore/列表评分 用 array，每个值 2~4 字节；OMDb 取数时间用 8 字节 double（保留秒级精度）
+    按下标或迭代取出的是新建的 MovieRecord（拷贝），修改它不会写回批容器。
+    """
+
+    _STR_COLUMNS = ("name", "imdb", "raw_name", "source", "summary_en", "summary_cn",
+                    "image_url", "imdb_id", "official_name")
+
+    def __init__(self):
+        for col in self._STR_COLUMNS:
+            setattr(self, col, [])
+        self.rank = array("I")
+        self.year = array("H")
+        self.rating = array("f")
+        self.metascore = array("h")
+        self.list_rating = array("f")
+        self.fetched_at = array("d")
+        self._sources = {}
+
+    def __len__(self) -> int:
+        return len(self.name)
+
+    def append(self, record: MovieRecord):
+        for col in self._STR_COLUMNS:
+            getattr(self, col).append(getattr(record, col))
+        # 来源标识重复度极高，复用同一个字符串对象
+        self.source[-1] = self._sources.setdefault(record.source, record.source)
+        self.rank.append(record.rank or len(self.name))
+        self.year.append(record.year or _NO_YEAR)
+        self.rating.append(_encode_number(record.rating))
+        self.metascore.append(int(_encode_number(record.metascore)))
+        self.list_rating.append(_encode_number(record.list_rating))
+        self.fetched_at.append(_UNKNOWN if record.fetched_at is None else record.fetched_at)
+
+    def extend(self, records: Iterable[MovieRecord]):
+        for r in records:
+            self.append(r)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return MovieBatch.from_records(self[j] for j in range(*i.indices(len(self))))
+        rec = MovieRecord(self.name[i], self.imdb[i], self.raw_name[i], self.source[i], self.rank[i])
+        for col in self._STR_COLUMNS[4:]:
+            setattr(rec, col, getattr(self, col)[i])
+        rec.rating = _decode_number(self.rating[i], "{:.1f}")
+        rec.metascore = _decode_number(self.metascore[i], "{:d}")
+        rec.list_rating = _decode_number(self.list_rating[i], "{:.1f}")
+        rec.fetched_at = None if self.fetched_at[i] == _UNKNOWN else self.fetched_at[i]
+        return rec
+
+    def __iter__(self) -> Iterator[MovieRecord]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @classmethod
+    def from_records(cls, records: Iterable[MovieRecord]) -> "MovieBatch":
+        batch = cls()
+        batch.extend(records)
+        return batch
+
+    @classmethod
+    def from_dicts(cls, dicts: Iterable[dict]) -> "MovieBatch":
+        return cls.from_records(MovieRecord.from_dict(d) for d in dicts)
+
+    def to_dicts(self) -> List[dict]:
+        return [r.to_dict() for r in self]
+
+
+def _encode_number(value) -> float:
+    if value is None:
+        return _UNKNOWN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _NA
+
+
+def _decode_number(value, fmt: str) -> Optional[str]:
+    if value == _UNKNOWN:
+        return None
+    if value == _NA:
+        return "N/A"
+    return fmt.format(value)
@@ -0,0 +1,95 @@
+/*
+ * 页面内搜索：读取 html_generator.py 内嵌的 #search-index（由 search_index.py 生成），
+ * 按前缀查词、取交集，再按评分/年份区间过滤，只切换 .movie-item 的显隐。
+ * tokenize() 的分词规则须与 search_index.py 保持一致。
+ */
+(function () {
+    var CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af';
+    var TOKEN_RE = new RegExp('[' + CJK + ']+|(?:(?![' + CJK + '])[\\p{L}\\p{N}])+', 'gu');
+    var CJK_RUN_RE = new RegExp('^[' + CJK + ']+$', 'u');
+
+    function tokenize(text) {
+        var tokens = [];
+        var runs = text.normalize('NFKC').toLowerCase().match(TOKEN_RE) || [];
+        runs.forEach(function (run) {
+            if (CJK_RUN_RE.test(run)) {
+                // 查询只切二元组：单字本身就是前缀，二元组按前缀也能命中段尾
+                if (run.length === 1) { tokens.push(run); return; }
+                for (var i = 0; i + 1 < run.length; i++) tokens.push(run.slice(i, i + 2));
+            } else {
+                tokens.push(run);
+            }
+        });
+        return tokens;
+    }
+
+    // 有序词表上二分查找第一个 >= prefix 的位置，向后合并所有以 prefix 开头的词项
+    function lookup(index, prefix) {
+        var terms = index.terms, lo = 0, hi = terms.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            if (terms[mid] < prefix) lo = mid + 1; else hi = mid;
+        }
+        var hits = new Set();
+        for (var i = lo; i < terms.length && terms[i].lastIndexOf(prefix, 0) === 0; i++) {
+            index.postings[i].forEach(function (doc) { hits.add(doc); });
+        }
+        return hits;
+    }
+
+    function search(index, query) {
+        var result = null;
+        var tokens = tokenize(query);
+        for (var t = 0; t < tokens.length; t++) {
+            var hits = lookup(index, tokens[t]);
+            if (result === null) {
+                result = hits;
+            } else {
+                result.forEach(function (doc) { if (!hits.has(doc)) result.delete(doc); });
+            }
+            if (result.size === 0) break;
+        }
+        return result;  // null 表示没有关键字，不按关键字过滤
+    }
+
+    function number(id) {
+        var value = document.getElementById(id).value.trim();
+        return value === '' ? null : Number(value);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var data = document.getElementById('search-index');
+        var box = document.getElementById('search');
+        if (!data || !box) return;
+        var index = JSON.parse(data.textContent);
+        var cards = document.querySelectorAll('.movie-item');
+        var status = document.getElementById('search-status');
+        var inputs = ['search-q', 'min-rating', 'max-rating', 'from-year', 'to-year'];
+
+        function apply() {
+            var matched = search(index, document.getElementById('search-q').value);
+            var minRating = number('min-rating'), maxRating = number('max-rating');
+            var fromYear = number('from-year'), toYear = number('to-year');
+            var shown = 0;
+            for (var i = 0; i < cards.length; i++) {
+                var rating = index.rating[i], year = index.year[i];
+                var ok = (matched === null || matched.has(i))
+                    && (minRating === null || (rating >= 0 && rating >= minRating * 10))
+                    && (maxRating === null || (rating >= 0 && rating <= maxRating * 10))
+                    && (fromYear === null || (year > 0 && year >= fromYear))
+                    && (toYear === null || (year > 0 && year <= toYear));
+                cards[i].hidden = !ok;
+                if (ok) shown++;
+            }
+            status.textContent = shown === cards.length ? '' : shown + ' / ' + cards.length + ' 部';
+        }
+
+        inputs.forEach(function (id) {
+            document.getElementById(id).addEventListener('input', apply);
+        });
+        document.getElementById('search-reset').addEventListener('click', function () {
+            inputs.forEach(function (id) { document.getElementById(id).value = ''; });
+            apply();
+        });
+    });
+})();
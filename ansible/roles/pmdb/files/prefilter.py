@@ -0,0 +1,79 @@
+"""
+查询 OMDb 之前的评分预过滤。
+
+_fetch_single_movie 要等 OMDb 完整解析（可能还走了 AI 兜底）之后才检查
+yts_minimum_rating / yts_minimum_metascore，被淘汰的电影白白消耗了额度和时间。
+这里用已经拿到或本地已有的廉价信号先筛一遍：
+  1. 本地目录库（catalog.sqlite，近 MAX_AGE_DAYS 天内从 OMDb 取得的）中同一 imdbID 的评分 / Metascore
+  2. 内存中已缓存的 OMDb 详情（守护进程模式下跨刷新保留）
+  3. 列表来源自带的评分（YTS rating 即 IMDb 评分快照）
+只有"确定不达标"的才在查询前剔除：评分低于门槛至少 _RATING_MARGIN、Metascore 低于门槛至少
+_METASCORE_MARGIN；落在边界附近、"N/A"（新片可能稍后才有分）或没有任何信号的照常查询，
+由查询后的严格校验决定。
+"""
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+# 评分会随时间小幅波动（列表快照、本地库都可能滞后），留出余量，只剔除明显不达标的
+_RATING_MARGIN = 0.3
+_METASCORE_MARGIN = 5
+# 本地目录库中超过这个天数没有从 OMDb 重新取得的评分不作为依据
+MAX_AGE_DAYS = 30
+
+# imdbID → (rating, metascore) 字符串（"N/A" 表示暂无），没有时返回 None
+Signal = Optional[Tuple[Optional[str], Optional[str]]]
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def verdict(rating, metascore, min_rating: float, min_metascore: int) -> Optional[str]:
+    """评分 / Metascore 确定不达标时返回原因，否则返回 None（需要查询确认）。"""
+    r = _as_float(rating)
+    if r is not None and r < min_rating - _RATING_MARGIN:
+        return f"评分过低 ({rating} < {min_rating})"
+    m = _as_float(metascore)
+    if m is not None and m < min_metascore - _METASCORE_MARGIN:
+        return f"Metascore 过低 ({metascore} < {min_metascore})"
+    return None
+
+
+def prefilter(movies: Sequence[MovieRecord], min_rating: float, min_metascore: int,
+              stored: Dict[str, MovieRecord], cached: Callable[[str], Signal]
+              ) -> Tuple[List[MovieRecord], List[Tuple[MovieRecord, str, str]]]:
+    """
+    stored：本地目录库按 imdbID 的记录（catalog_store.lookup 的结果）
+    cached：imdbID → 内存缓存中的 (rating, metascore)
+    返回 (需要查询的, [(剔除的, 原因, 信号来源)])，保持输入顺序。
+    """
+    kept, dropped = [], []
+    for movie in movies:
+        reason = source = None
+        if movie.imdb:
+            signals = []
+            if movie.imdb in stored:
+                rec = stored[movie.imdb]
+                signals.append(("catalog", (rec.rating, rec.metascore)))
+            hit = cached(movie.imdb)
+            if hit is not None:
+                signals.append(("omdb-cache", hit))
+            for source, (rating, metascore) in signals:
+                reason = verdict(rating, metascore, min_rating, min_metascore)
+                if reason:
+                    break
+        if not reason and movie.list_rating is not None:
+            source = movie.source or "list"
+            reason = verdict(movie.list_rating, None, min_rating, min_metascore)
+        if reason:
+            dropped.append((movie, reason, source))
+        else:
+            kept.append(movie)
+    return kept, dropped
@@ -0,0 +1,135 @@
+"""
+内置性能剖析（main.py --profile）。
+
+每个阶段运行期间：
+  - 后台线程按固定间隔采样所有线程的调用栈（sys._current_frames），
+    包括 OMDb 工作线程与翻译线程；等待网络的时间体现为 socket/ssl 栈帧
+  - tracemalloc 在阶段开始/结束各拍一张快照，按源码行统计新增内存
+阶段结束后写到 output/profile/：
+  <stage>.collapsed    折叠栈（每行 "线程;帧;帧;... 次数"），可直接喂给 flamegraph.pl / speedscope
+  <stage>.alloc.txt    新增内存 Top N（按源码行）与峰值
+
+未开启 --profile 时 stage() 返回空上下文，不启动线程、不启用 tracemalloc，没有额外开销。
+只依赖标准库。
+"""
+import os
+import re
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join("output", "profile")
+_SAMPLE_INTERVAL = 0.005
+_TRACEMALLOC_FRAMES = 10
+_TOP_N = 30
+# 线程池线程名带序号（ThreadPoolExecutor-0_3），折叠栈里按池归并
+_THREAD_SUFFIX = re.compile(r"_\d+$")
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="pmdb-profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            if not names.keys() >= frames.keys():
+                # 有新线程才重建名称表（线程池扩容、对冲线程等）
+                names = {t.ident: _THREAD_SUFFIX.sub("", t.name) for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    def __init__(self, out_dir: str = PROFILE_DIR, interval: float = _SAMPLE_INTERVAL, top_n: int = _TOP_N):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.top_n = top_n
+        os.makedirs(out_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def stage(self, name: str):
+        sampler = _Sampler(self.interval)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            self._write_collapsed(name, sampler)
+            self._write_allocations(name, before, after, current, peak, elapsed)
+            logger.info(
+                f"🔬 [{name}] 耗时 {elapsed:.2f} 秒，采样 {sampler.samples} 次，"
+                f"内存峰值 {peak / 1024 / 1024:.1f} MiB → {self.out_dir}/{name}.*"
+            )
+
+    def _write_collapsed(self, name: str, sampler: _Sampler):
+        path = os.path.join(self.out_dir, f"{name}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _write_allocations(self, name: str, before, after, current: int, peak: int, elapsed: float):
+        ignore = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        path = os.path.join(self.out_dir, f"{name}.alloc.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# 阶段 {name}: 耗时 {elapsed:.2f}s, 当前 {current / 1024:.0f} KiB, 峰值 {peak / 1024:.0f} KiB\n")
+            f.write(f"# 新增内存 Top {self.top_n}（按源码行）\n")
+            for stat in diff[:self.top_n]:
+                frame = stat.traceback[0]
+                f.write(
+                    f"{stat.size_diff / 1024:+10.1f} KiB  {stat.count_diff:+8d} 块  "
+                    f"{frame.filename}:{frame.lineno}\n"
+                )
+
+
+_active: Optional[Profiler] = None
+
+
+def enable(out_dir: str = PROFILE_DIR):
+    global _active
+    _active = Profiler(out_dir)
+    logger.info(f"🔬 性能剖析已开启：每 {_SAMPLE_INTERVAL * 1000:.0f}ms 采样一次调用栈，结果写入 {out_dir}/")
+
+
+def stage(name: str):
+    """阶段剖析上下文；未开启时是空上下文。"""
+    return _active.stage(name) if _active is not None else nullcontext()
@@ -0,0 +1,223 @@
+"""
+本地目录查询 API（JSON over HTTP）。
+
+数据来自 catalog_store 导出的 NDJSON（本次目录）或 SQLite（累积库），
+载入后在内存中建索引：
+  - imdbID → 记录 的哈希索引
+  - 按评分、按年份排好序的数组，范围过滤用 bisect 二分定位
+查询时先用最窄的有序索引圈出候选，再逐条套用剩余条件；
+排序用预先解析好的数值列，分页只取前 offset+per_page 条（heapq，不做全量排序）。
+
+路由：
+  GET /api/movies?min_rating=7.5&year=2024&q=dune&sort=rating&order=desc&page=1&per_page=20
+  GET /api/movies/<imdbID>
+  GET /api/stats
+只依赖标准库。
+"""
+import json
+import heapq
+import logging
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 200
+_SORT_FIELDS = ("rank", "rating", "year", "metascore", "name")
+
+
+class QueryError(ValueError):
+    """查询参数不合法（HTTP 400）。"""
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _SortedIndex:
+    """(值, 记录下标) 按值升序排列，缺值的记录不入索引。"""
+    __slots__ = ("keys", "positions")
+
+    def __init__(self, values: List[Optional[float]]):
+        pairs = sorted((v, i) for i, v in enumerate(values) if v is not None)
+        self.keys = [v for v, _ in pairs]
+        self.positions = [i for _, i in pairs]
+
+    def range(self, lo: Optional[float], hi: Optional[float]) -> List[int]:
+        start = bisect_left(self.keys, lo) if lo is not None else 0
+        end = bisect_right(self.keys, hi) if hi is not None else len(self.keys)
+        return self.positions[start:end]
+
+
+class CatalogIndex:
+    def __init__(self, records: List[MovieRecord]):
+        self.records = list(records)
+        self.by_id: Dict[str, MovieRecord] = {r.imdb_id: r for r in self.records if r.imdb_id}
+        self._years = [r.year for r in self.records]
+        self._ratings = [_as_float(r.rating) for r in self.records]
+        self._metascores = [_as_float(r.metascore) for r in self.records]
+        self._names = [r.display_name.lower() for r in self.records]
+        self._by_rating = _SortedIndex(self._ratings)
+        self._by_year = _SortedIndex(self._years)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, imdb_id: str) -> Optional[MovieRecord]:
+        return self.by_id.get(imdb_id)
+
+    def query(self, params: Dict[str, str]) -> dict:
+        min_rating = self._param(params, "min_rating", float)
+        max_rating = self._param(params, "max_rating", float)
+        year = self._param(params, "year", int)
+        from_year = year if year is not None else self._param(params, "from_year", int)
+        to_year = year if year is not None else self._param(params, "to_year", int)
+        min_metascore = self._param(params, "min_metascore", int)
+        text = (params.get("q") or "").strip().lower()
+        sort = params.get("sort") or "rank"
+        if sort not in _SORT_FIELDS:
+            raise QueryError(f"sort 只支持: {', '.join(_SORT_FIELDS)}")
+        descending = (params.get("order") or ("desc" if sort in ("rating", "metascore") else "asc")) == "desc"
+        page = max(self._param(params, "page", int) or 1, 1)
+        per_page = min(max(self._param(params, "per_page", int) or DEFAULT_PER_PAGE, 1), MAX_PER_PAGE)
+
+        # 1. 用有序索引圈出候选，取范围较窄的那个
+        ranges = []
+        if min_rating is not None or max_rating is not None:
+            ranges.append(self._by_rating.range(min_rating, max_rating))
+        if from_year is not None or to_year is not None:
+            ranges.append(self._by_year.range(from_year, to_year))
+        if ranges:
+            ranges.sort(key=len)
+            candidates = ranges[0]
+            for other in ranges[1:]:
+                keep = set(other)
+                candidates = [i for i in candidates if i in keep]
+        else:
+            candidates = range(len(self.records))
+
+        # 2. 逐条套用没有索引的条件
+        if min_metascore is not None:
+            candidates = [i for i in candidates
+                          if self._metascores[i] is not None and self._metascores[i] >= min_metascore]
+        if text:
+            candidates = [i for i in candidates if text in self._names[i]]
+        candidates = list(candidates)
+
+        # 3. 排序 + 分页：只取到当前页末尾为止
+        key = self._sort_key(sort, descending)
+        limit = page * per_page
+        if limit < len(candidates):
+            picked = heapq.nsmallest(limit, candidates, key=key)
+        else:
+            picked = sorted(candidates, key=key)
+        page_items = picked[(page - 1) * per_page:limit]
+        return {
+            "total": len(candidates),
+            "page": page,
+            "per_page": per_page,
+            "results": [self.records[i].to_dict() for i in page_items],
+        }
+
+    def stats(self) -> dict:
+        years = self._by_year.keys
+        ratings = self._by_rating.keys
+        return {
+            "movies": len(self.records),
+            "with_imdb_id": len(self.by_id),
+            "year_range": [years[0], years[-1]] if years else None,
+            "rating_range": [ratings[0], ratings[-1]] if ratings else None,
+        }
+
+    def _sort_key(self, sort: str, descending: bool) -> Callable[[int], tuple]:
+        # 记录下标本身就是来源排名顺序，作为所有排序的最终决胜键
+        if sort == "rank":
+            return (lambda i: -i) if descending else (lambda i: i)
+        if sort in ("rating", "year", "metascore"):
+            values = {"rating": self._ratings, "year": self._years, "metascore": self._metascores}[sort]
+            sign = -1 if descending else 1
+            # 缺值始终排在最后
+            return lambda i: (values[i] is None, sign * (values[i] or 0), i)
+        names = self._names
+        if descending:
+            # 字符串无法取负，先按名称升序定名次再反转
+            name_order = {n: k for k, n in enumerate(sorted(set(names)))}
+            return lambda i: (-name_order[names[i]], i)
+        return lambda i: (names[i], i)
+
+    @staticmethod
+    def _param(params: Dict[str, str], name: str, cast):
+        raw = params.get(name)
+        if raw in (None, ""):
+            return None
+        try:
+            return cast(raw)
+        except ValueError:
+            raise QueryError(f"参数 {name} 不合法: {raw!r}")
+
+
+def handle_api(index: Optional[CatalogIndex], path: str) -> Tuple[int, dict]:
+    """处理一次 /api/ 请求，返回 (HTTP 状态码, JSON 对象)；守护进程与独立服务共用。"""
+    parts = urlsplit(path)
+    route = parts.path.rstrip("/")
+    params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+    if index is None:
+        return 503, {"error": "目录尚未生成，请先运行流水线"}
+    try:
+        if route == "/api/movies":
+            return 200, index.query(params)
+        if route.startswith("/api/movies/"):
+            record = index.get(route[len("/api/movies/"):])
+            if record is None:
+                return 404, {"error": "未找到该 imdbID"}
+            return 200, record.to_dict()
+        if route == "/api/stats":
+            return 200, index.stats()
+    except QueryError as e:
+        return 400, {"error": str(e)}
+    return 404, {"error": "未知接口"}
+
+
+def send_json(handler: BaseHTTPRequestHandler, status: int, payload: dict, with_body: bool = True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json; charset=utf-8")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Cache-Control", "no-cache")
+    handler.end_headers()
+    if with_body:
+        handler.wfile.write(body)
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    server_version = "PMDB-Query"
+    index: Optional[CatalogIndex] = None  # 由 serve() 绑定
+
+    def do_GET(self):
+        send_json(self, *handle_api(self.index, self.path))
+
+    def do_HEAD(self):
+        send_json(self, *handle_api(self.index, self.path), with_body=False)
+
+    def log_message(self, fmt, *args):
+        logger.debug("HTTP %s - %s", self.address_string(), fmt % args)
+
+
+def serve(records: List[MovieRecord], host: str, port: int):
+    """独立运行查询服务（不刷新数据；需要定时刷新请用 daemon 子命令，/api/ 同样可用）。"""
+    _QueryHandler.index = CatalogIndex(records)
+    server = ThreadingHTTPServer((host, port), _QueryHandler)
+    server.daemon_threads = True
+    logger.info(f"🔎 查询服务已启动: http://{host}:{port}/api/movies （{len(records)} 部电影）")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,222 @@
+"""
+OMDb / LLM 每日额度记账与降级档位。
+
+免费 OMDb Key 每天 1000 次，LLM 提供商也常有每日请求数或 token 上限。以前额度紧张时，
+前面的电影照样走完整条搜索阶梯和 AI 兜底，到列表中途所有 Key 都 401 时进程直接退出。
+这里按 UTC 自然日记下每个 Key 与 LLM 的已用量（output/quota.json），运行前和运行中
+都拿"剩余额度 / 预计需求"的比值决定查询档位，额度越紧降得越多：
+  FULL     额度充足：完整阶梯 + AI 兜底
+  NO_AI    不再 AI 兜底（省下 LLM 额度留给翻译，也省一次 ?i=）
+  NARROW   再去掉不限年份的变体查询；本地目录库的评分放宽到 30 天内也直接复用
+  MINIMAL  每部电影至多 MINIMAL_QUERIES 次请求
+额度紧张（非 FULL）时按来源排名提交，额度先花在排名靠前的候选上；Key 真正耗尽时停止提交，
+已完成的结果照常进入翻译与渲染。翻译阶段同样在每批之前检查 LLM 剩余额度，不够时
+剩余批次保留英文原文，并优先复用本地目录库中原文未变的旧译文。
+
+已用量只是本机的估算（同一 Key 在别处的用量看不到），硬性边界仍以 OMDb 的 401 为准。
+写回时重新读取文件并累加本进程的增量（同 search_planner），多个 worker 共用输出目录也不会互相覆盖。
+只依赖标准库，不读取配置（额度上限由调用方传入）。
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+LEDGER_PATH = os.path.join("output", "quota.json")
+
+FULL, NO_AI, NARROW, MINIMAL = 0, 1, 2, 3
+LEVEL_NAMES = {FULL: "完整查询", NO_AI: "停用 AI 兜底", NARROW: "停用 AI 兜底与不限年份查询",
+               MINIMAL: "每部至多 {n} 次请求"}
+# 剩余额度 / 预计需求 低于这些比值时进入对应档位
+_LEVEL_RATIOS = ((0.3, MINIMAL), (0.6, NARROW), (1.0, NO_AI))
+MINIMAL_QUERIES = 3
+# LLM 剩余额度低于这个比例时不再把它花在 AI 兜底上，留给翻译
+_LLM_AI_RESERVE = 0.5
+# 已用量落盘的最小间隔（秒）；阶段结束时还会显式 save()
+_SAVE_INTERVAL = 5.0
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _fingerprint(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+
+
+def level_name(level: int) -> str:
+    return LEVEL_NAMES[level].format(n=MINIMAL_QUERIES)
+
+
+def _level_for(remaining: int, need: float) -> int:
+    ratio = remaining / need if need > 0 else float("inf")
+    return next((lv for bound, lv in _LEVEL_RATIOS if ratio < bound), FULL)
+
+
+class QuotaLedger:
+    def __init__(self, path: str = LEDGER_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._date = None
+        self._base: Dict[str, Dict[str, int]] = {}
+        # 本进程新增的用量，写回时累加到文件中的最新值上
+        self._delta: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._last_save = 0.0
+        self.omdb_limit = 0
+        self.llm_requests_limit = 0
+        self.llm_tokens_limit = 0
+        self._level = FULL
+        self._need = 0.0
+
+    def configure(self, omdb_daily_limit: int, llm_daily_requests: int = 0, llm_daily_tokens: int = 0):
+        """每轮开始时传入额度上限（0 = 不限）。"""
+        self.omdb_limit = omdb_daily_limit
+        self.llm_requests_limit = llm_daily_requests
+        self.llm_tokens_limit = llm_daily_tokens
+
+    def _read(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 读取额度记录失败，按今日未用计算: {e}")
+            return {}
+        return data.get("usage", {}) if data.get("date") == _today() else {}
+
+    def _used(self, bucket: str, name: str) -> int:
+        """调用方须持有 _lock。跨过 UTC 零点时自动清零。"""
+        today = _today()
+        if self._date != today:
+            self._date, self._base = today, self._read()
+            self._delta.clear()
+        return self._base.get(bucket, {}).get(name, 0) + self._delta.get(bucket, {}).get(name, 0)
+
+    def _add(self, bucket: str, name: str, n: int):
+        with self._lock:
+            self._used(bucket, name)
+            self._delta[bucket][name] += n
+            due = time.monotonic() - self._last_save >= _SAVE_INTERVAL
+        if due:
+            self.save()
+
+    # ── OMDb ──────────────────────────────────────────────
+    def record_omdb(self, api_key: str, calls: int = 1):
+        self._add("omdb", _fingerprint(api_key), calls)
+
+    def mark_spent(self, api_key: str):
+        """Key 返回 401：把今日用量记满，之后的运行不再指望它。"""
+        if not self.omdb_limit:
+            return
+        with self._lock:
+            left = self.omdb_limit - self._used("omdb", _fingerprint(api_key))
+        if left > 0:
+            self._add("omdb", _fingerprint(api_key), left)
+
+    def omdb_remaining(self, api_keys: Iterable[str]) -> Optional[int]:
+        """这些 Key 今日合计剩余次数；未设上限时返回 None。"""
+        if not self.omdb_limit:
+            return None
+        with self._lock:
+            return sum(max(self.omdb_limit - self._used("omdb", _fingerprint(k)), 0) for k in api_keys)
+
+    def forecast(self, need: float, api_keys: Iterable[str]) -> int:
+        """需要 need 次请求时会落在哪一档（不改变本轮状态，供查询前的准备步骤参考）。"""
+        remaining = self.omdb_remaining(api_keys)
+        return FULL if remaining is None else _level_for(remaining, need)
+
+    def begin(self, need: float, api_keys: Iterable[str]) -> int:
+        """一轮 enrich 开始：记下预计需要的请求数，返回起始档位。"""
+        remaining = self.omdb_remaining(api_keys)
+        level = FULL if remaining is None else _level_for(remaining, need)
+        with self._lock:
+            self._need = need
+            self._level = level
+        if remaining is not None:
+            logger.info(f"💳 OMDb 今日剩余约 {remaining} 次，本轮预计需要 {need:.0f} 次 → {level_name(level)}")
+        return level
+
+    def finish(self, predicted: float):
+        """一部电影查询完成：从预计需求中扣掉它的预测成本。"""
+        with self._lock:
+            self._need = max(self._need - predicted, 0.0)
+
+    def reforecast(self, need: float):
+        """重新给出剩余预计需求（凑满目标模式下随通过率变化，代替逐部 finish）；档位仍只升不降。"""
+        with self._lock:
+            self._need = max(need, 0.0)
+
+    def level(self, api_keys: Iterable[str]) -> int:
+        """按 剩余额度 / 剩余预计需求 决定当前档位；档位只升不降（同一轮内不反复切换）。"""
+        remaining = self.omdb_remaining(api_keys)
+        if remaining is None:
+            return FULL
+        with self._lock:
+            level = _level_for(remaining, self._need)
+            if level <= self._level:
+                return self._level
+            self._level = level
+        logger.warning(f"📉 OMDb 额度紧张（剩余约 {remaining} 次 / 预计还需 {self._need:.0f} 次），降级为：{level_name(level)}")
+        return level
+
+    # ── LLM ───────────────────────────────────────────────
+    def record_llm(self, tokens: int):
+        self._add("llm", "requests", 1)
+        self._add("llm", "tokens", max(int(tokens), 0))
+
+    def llm_allows(self, requests: int = 1, tokens: int = 0) -> bool:
+        """今日剩余 LLM 额度是否还够 requests 次请求、tokens 个 token。"""
+        with self._lock:
+            if self.llm_requests_limit and self._used("llm", "requests") + requests > self.llm_requests_limit:
+                return False
+            if self.llm_tokens_limit and self._used("llm", "tokens") + tokens > self.llm_tokens_limit:
+                return False
+        return True
+
+    def llm_plentiful(self) -> bool:
+        """剩余 LLM 额度是否宽裕到可以花在 AI 兜底上（各项上限都还剩一半以上）。"""
+        with self._lock:
+            for limit, used in ((self.llm_requests_limit, self._used("llm", "requests")),
+                                (self.llm_tokens_limit, self._used("llm", "tokens"))):
+                if limit and limit - used < limit * _LLM_AI_RESERVE:
+                    return False
+        return True
+
+    # ── 落盘 ──────────────────────────────────────────────
+    def save(self):
+        with self._lock:
+            self._last_save = time.monotonic()
+            if not self._delta:
+                return
+            usage = self._read()
+            for bucket, names in self._delta.items():
+                row = usage.setdefault(bucket, {})
+                for name, n in names.items():
+                    row[name] = row.get(name, 0) + n
+            self._date, self._base = _today(), usage
+            self._delta.clear()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"date": _today(), "usage": usage}, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"⚠️ 写入额度记录失败: {e}")
+
+
+def tokens_used(data: dict, fallback: int) -> int:
+    """从 LLM 响应中取实际 token 用量（OpenAI 兼容 usage / Gemini usageMetadata），没有时用估算值。"""
+    usage = data.get("usage") or {}
+    meta = data.get("usageMetadata") or {}
+    return usage.get("total_tokens") or meta.get("totalTokenCount") or fallback
+
+
+ledger = QuotaLedger()
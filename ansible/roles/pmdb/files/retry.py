@@ -2,6 +2,9 @@ import re
 import time
 import logging
 
+import deadline
+from circuit_breaker import CircuitOpenError, allow_retry
+
 logger = logging.getLogger("retry")
 
 _TRY_AGAIN_IN = re.compile(r"try again in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
@@ -52,10 +55,12 @@ def compute_retry_delay(
     return backoff_delay
 
 
-def with_retry(fn, retry_config: dict, label: str = "Operation"):
+def with_retry(fn, retry_config: dict, label: str = "Operation", host: str = None):
     """
     执行带有指数退避 (Exponential Backoff) 机制的操作重试。
     429 速率限制时优先采用 API 返回的建议等待时间。
+    传入 host 时每次重试先向该主机的重试预算申请额度；主机已熔断则立即失败，不再等待。
+    等待会超出当前阶段的时间预算时不再重试，抛出 DeadlineExceeded。
     """
     max_retries = retry_config["max_retries"]
     base_delay = retry_config["base_delay"]
@@ -66,6 +71,9 @@ def with_retry(fn, retry_config: dict, label: str = "Operation"):
     while True:
         try:
             return fn()
+        except CircuitOpenError as e:
+            logger.warning(f"[{label}] {e}，跳过重试")
+            raise e
         except Exception as e:
             attempt += 1
             err_msg = str(e)
@@ -97,9 +105,16 @@ def with_retry(fn, retry_config: dict, label: str = "Operation"):
                     )
                 raise e
 
+            if not allow_retry(host):
+                logger.warning(f"[{label}] {host} 重试预算已用尽或已熔断，放弃重试。错误: {err_msg}")
+                raise e
+
             delay = compute_retry_delay(
                 err_msg, attempt, base_delay, backoff_factor, max_delay
             )
+            if not deadline.allows(delay):
+                logger.warning(f"[{label}] 等待 {delay:.1f} 秒将超出时间预算，放弃重试。错误: {err_msg}")
+                raise deadline.DeadlineExceeded(f"[{label}] 时间预算不足以等待重试") from e
             if is_rate_limited(err_msg):
                 logger.warning(
                     f"[{label}] 第 {attempt} 次尝试触发速率限制，"
@@ -1,7 +1,7 @@
 #!/bin/bash
 # ============================================================
 # PMDB 运行脚本（由 Ansible 部署到 deploy_dir）
-# 用法：./run.sh
+# 用法：./run.sh [子命令]   （子命令透传给 main.py，如 render / translate，缺省为完整流程）
 # ============================================================
 
 set -e
@@ -41,7 +41,7 @@ source "${VENV_DIR}/bin/activate"
 echo "🚀 启动 PMDB..."
 echo ""
 cd "${INSTALL_DIR}"
-python main.py
+python main.py "$@"
 
 echo ""
 echo "============================================"
@@ -1,19 +1,36 @@
 """
-使用 Playwright 抓取 BT 站电影 Top 100。
+获取 BT 站热门电影列表。
+- 首选 Apibay JSON 榜单（可配置多个分类，并发 + 流式解析）
 - 支持多个备用源（从 config 读取 scraper_urls），依次降级尝试
+- ingest_mode = catalog 时合并所有榜单与多页 YTS，单遍跨源去重（数千部规模）
 - 没有任何硬编码的回退 URL。
 """
 import re
 import os
 import json
+import codecs
 import logging
+import itertools
 import requests
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
+import deadline
 from config_reader import CONFIG
+from http_client import get_session
+from latency import timed_get
+from movie_record import MovieBatch, MovieRecord
 
 logger = logging.getLogger(__name__)
 
+# 流式下载的分块大小；榜单条目都很小，64KB 一块足够摊薄解析开销
+_STREAM_CHUNK = 64 * 1024
+# YTS 单页上限（官方 API 最大 50）
+_YTS_PAGE_LIMIT = 50
+# 榜单/分页并发抓取线程数（都是轻量 GET，无需跟随 max_workers）
+_INGEST_WORKERS = 8
+# 列表源读取超时上限（秒），实际按该主机实测延迟自适应收紧
+_FEED_TIMEOUT = 10
+
 
 def _normalize_for_dedup(title: str) -> str:
     t = title.lower().strip()
@@ -48,6 +65,10 @@ def extract_title_year(name: str):
 
 
 def _fetch_from_url(url: str) -> list[str]:
+    # Playwright / BeautifulSoup 只有网页兜底才用得到，按需导入以免拖慢启动
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+    from bs4 import BeautifulSoup
+
     logger.info(f"正在抓取: {url}")
     with sync_playwright() as p:
         try:
@@ -84,9 +105,9 @@ def _fetch_from_url(url: str) -> list[str]:
         page = context.new_page()
 
         try:
-            page.goto(url, wait_until="networkidle", timeout=30000)
+            page.goto(url, wait_until="networkidle", timeout=deadline.clamp(30) * 1000)
             try:
-                page.wait_for_selector("li.list-entry", timeout=10000)
+                page.wait_for_selector("li.list-entry", timeout=deadline.clamp(10) * 1000)
                 logger.info("✅ 页面内容加载成功")
             except PlaywrightTimeout:
                 logger.warning("⚠️ 等待列表超时，尝试继续解析")
@@ -113,141 +134,282 @@ def _fetch_from_url(url: str) -> list[str]:
     return raw_names
 
 
-def _dedup_movies(raw_items: list) -> list[dict]:
+def _dedup_movies(raw_items: Iterable, sort: bool = True, source: str = "web") -> MovieBatch:
+    """
+    单遍去重：先按种子自带的 imdbID，再按 标准化标题+年份。
+    raw_items 可以是跨多个来源串起来的生成器，内存只保留去重后的条目。
+    rank 取首次出现时的输入顺序（即来源排名，多个榜单按先后串接），在排序之前确定；
+    sort 只影响返回顺序（按片名），sort=False 时保留输入顺序。
+    字符串条目记为 source 来源；字典条目可自带 "source"，以及来源提供的 "rating" / "summary" / "image"。
+    """
     unique = {}
+    seen_imdb = set()
     for item in raw_items:
         if isinstance(item, str):
             raw_name = item
             imdb_id = None
+            item_source = source
+            list_rating = summary = image = None
         else:
             raw_name = item.get('name', '')
             imdb_id = item.get('imdb')
+            item_source = item.get('source', source)
+            list_rating = item.get('rating')
+            summary = item.get('summary')
+            image = item.get('image')
 
+        if imdb_id and imdb_id in seen_imdb:
+            continue
         title, year = extract_title_year(raw_name)
         if not title or not year:
             continue
         norm_key = f"{_normalize_for_dedup(title)} {year}"
         if norm_key not in unique:
-            unique[norm_key] = {"name": f"{title.strip()} {year}", "imdb": imdb_id}
+            unique[norm_key] = MovieRecord(
+                f"{title.strip()} {year}", imdb_id, raw_name=raw_name, source=item_source,
+                list_rating=list_rating, summary_en=summary, image_url=image, rank=len(unique) + 1,
+            )
+            if imdb_id:
+                seen_imdb.add(imdb_id)
 
-    result = sorted(unique.values(), key=lambda x: x['name'])
-    logger.info(f"去重后剩余 {len(result)} 部电影")
-    return result
+    records = list(unique.values())
+    if sort:
+        records.sort(key=lambda r: r.name)
+    logger.info(f"去重后剩余 {len(records)} 部电影")
+    return MovieBatch.from_records(records)
 
 
-def _fetch_from_yts() -> list[str]:
+def _iter_json_array(resp: requests.Response, key: Optional[str] = None) -> Iterator[dict]:
+    """
+    流式解析 JSON 数组：边下载边逐个吐出数组元素，不把整个响应体读进内存再 json.loads。
+    key 不为空时，先跳到 "key": [ 之后再解析（YTS 的电影数组嵌套在 data.movies 里）。
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    in_array = False
+    marker = f'"{key}"' if key else None
+
+    for chunk in resp.iter_content(chunk_size=_STREAM_CHUNK):
+        buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+        if not in_array:
+            start = buf.find(marker) if marker else 0
+            bracket = buf.find("[", start) if start >= 0 else -1
+            if bracket < 0:
+                continue
+            pos = bracket + 1
+            in_array = True
+        while True:
+            # 跳过元素间的空白和逗号
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf) or buf[pos] == "]":
+                break
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # 元素不完整，等下一块数据
+            pos = end
+            yield obj
+        if pos < len(buf) and buf[pos] == "]":
+            return
+
+
+def _yts_page(domain: str, page: int) -> list[dict]:
+    """抓取 YTS 单页，返回候选条目列表（只保留需要的字段）。"""
+    url = f"https://{domain}/api/v2/list_movies.json"
+    params = {
+        "limit": _YTS_PAGE_LIMIT,
+        "sort_by": CONFIG.get("yts_sort_by", "date_added"),
+        "quality": CONFIG.get("yts_quality", "1080p"),                 # 只要高清，排除 CAM/TS
+        "minimum_rating": int(CONFIG.get("yts_minimum_rating", 6.0)),  # 低分/冷门外语片 YTS 侧直接过滤
+        "page": page,
+    }
+    # 镜像逐个探测：不在同一节点上重试；已熔断的节点直接跳过
+    with timed_get(get_session(retry=False), url, _FEED_TIMEOUT, hedge=CONFIG["hedge_requests"],
+                   params=params, stream=True) as resp:
+        resp.raise_for_status()
+        return [_yts_candidate(m) for m in _iter_json_array(resp, key="movies")]
+
+
+def _yts_candidate(m: dict) -> dict:
+    """
+    YTS 条目自带 imdbID、IMDb 评分、简介和封面：全部保留，
+    enrich 时走一次 ?i= 查 Metascore（或直接复用本地目录），不必再按片名搜索。
+    """
+    imdb = m.get("imdb_code") or ""
+    return {
+        "name": f"{m['title']} {m['year']}",
+        "imdb": imdb if imdb.startswith("tt") else None,
+        "source": "yts",
+        "rating": m.get("rating"),
+        "summary": m.get("description_full") or m.get("summary") or None,
+        "image": m.get("large_cover_image") or m.get("medium_cover_image") or None,
+    }
+
+
+def _fetch_yts_names() -> list[dict]:
+    """
+    依次探测 YTS 节点：第 1 页用来确认节点可用，其余页并发抓取。
+    返回按页序排列的候选条目（已过滤非 ASCII 标题）。
+    """
     # YTS 官方及镜像域名，将官方节点放在首位
     domains = [
-        "yts.mx", "yts.rs", "yify.mx", "yts.do", "yts.lt", 
+        "yts.mx", "yts.rs", "yify.mx", "yts.do", "yts.lt",
         "yts.ag", "yts.am", "yts.movie"
     ]
-    
+    pages = max(1, CONFIG["yts_pages"])
+
     for domain in domains:
-        url = f"https://{domain}/api/v2/list_movies.json"
-        movies = []
         try:
-            # 从配置读取过滤参数
-            sort_by     = CONFIG.get("yts_sort_by", "date_added")
-            quality     = CONFIG.get("yts_quality", "1080p")
-            min_rating  = CONFIG.get("yts_minimum_rating", 6.0)
-
-            # 抓取前两页（总计100部电影）
-            for page in [1, 2]:
-                params = {
-                    "limit": 50,
-                    "sort_by": sort_by,
-                    "quality": quality,           # 只要高清，排除 CAM/TS
-                    "minimum_rating": int(min_rating),  # 低分/冷门外语片 YTS 侧直接过滤
-                    "page": page
-                }
-                resp = requests.get(url, params=params, timeout=10)
-                resp.raise_for_status()
-                data = resp.json()
-
-                if data.get("status") == "ok" and "movies" in data.get("data", {}):
-                    for movie in data["data"]["movies"]:
-                        movies.append(f"{movie['title']} {movie['year']}")
-
-            # 额外过滤非 ASCII 标题（防止 OMDb 查询失败）
-            before = len(movies)
-            movies = [m for m in movies if all(ord(ch) < 128 for ch in m)]
-            filtered = before - len(movies)
-            if filtered:
-                logger.info(f"🔤 已过滤 {filtered} 个非英语标题")
-
-            if movies:
-                logger.info(f"✅ 成功连接 YTS 节点: {domain}，共 {len(movies)} 部")
-                return _dedup_movies(movies)
+            first = _yts_page(domain, 1)
+            if not first:
+                continue
+            with ThreadPoolExecutor(max_workers=_INGEST_WORKERS) as executor:
+                rest = list(executor.map(lambda p: _yts_page(domain, p), range(2, pages + 1)))
         except requests.exceptions.RequestException:
             logger.debug(f"YTS 节点 {domain} 连接失败，尝试下一个...")
             continue
-            
+
+        movies = first + [m for page in rest for m in page]
+        # 额外过滤非 ASCII 标题（防止 OMDb 查询失败）
+        before = len(movies)
+        movies = [m for m in movies if all(ord(ch) < 128 for ch in m["name"])]
+        filtered = before - len(movies)
+        if filtered:
+            logger.info(f"🔤 已过滤 {filtered} 个非英语标题")
+        logger.info(f"✅ 成功连接 YTS 节点: {domain}，{pages} 页共 {len(movies)} 部")
+        return movies
+
     # 如果全部失败，抛出异常让外部接管 fallback
     raise ConnectionError("所有 YTS 节点均连接失败 (可能被 DNS 污染)")
 
 
-def _fetch_from_apibay() -> list[dict]:
-    url = "https://apibay.org/precompiled/data_top100_207.json"
+def _fetch_from_yts() -> MovieBatch:
+    return _dedup_movies(_fetch_yts_names())
+
+
+def _apibay_feed(feed: str) -> list[dict]:
+    """流式抓取单个 Apibay 预编译榜单，返回 {"name", "imdb"} 列表（跳过合集）。"""
+    url = f"https://apibay.org/precompiled/data_top100_{feed}.json"
     logger.info(f"正在通过 API 获取: {url}")
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    
     raw_items = []
-    for item in data:
-        name = item.get("name", "")
-        if not name:
-            continue
-        if re.search(r'(?i)\b(pack|collection|bundle)\b', name):
-            logger.debug(f"跳过合集: {name}")
-            continue
-            
-        imdb = item.get("imdb")
-        if imdb and imdb.startswith("tt"):
-            raw_items.append({"name": name, "imdb": imdb})
-        else:
-            raw_items.append({"name": name, "imdb": None})
-            
+    with timed_get(get_session(retry=False), url, _FEED_TIMEOUT, hedge=CONFIG["hedge_requests"],
+                   stream=True) as resp:
+        resp.raise_for_status()
+        for item in _iter_json_array(resp):
+            name = item.get("name", "")
+            if not name:
+                continue
+            if re.search(r'(?i)\b(pack|collection|bundle)\b', name):
+                logger.debug(f"跳过合集: {name}")
+                continue
+
+            imdb = item.get("imdb")
+            raw_items.append({
+                "name": name,
+                "imdb": imdb if imdb and imdb.startswith("tt") else None,
+                "source": f"apibay:{feed}",
+            })
+    return raw_items
+
+
+def _fetch_apibay_feeds(feeds: list[str]) -> list[list[dict]]:
+    """并发抓取多个榜单，单个榜单失败只记日志，不影响其它榜单。结果按 feeds 顺序返回。"""
+    def _safe(feed: str) -> list[dict]:
+        try:
+            return _apibay_feed(feed)
+        except (Exception, deadline.DeadlineExceeded) as e:
+            # 超出时间预算的榜单同样只是缺一部分，已抓到的榜单照常使用
+            logger.warning(f"⚠️ Apibay 榜单 {feed} 获取失败 ({type(e).__name__}: {e})")
+            return []
+
+    with ThreadPoolExecutor(max_workers=_INGEST_WORKERS) as executor:
+        return list(executor.map(_safe, feeds))
+
+
+def _fetch_from_apibay() -> MovieBatch:
+    feeds = CONFIG.get("apibay_categories") or ["207"]
+    per_feed = _fetch_apibay_feeds(feeds)
+    raw_items = [item for items in per_feed for item in items]
     if not raw_items:
-        raise ValueError(f"API 返回数据为空或格式错误: {url}")
-        
+        raise ValueError(f"API 返回数据为空或格式错误: {', '.join(feeds)}")
+
     return _dedup_movies(raw_items)
 
 
-def get_top100_with_fallback() -> list[dict]:
+def get_catalog() -> MovieBatch:
+    """
+    大目录模式：并发抓取所有 Apibay 榜单 + 多页 YTS，单遍跨源去重，保留来源排名顺序。
+    任一来源失败都只是少一部分条目；全部失败时返回空列表交给调用方兜底。
+    """
+    feeds = CONFIG.get("apibay_categories") or ["207"]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        apibay_future = executor.submit(_fetch_apibay_feeds, feeds)
+        yts_future = executor.submit(_fetch_yts_names)
+        per_feed = apibay_future.result()
+        try:
+            yts_names = yts_future.result()
+        except (Exception, deadline.DeadlineExceeded) as e:
+            logger.warning(f"⚠️ YTS 获取失败 ({type(e).__name__}: {e})，仅使用 Apibay 榜单")
+            yts_names = []
+
+    # 生成器串联各来源，_dedup_movies 单遍消费，不额外拼接大列表
+    sources = itertools.chain(*per_feed, yts_names)
+    movies = _dedup_movies(sources, sort=False)
+    logger.info(
+        f"📚 大目录模式: Apibay {len(feeds)} 个榜单 {sum(len(x) for x in per_feed)} 条 + "
+        f"YTS {len(yts_names)} 条 → 去重后 {len(movies)} 部"
+    )
+    return movies
+
+
+def get_top100_with_fallback() -> MovieBatch:
     """
     获取 Top 100 电影列表，支持多源 Fallback。
     首选 Apibay JSON API，失败后从 CONFIG 中读取 scraper_urls 作为备用。
     """
     cache_file = "output/movies_cache.json"
 
-    # 1. 首选 Apibay API
+    # 1. 首选 Apibay API（大目录模式下合并所有榜单与多页 YTS）
     try:
-        logger.info("[首选源] 尝试 Apibay API (https://apibay.org/precompiled/data_top100_207.json)")
-        movies = _fetch_from_apibay()
+        if CONFIG.get("ingest_mode") == "catalog":
+            logger.info("[首选源] 大目录模式：Apibay 多榜单 + YTS 多页并发抓取")
+            movies = get_catalog()
+        else:
+            feeds = CONFIG.get("apibay_categories") or ["207"]
+            logger.info(f"[首选源] 尝试 Apibay API (分类: {', '.join(feeds)})")
+            movies = _fetch_from_apibay()
         if movies:
             logger.info(f"✅ 成功从 Apibay API 获取 {len(movies)} 部电影")
             os.makedirs(os.path.dirname(cache_file), exist_ok=True)
             with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(movies, f, ensure_ascii=False, indent=2)
+                json.dump(movies.to_dicts(), f, ensure_ascii=False, indent=2)
             return movies
         else:
             logger.warning("⚠️ Apibay API 返回空列表，尝试配置的 fallback 源")
-    except Exception as e:
+    except (Exception, deadline.DeadlineExceeded) as e:
         logger.warning(f"⚠️ Apibay API 失败 ({type(e).__name__}: {e})，尝试配置的 fallback 源")
 
-    # 兜底：读取缓存
+    # 兜底：读取缓存（不联网，时间预算用尽时也照常读取）
     if os.path.exists(cache_file):
         logger.warning(f"⚠️ Apibay API 失败，直接读取本地缓存兜底: {cache_file}")
         try:
             with open(cache_file, 'r', encoding='utf-8') as f:
-                movies = json.load(f)
+                movies = MovieBatch.from_dicts(json.load(f))
             if movies:
                 logger.info(f"✅ 成功从缓存读取 {len(movies)} 部电影")
                 return movies
         except Exception as e:
             logger.error(f"读取缓存失败: {e}")
 
+    # 其余备用源都要联网，时间预算用尽时不再尝试
+    if deadline.expired():
+        logger.error("⏳ 列表阶段时间预算用尽，放弃其余备用源")
+        return MovieBatch()
+
     # 2. 备用 1：YTS API
     try:
         logger.info("[备用源 1] 尝试 YTS API (https://yts.mx/api/v2/list_movies.json)")
@@ -270,7 +432,7 @@ def get_top100_with_fallback() -> list[dict]:
         try:
             logger.info(f"[源 {i+1}/{len(urls)}] 尝试: {url}")
             raw_names = _fetch_from_url(url)
-            movies = _dedup_movies(raw_names)
+            movies = _dedup_movies(raw_names, source="web")
             if movies:
                 logger.info(f"✅ 成功从 {url} 获取 {len(movies)} 部电影")
                 return movies
@@ -0,0 +1,88 @@
+"""
+output.html 的客户端搜索索引（生成页面时预先算好，内嵌进页面）。
+
+页面上的电影多了以后，想找某部片只能 Ctrl+F 逐屏翻。这里在渲染时对每张卡片的
+片名（官方片名 + 候选名）、中文简介、英文简介建一份倒排索引，以 JSON 内嵌进 output.html，
+页面脚本（output/template.js）按前缀查词、取交集、再按评分/年份区间过滤，只切换卡片的显隐，
+不在 DOM 里逐个扫描文本。
+
+分词规则（template.js 中的 tokenize() 与这里保持一致）：
+  - 先 NFKC 归一化并转小写（全角字母数字 → 半角）
+  - 中日韩文字连续段按二元组切分（"肖申克的救赎" → 肖申 申克 克的 的救 救赎），
+    段尾单字也单独收录，这样任意单字都是某个词项的前缀，输入一个字也能查到
+  - 其它文字按字母数字连续段切词
+查询时每个词按前缀匹配（有序词表上二分查找），多个词之间取交集。
+
+索引格式（紧凑 JSON）：
+  {"terms": [有序词表], "postings": [[卡片下标, ...], ...],
+   "year": [年份, 未知为 0], "rating": [评分 × 10, 暂无为 -1]}
+卡片下标即页面上 .movie-item 的顺序（从 0 起）。本模块只依赖标准库。
+"""
+import re
+import json
+import unicodedata
+from typing import Dict, Iterable, List, Sequence, Set
+
+from movie_record import MovieRecord
+
+# 中日韩文字：假名、CJK 统一表意文字（含扩展 A）、兼容表意文字、韩文音节
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|(?:(?![{_CJK}])[^\W_])+")
+_CJK_RUN_RE = re.compile(rf"[{_CJK}]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """把一段文本切成索引词项（可重复，调用方自行去重）。"""
+    if not text:
+        return []
+    tokens = []
+    for run in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower()):
+        if _CJK_RUN_RE.fullmatch(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _fields(movie: MovieRecord) -> Iterable[str]:
+    yield movie.display_name
+    if movie.name != movie.display_name:
+        yield movie.name
+    # "N/A" 是 OMDb 的占位值，不当作正文
+    for text in (movie.summary_cn, movie.summary_en):
+        if text and text != "N/A":
+            yield text
+
+
+def _rating10(value) -> int:
+    try:
+        return round(float(value) * 10)
+    except (TypeError, ValueError):
+        return -1
+
+
+def build_index(movies: Sequence[MovieRecord]) -> dict:
+    """按页面顺序为各卡片建倒排索引，返回可直接 json.dumps 的 dict。"""
+    postings: Dict[str, Set[int]] = {}
+    for idx, movie in enumerate(movies):
+        for text in _fields(movie):
+            for term in tokenize(text):
+                postings.setdefault(term, set()).add(idx)
+    # 按 UTF-16 码元排序，与页面脚本里字符串 < 比较的顺序一致（BMP 以外的字符两者排法不同）
+    terms = sorted(postings, key=lambda t: t.encode("utf-16-be"))
+    return {
+        "terms": terms,
+        "postings": [sorted(postings[t]) for t in terms],
+        "year": [m.year or 0 for m in movies],
+        "rating": [_rating10(m.rating) for m in movies],
+    }
+
+
+def index_json(movies: Sequence[MovieRecord]) -> str:
+    """
+    内嵌用的 JSON 文本：不含多余空白；"<" 转义为 \\u003c，
+    正文里出现 "</script>" 也不会提前结束 <script> 块。
+    """
+    text = json.dumps(build_index(movies), ensure_ascii=False, separators=(",", ":"))
+    return text.replace("<", "\\u003c")
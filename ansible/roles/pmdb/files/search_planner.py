@@ -0,0 +1,163 @@
+"""
+按历史命中率为每部电影规划 OMDb 搜索阶梯。
+
+固定阶梯（精确变体 → 年份±1 → 前3词 → 不限年份 → 模糊 ?s=）对多数标题合适，
+但某些形态的标题（很长、含 & / 连字符、非英文）历史上几乎总在后面的步骤才命中，
+前面的查询只是白白消耗额度。这里按"标题形态"分桶，统计每类步骤的 尝试/命中 次数：
+  - 形态：词数档（1-2 / 3-4 / 5+）+ 是否含 &/and、连字符或冒号、非 ASCII
+  - 步骤类型：exact（首个变体×精确年份）/ variant（其它变体×精确年份）/ year_adj（年份±1）/
+             short（前3词）/ no_year（不限年份）/ fuzzy（?s= 模糊搜索，命中后还要一次 ?i=）
+规划时按 命中率 / 单次成本 从高到低排序（依次尝试、命中即停时使期望请求数最小的顺序），
+样本足够且几乎从不命中的步骤类型直接剪掉；exact 永不剪（成本预测按它判断缓存状态）。
+命中率用 (命中+1)/(尝试+2) 平滑，样本少时接近 0.5，不会因一两次偶然结果大幅调整。
+以 _EXPLORE_RATE 的概率按固定阶梯查询（不排序、不剪枝），让被剪掉或排到后面的步骤的统计保持新鲜。
+
+统计保存在 output/search_stats.json；写回时重新读取文件并累加本进程的增量，
+多个队列 worker 共用同一输出目录也不会互相覆盖（最坏只丢一次并发写入的增量）。
+只依赖标准库，不读取配置。
+"""
+import os
+import re
+import json
+import random
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATS_PATH = os.path.join("output", "search_stats.json")
+
+EXACT, VARIANT, YEAR_ADJ, SHORT, NO_YEAR, FUZZY = "exact", "variant", "year_adj", "short", "no_year", "fuzzy"
+
+_EXPLORE_RATE = 0.1
+# 同一形态下某类步骤至少尝试这么多次、平滑命中率仍低于 _PRUNE_BELOW 才剪掉
+_MIN_TRIES_TO_PRUNE = 50
+_PRUNE_BELOW = 0.02
+# 模糊搜索命中后还要一次 ?i= 取详情
+_FUZZY_EXTRA_CALL = 1.0
+
+# (步骤类型, 查询标题, 查询年份)
+Step = Tuple[str, str, Optional[str]]
+
+
+def title_shape(title: str) -> str:
+    """标题形态分桶键，如 "w5+,amp,intl"。"""
+    words = len(title.split())
+    parts = ["w1-2" if words <= 2 else "w3-4" if words <= 4 else "w5+"]
+    if "&" in title or re.search(r"\band\b", title, re.IGNORECASE):
+        parts.append("amp")
+    if re.search(r"[-:]", title):
+        parts.append("punct")
+    if not title.isascii():
+        parts.append("intl")
+    return ",".join(parts)
+
+
+class SearchPlanner:
+    def __init__(self, path: str = STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats: Optional[Dict[str, Dict[str, List[int]]]] = None
+        # 本进程新增的 [尝试, 命中]，写回时累加到文件中的最新值上
+        self._delta: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self.adapted = self.explored = self.pruned_steps = 0
+
+    def _read(self) -> Dict[str, Dict[str, List[int]]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 读取搜索统计失败，按固定阶梯查询: {e}")
+            return {}
+
+    def _counts(self, shape: str, kind: str) -> Tuple[int, int]:
+        """调用方须持有 _lock。"""
+        if self._stats is None:
+            self._stats = self._read()
+        base = self._stats.get(shape, {}).get(kind, [0, 0])
+        delta = self._delta.get(shape, {}).get(kind, [0, 0])
+        return base[0] + delta[0], base[1] + delta[1]
+
+    def hit_rate(self, shape: str, kind: str) -> float:
+        with self._lock:
+            tries, hits = self._counts(shape, kind)
+        return (hits + 1) / (tries + 2)
+
+    def _prunable(self, shape: str, kind: str) -> bool:
+        if kind == EXACT:
+            return False
+        with self._lock:
+            tries, hits = self._counts(shape, kind)
+        return tries >= _MIN_TRIES_TO_PRUNE and (hits + 1) / (tries + 2) < _PRUNE_BELOW
+
+    def plan(self, shape: str, steps: Sequence[Step], adaptive: bool = True,
+             explore: Optional[bool] = None, tally: bool = True) -> List[Step]:
+        """
+        返回本次的查询顺序。adaptive=False（如录制/回放 HTTP 时）或本次抽中探索时按固定阶梯返回。
+        同类步骤之间保持原有先后。tally=False 时不计入调整/探索统计（成本预测用）。
+        """
+        if explore is None:
+            explore = random.random() < _EXPLORE_RATE
+        if not adaptive or explore:
+            if adaptive and tally:
+                with self._lock:
+                    self.explored += 1
+            return list(steps)
+
+        kinds = list(dict.fromkeys(kind for kind, _, _ in steps))
+        score = {}
+        for kind in kinds:
+            p = self.hit_rate(shape, kind)
+            cost = 1.0 + (_FUZZY_EXTRA_CALL * p if kind == FUZZY else 0.0)
+            score[kind] = p / cost
+        pruned = {kind for kind in kinds if self._prunable(shape, kind)}
+        rank = {kind: i for i, kind in enumerate(sorted(kinds, key=lambda k: -score[k]))}
+        planned = sorted((s for s in steps if s[0] not in pruned), key=lambda s: rank[s[0]])
+        if tally and (pruned or [s[0] for s in planned] != [s[0] for s in steps]):
+            with self._lock:
+                self.adapted += 1
+                self.pruned_steps += len(steps) - len(planned)
+        return planned
+
+    def observe(self, shape: str, tried: Sequence[str], hit: Optional[str]):
+        """记录一部电影的查询结果：tried 为实际发出的各步骤类型（可重复），hit 为命中的那一类。"""
+        with self._lock:
+            for kind in tried:
+                self._delta[shape][kind][0] += 1
+            if hit:
+                self._delta[shape][hit][1] += 1
+
+    def save(self):
+        """把本进程的增量累加到文件中的最新统计上（临时文件 + os.replace 原子写出）。"""
+        with self._lock:
+            if not self._delta:
+                return
+            stats = self._read()
+            for shape, kinds in self._delta.items():
+                for kind, (tries, hits) in kinds.items():
+                    row = stats.setdefault(shape, {}).setdefault(kind, [0, 0])
+                    row[0] += tries
+                    row[1] += hits
+            self._stats = stats
+            self._delta.clear()
+            adapted, explored, pruned = self.adapted, self.explored, self.pruned_steps
+            self.adapted = self.explored = self.pruned_steps = 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ 写入搜索统计失败: {e}")
+            return
+        if adapted or explored:
+            logger.info(f"🧭 搜索规划：{adapted} 部按历史命中率调整了阶梯（剪掉 {pruned} 次查询），"
+                        f"{explored} 部按固定阶梯探索 → {self.path}")
+
+
+planner = SearchPlanner()
@@ -7,17 +7,30 @@
   nvidia   → Nvidia NIM (OpenAI-compatible)
   gemini   → Google Gemini
 
+translate_pool = true 时，所有凭据有效的提供商组成翻译池（TranslatorPool），
+按吞吐量与错误率加权分配批次，遇到 429/5xx 立即转交其它提供商。
+
 所有模型、端点均通过 config (secrets.yml -> config.ini) 获取，不在代码中硬编码。
 """
 import json
+import hashlib
+import random
+import threading
+import time
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from config_reader import CONFIG
+from journal import Journal
+from http_client import get_session
+from circuit_breaker import CircuitOpenError, host_of
+import deadline
+import quota
 
 try:
-    from retry import with_retry
+    from retry import with_retry, parse_rate_limit_delay
     _HAS_RETRY = True
 except ImportError:
     _HAS_RETRY = False
@@ -25,6 +38,125 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Token 预算估算与装箱
+# ─────────────────────────────────────────────────────────────────────────────
+
+# (上下文窗口, 单次最大输出) 单位 token，取各提供商默认模型的保守值。
+# 模型级覆盖按前缀匹配，未命中时回落到提供商默认值。
+_PROVIDER_TOKEN_LIMITS: Dict[str, Tuple[int, int]] = {
+    "mistral": (32000, 8192),
+    "openai":  (128000, 16384),
+    "groq":    (32768, 8192),
+    "nvidia":  (32768, 4096),
+    "gemini":  (1000000, 8192),
+}
+_MODEL_TOKEN_LIMITS: Dict[str, Tuple[int, int]] = {
+    "mistral-large": (128000, 8192),
+    "mistral-small": (32000, 8192),
+    "gpt-4o":        (128000, 16384),
+    "llama-3.3-70b": (128000, 8192),
+    "gemini-2.5":    (1000000, 65536),
+}
+_DEFAULT_TOKEN_LIMITS = (16000, 4096)
+
+# 只用到上下文/输出上限的 80%，给估算误差和 JSON 包装留余量
+_BUDGET_SAFETY = 0.8
+# 提示词模板 + system 消息的固定开销
+_PROMPT_OVERHEAD_TOKENS = 200
+# 每条文本在 JSON 数组里的引号、逗号、转义开销
+_PER_ITEM_OVERHEAD_TOKENS = 8
+# 英文 → 中文的输出膨胀系数（中文一个字通常占 1~2 个 token）
+_OUTPUT_EXPANSION = 1.6
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：ASCII 约 4 字符/token，非 ASCII（CJK 等）约 1 字符/token。"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def token_limits(provider: str, model: str) -> Tuple[int, int]:
+    """返回 (上下文窗口, 最大输出) —— 模型前缀优先，其次提供商默认值。"""
+    for prefix, limits in _MODEL_TOKEN_LIMITS.items():
+        if model and model.startswith(prefix):
+            return limits
+    return _PROVIDER_TOKEN_LIMITS.get(provider, _DEFAULT_TOKEN_LIMITS)
+
+
+def _estimate_request_tokens(texts: List[str]) -> int:
+    """一次翻译请求的总 token 估算（输入 + 输出），用于 LLM 额度记账与预留。"""
+    cost = sum(estimate_tokens(t) + _PER_ITEM_OVERHEAD_TOKENS for t in texts)
+    return _PROMPT_OVERHEAD_TOKENS + int(cost * (1 + _OUTPUT_EXPANSION))
+
+
+def pack_batches(
+    items: List[Tuple[int, str]],
+    limits: Tuple[int, int],
+    max_items: int,
+) -> List[List[Tuple[int, str]]]:
+    """
+    按顺序贪心装箱：在不超过上下文/输出 token 预算和条数上限的前提下尽量多装。
+    翻译的输出量与输入相当，输出上限通常先于上下文窗口耗尽，所以两者同时约束。
+    单条超预算的文本独占一批（交给 API 决定能否处理）。
+    """
+    context_limit, output_limit = limits
+    # 上下文窗口要同时容纳输入和输出
+    context_budget = int(context_limit * _BUDGET_SAFETY) - _PROMPT_OVERHEAD_TOKENS
+    output_budget = int(output_limit * _BUDGET_SAFETY)
+
+    batches: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    in_tokens = out_tokens = 0
+    for item in items:
+        cost = estimate_tokens(item[1]) + _PER_ITEM_OVERHEAD_TOKENS
+        out_cost = int(cost * _OUTPUT_EXPANSION)
+        overflow = (
+            in_tokens + out_tokens + cost + out_cost > context_budget
+            or out_tokens + out_cost > output_budget
+            or len(current) >= max_items
+        )
+        if current and overflow:
+            batches.append(current)
+            current, in_tokens, out_tokens = [], 0, 0
+        current.append(item)
+        in_tokens += cost
+        out_tokens += out_cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _text_key(text: str) -> str:
+    """断点日志的条目键：原文的哈希（简介可能很长，不直接当键）。"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _parse_translations(content: str) -> List[str]:
+    """
+    解析模型输出的 {"translations": [...]}。
+    失败时抛出 ValueError / TypeError（内容问题），由 _translate_bisect 直接拆分，不经过退避重试。
+    """
+    parsed = json.loads(content)
+    if not isinstance(parsed, dict):
+        raise ValueError(f"翻译结果不是 JSON 对象: {type(parsed).__name__}")
+    return parsed.get("translations", [])
+
+
+def _is_splittable_error(e: Exception) -> bool:
+    """
+    判断批次失败是否值得拆分重试。
+    JSON 解析失败、输出被截断、400/413（请求过大）这类"内容问题"拆小后往往能成功；
+    鉴权失败、限流、5xx、网络错误与批次大小无关，拆分只会白白多发请求。
+    """
+    if isinstance(e, requests.HTTPError):
+        status = e.response.status_code if e.response is not None else None
+        return status in (400, 413, 422)
+    if isinstance(e, requests.RequestException):
+        return False
+    return isinstance(e, (ValueError, KeyError, IndexError, TypeError))
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 抽象基类
 # ─────────────────────────────────────────────────────────────────────────────
@@ -32,52 +164,123 @@ logger = logging.getLogger(__name__)
 class AbstractTranslator(ABC):
     """所有翻译器的基类，提供批量翻译接口。"""
 
-    def translate_texts(self, texts: List[str], batch_size: int = 10) -> List[str]:
+    provider: str = ""
+    model: str = ""
+    # 同时在途的批次数；单一提供商串行即可，翻译池按成员数并行
+    max_parallel: int = 1
+    _journal: Optional[Journal] = None
+
+    def translate_texts(self, texts: List[str], batch_size: int = 10,
+                        journal: Optional[Journal] = None) -> List[str]:
         if not texts:
             return []
 
         to_translate = [(i, t) for i, t in enumerate(texts) if t and t.strip()]
         results = list(texts)
 
+        # ── 断点续跑：已翻译过的原文直接取日志中的译文 ────────────
+        self._journal = journal
+        if journal:
+            done = journal.load()
+            restored = [(i, t) for i, t in to_translate if _text_key(t) in done]
+            for i, t in restored:
+                results[i] = done[_text_key(t)]
+            to_translate = [(i, t) for i, t in to_translate if _text_key(t) not in done]
+
         if not to_translate:
             return results
 
-        batches = [
-            to_translate[i:i + batch_size]
-            for i in range(0, len(to_translate), batch_size)
-        ]
+        # 按 token 预算装箱：短简介多装、长简介少装，batch_size 仅作为单批条数上限
+        batches = pack_batches(to_translate, self._token_limits(), batch_size)
         num_batches = len(batches)
         logger.info(
             f"[{self.__class__.__name__}] 共 {len(to_translate)} 个文本，"
-            f"分 {num_batches} 批翻译（每批≤{batch_size}）"
+            f"按 token 预算分 {num_batches} 批翻译（每批≤{batch_size}）"
         )
 
-        for batch_idx, batch in enumerate(batches, 1):
-            indices = [item[0] for item in batch]
-            source_texts = [item[1] for item in batch]
-            logger.info(f"翻译第 {batch_idx}/{num_batches} 批（{len(source_texts)} 个）...")
+        # 时间预算或 LLM 额度用尽时剩余批次不再翻译，保留英文原文（不写断点日志，下次运行重新翻译）
+        # 批次按原顺序（即页面排名）提交，额度先花在排名靠前的电影上
+        untranslated = []
+        over_quota = []
 
+        def _run(batch_idx: int, batch: List[Tuple[int, str]]):
+            if deadline.expired():
+                untranslated.append(len(batch))
+                return
+            logger.info(f"翻译第 {batch_idx}/{num_batches} 批（{len(batch)} 个）...")
             try:
-                translated = self._translate_batch(source_texts)
-                if len(translated) != len(source_texts):
-                    logger.error(
-                        f"⚠️ 第 {batch_idx} 批结果数量不匹配！"
-                        f"预期 {len(source_texts)}，实际 {len(translated)}"
-                    )
-                    for i, t in zip(indices, source_texts):
-                        results[i] = f"[翻译不匹配] {t[:50]}..."
-                else:
-                    for i, translated_text in zip(indices, translated):
-                        results[i] = translated_text
-                    logger.info(f"✅ 第 {batch_idx} 批翻译成功")
-            except Exception as e:
-                logger.error(f"❌ 第 {batch_idx} 批翻译失败: {type(e).__name__} - {e}")
-                for i, t in zip(indices, source_texts):
-                    results[i] = f"[翻译失败] {t[:50]}..."
-
-        logger.info("✅ 翻译任务完成")
+                skipped = self._translate_bisect(batch, results, label=str(batch_idx))
+            except deadline.DeadlineExceeded:
+                untranslated.append(len(batch))
+                return
+            if skipped:
+                over_quota.append(skipped)
+
+        if self.max_parallel <= 1:
+            for batch_idx, batch in enumerate(batches, 1):
+                _run(batch_idx, batch)
+        else:
+            # 各批写入 results 的下标互不重叠，无需加锁
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                list(executor.map(_run, range(1, num_batches + 1), batches))
+
+        if over_quota:
+            logger.warning(f"💳 LLM 今日额度不足：{len(over_quota)} 批中共 {sum(over_quota)} 条未翻译，保留英文原文")
+        if untranslated:
+            logger.warning(f"⏳ 时间预算用尽：{len(untranslated)} 批（至多 {sum(untranslated)} 条）未翻译，保留英文原文")
+        if not over_quota and not untranslated:
+            logger.info("✅ 翻译任务完成")
         return results
 
+    def _token_limits(self) -> Tuple[int, int]:
+        return token_limits(self.provider, self.model)
+
+    def _translate_bisect(self, batch: List[Tuple[int, str]], results: List[str], label: str) -> int:
+        """
+        翻译一批文本并写回 results。
+        数量不匹配或内容类错误时对半拆分递归重试，直到单条，
+        这样只有真正出错的那几条会变成占位符，其余翻译结果全部保留。
+        每次发请求（含拆分后的子批）前都检查 LLM 今日剩余额度，不够时这部分保留英文原文；
+        返回因额度不足未翻译的条数。
+        """
+        indices = [item[0] for item in batch]
+        source_texts = [item[1] for item in batch]
+
+        if not quota.ledger.llm_allows(1, _estimate_request_tokens(source_texts)):
+            return len(batch)
+        try:
+            translated = self._translate_batch(source_texts)
+        except Exception as e:
+            if len(batch) > 1 and _is_splittable_error(e):
+                logger.warning(f"⚠️ 第 {label} 批翻译失败（{type(e).__name__}），对半拆分重试")
+                return self._split_and_retry(batch, results, label)
+            logger.error(f"❌ 第 {label} 批翻译失败: {type(e).__name__} - {e}")
+            for i, t in zip(indices, source_texts):
+                results[i] = f"[翻译失败] {t[:50]}..."
+            return 0
+
+        if len(translated) == len(source_texts):
+            for i, t, translated_text in zip(indices, source_texts, translated):
+                results[i] = translated_text
+                if self._journal:
+                    self._journal.append(_text_key(t), translated_text)
+            logger.info(f"✅ 第 {label} 批翻译成功")
+            return 0
+
+        logger.error(
+            f"⚠️ 第 {label} 批结果数量不匹配！"
+            f"预期 {len(source_texts)}，实际 {len(translated)}"
+        )
+        if len(batch) > 1:
+            return self._split_and_retry(batch, results, label)
+        results[indices[0]] = f"[翻译不匹配] {source_texts[0][:50]}..."
+        return 0
+
+    def _split_and_retry(self, batch: List[Tuple[int, str]], results: List[str], label: str) -> int:
+        mid = len(batch) // 2
+        return (self._translate_bisect(batch[:mid], results, label=f"{label}a")
+                + self._translate_bisect(batch[mid:], results, label=f"{label}b"))
+
     @abstractmethod
     def _translate_batch(self, texts: List[str]) -> List[str]:
         """子类实现：翻译单批文本，返回等长的翻译结果列表。"""
@@ -88,7 +291,8 @@ class AbstractTranslator(ABC):
 # ─────────────────────────────────────────────────────────────────────────────
 
 class OpenAICompatibleTranslator(AbstractTranslator):
-    def __init__(self, api_key: str, model: str, endpoint: str, timeout: int = 60):
+    def __init__(self, api_key: str, model: str, endpoint: str, timeout: int = 60, provider: str = ""):
+        self.provider = provider
         self.api_key = api_key
         self.model = model
         self.endpoint = endpoint
@@ -101,6 +305,20 @@ class OpenAICompatibleTranslator(AbstractTranslator):
         }
 
     def _translate_batch(self, texts: List[str]) -> List[str]:
+        # 只对 HTTP 请求退避重试；解析放在重试之外，输出格式不对时由 _translate_bisect 立即拆分
+        if _HAS_RETRY:
+            data = with_retry(lambda: self._request_data(texts), self._retry_cfg,
+                              label=f"{self.model}", host=host_of(self.endpoint))
+        else:
+            data = self._request_data(texts)
+        return _parse_translations(data["choices"][0]["message"]["content"])
+
+    def _request_batch(self, texts: List[str]) -> List[str]:
+        """单次请求（不重试），供翻译池故障转移使用。"""
+        return _parse_translations(self._request_data(texts)["choices"][0]["message"]["content"])
+
+    def _request_data(self, texts: List[str]) -> dict:
+        """发出请求并返回响应 JSON（不解析译文）。"""
         prompt = (
             "Translate the following JSON array of English movie summaries into Chinese. "
             "Return exactly a JSON object with a key 'translations' containing an array "
@@ -124,18 +342,13 @@ class OpenAICompatibleTranslator(AbstractTranslator):
             "temperature": 0.3,
         }
 
-        def _do_request():
-            resp = requests.post(
-                self.endpoint, headers=headers, json=payload, timeout=self.timeout
-            )
-            resp.raise_for_status()
-            content = resp.json()["choices"][0]["message"]["content"]
-            parsed = json.loads(content)
-            return parsed.get("translations", [])
-
-        if _HAS_RETRY:
-            return with_retry(_do_request, self._retry_cfg, label=f"{self.model}")
-        return _do_request()
+        resp = get_session().post(
+            self.endpoint, headers=headers, json=payload, timeout=deadline.clamp(self.timeout)
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        quota.ledger.record_llm(quota.tokens_used(data, _estimate_request_tokens(texts)))
+        return data
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -144,6 +357,7 @@ class OpenAICompatibleTranslator(AbstractTranslator):
 
 class GeminiTranslator(AbstractTranslator):
     def __init__(self, api_key: str, model: str, endpoint_template: str, timeout: int = 60):
+        self.provider = "gemini"
         self.api_key = api_key
         self.model = model
         self.endpoint_template = endpoint_template
@@ -156,6 +370,20 @@ class GeminiTranslator(AbstractTranslator):
         }
 
     def _translate_batch(self, texts: List[str]) -> List[str]:
+        # 同 OpenAICompatibleTranslator：只对 HTTP 请求重试，解析失败立即交给拆分
+        if _HAS_RETRY:
+            data = with_retry(lambda: self._request_data(texts), self._retry_cfg,
+                              label=f"gemini/{self.model}", host=host_of(self.endpoint_template))
+        else:
+            data = self._request_data(texts)
+        return _parse_translations(data["candidates"][0]["content"]["parts"][0]["text"])
+
+    def _request_batch(self, texts: List[str]) -> List[str]:
+        """单次请求（不重试），供翻译池故障转移使用。"""
+        return _parse_translations(self._request_data(texts)["candidates"][0]["content"]["parts"][0]["text"])
+
+    def _request_data(self, texts: List[str]) -> dict:
+        """发出请求并返回响应 JSON（不解析译文）。"""
         prompt = (
             "Translate the following JSON array of English movie summaries into Chinese. "
             "Return exactly a JSON object with a key 'translations' containing an array "
@@ -169,66 +397,232 @@ class GeminiTranslator(AbstractTranslator):
             "generationConfig": {"responseMimeType": "application/json"},
         }
 
-        def _do_request():
-            resp = requests.post(url, json=payload, timeout=self.timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            text = data["candidates"][0]["content"]["parts"][0]["text"]
-            parsed = json.loads(text)
-            return parsed.get("translations", [])
-
-        if _HAS_RETRY:
-            return with_retry(_do_request, self._retry_cfg, label=f"gemini/{self.model}")
-        return _do_request()
+        resp = get_session().post(url, json=payload, timeout=deadline.clamp(self.timeout))
+        resp.raise_for_status()
+        data = resp.json()
+        quota.ledger.record_llm(quota.tokens_used(data, _estimate_request_tokens(texts)))
+        return data
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 工厂函数
+# 多提供商翻译池（按吞吐量/错误率加权分流 + 即时故障转移）
 # ─────────────────────────────────────────────────────────────────────────────
 
-def get_translator() -> Optional[AbstractTranslator]:
+# EWMA 平滑系数：越大越看重最近几次表现
+_HEALTH_ALPHA = 0.3
+# 限流/5xx 后的默认冷却时间（秒），API 给了建议等待时间则以其为准
+_FAILOVER_COOLDOWN = 30.0
+
+
+class ProviderHealth:
+    """单个提供商在本次运行中的健康度：吞吐量（条/秒）与错误率的指数滑动平均。"""
+
+    def __init__(self):
+        self.throughput = 1.0   # 先验：各家一视同仁，跑几批后自然拉开差距
+        self.error_rate = 0.0
+        self.cooldown_until = 0.0
+        self.disabled = False
+
+    def weight(self, now: float) -> float:
+        if self.disabled or now < self.cooldown_until:
+            return 0.0
+        # 错误率平方惩罚：偶发错误影响小，持续出错的提供商迅速边缘化
+        return max(self.throughput, 0.01) * (1.0 - self.error_rate) ** 2 + 1e-3
+
+    def record_success(self, items: int, elapsed: float):
+        rate = items / max(elapsed, 0.05)
+        self.throughput = (1 - _HEALTH_ALPHA) * self.throughput + _HEALTH_ALPHA * rate
+        self.error_rate = (1 - _HEALTH_ALPHA) * self.error_rate
+
+    def record_failure(self, cooldown: float = 0.0):
+        self.error_rate = (1 - _HEALTH_ALPHA) * self.error_rate + _HEALTH_ALPHA
+        if cooldown:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+
+
+def _is_failover_error(e: Exception) -> bool:
+    """限流、5xx、网络故障：换一家立即重发，而不是原地退避等待。"""
+    if isinstance(e, requests.HTTPError):
+        status = e.response.status_code if e.response is not None else None
+        return status == 429 or (status is not None and status >= 500)
+    return isinstance(e, (requests.ConnectionError, requests.Timeout))
+
+
+def _is_auth_error(e: Exception) -> bool:
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code in (401, 403)
+    return False
+
+
+class TranslatorPool(AbstractTranslator):
     """
-    根据 CONFIG['translate_provider'] 实例化对应的翻译器。
+    把批次分散到所有凭据有效的提供商。
+    - 按健康度加权随机选择提供商，表现差的在本次运行剩余时间里少分到批次；
+    - 遇到 429/5xx/网络故障立即转给下一家，不在原提供商上 sleep；
+    - 所有成员都冷却中时，才退回到最健康成员的带退避重试路径，保证批次不丢。
     """
-    provider = CONFIG.get("translate_provider", "").lower().strip()
-    timeout = CONFIG.get("request_timeout", 60)
 
-    if not provider:
-        logger.error("❌ 翻译提供商未配置！")
-        return None
+    def __init__(self, members: List[AbstractTranslator]):
+        self.members = members
+        self.health: Dict[str, ProviderHealth] = {m.provider: ProviderHealth() for m in members}
+        self.max_parallel = len(members)
+        self.provider = "pool"
+        self.model = "+".join(m.provider for m in members)
+        self._lock = threading.Lock()
+
+    def _token_limits(self) -> Tuple[int, int]:
+        # 批次可能落到任意成员上，按最小的窗口装箱
+        limits = [token_limits(m.provider, m.model) for m in self.members]
+        return min(l[0] for l in limits), min(l[1] for l in limits)
+
+    def _pick(self, tried: set) -> Optional[AbstractTranslator]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                (m, self.health[m.provider].weight(now))
+                for m in self.members if m.provider not in tried
+            ]
+        candidates = [(m, w) for m, w in candidates if w > 0]
+        if not candidates:
+            return None
+        members, weights = zip(*candidates)
+        return random.choices(members, weights=weights, k=1)[0]
+
+    def _translate_batch(self, texts: List[str]) -> List[str]:
+        tried: set = set()
+        while True:
+            member = self._pick(tried)
+            if member is None:
+                return self._translate_fallback(texts)
+            tried.add(member.provider)
+            health = self.health[member.provider]
+            start = time.monotonic()
+            try:
+                translated = member._request_batch(texts)
+            except Exception as e:
+                if _is_auth_error(e):
+                    logger.error(f"❌ [{member.provider}] 鉴权失败，本次运行不再使用该提供商: {e}")
+                    with self._lock:
+                        health.disabled = True
+                    continue
+                if _is_failover_error(e):
+                    if isinstance(e, CircuitOpenError):
+                        # 已熔断：冷却到熔断器下次探测的时间点
+                        cooldown = max(e.retry_in, 1.0)
+                    else:
+                        cooldown = (parse_rate_limit_delay(str(e)) if _HAS_RETRY else None) or _FAILOVER_COOLDOWN
+                    logger.warning(
+                        f"⚠️ [{member.provider}] {type(e).__name__}，冷却 {cooldown:.0f} 秒，批次转交其它提供商"
+                    )
+                    with self._lock:
+                        health.record_failure(cooldown)
+                    continue
+                with self._lock:
+                    health.record_failure()
+                raise
+            with self._lock:
+                if len(translated) == len(texts):
+                    health.record_success(len(texts), time.monotonic() - start)
+                else:
+                    health.record_failure()
+            return translated
+
+    def _translate_fallback(self, texts: List[str]) -> List[str]:
+        """全员冷却/禁用时的兜底：选一个未禁用的成员走它自己的退避重试。"""
+        now = time.monotonic()
+        with self._lock:
+            alive = [m for m in self.members if not self.health[m.provider].disabled]
+        if not alive:
+            raise RuntimeError("翻译池中所有提供商均鉴权失败")
+        member = min(alive, key=lambda m: self.health[m.provider].cooldown_until - now)
+        logger.warning(f"⚠️ 翻译池所有提供商均在冷却，回退到 {member.provider} 的退避重试")
+        return member._translate_batch(texts)
+
+    def log_health(self):
+        for provider, h in self.health.items():
+            state = "禁用" if h.disabled else f"吞吐 {h.throughput:.2f} 条/秒, 错误率 {h.error_rate:.0%}"
+            logger.info(f"📊 翻译池 [{provider}] {state}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 工厂函数
+# ─────────────────────────────────────────────────────────────────────────────
+
+_PROVIDERS = ["mistral", "openai", "groq", "nvidia", "gemini"]
+
+
+def _build_translator(provider: str, quiet: bool = False) -> Optional[AbstractTranslator]:
+    """按提供商名从 CONFIG 组装翻译器；凭据/模型/端点缺失时返回 None。"""
+    timeout = CONFIG.get("request_timeout", 60)
+    report = logger.debug if quiet else logger.error
 
     api_key_field = f"{provider}_api_key"
     model_field = f"{provider}_translate_model"
     endpoint_field = f"{provider}_endpoint"
 
     api_key = CONFIG.get(api_key_field)
-    if not api_key:
-        logger.error(f"❌ 翻译提供商 '{provider}' 的 API 密钥为空（字段: {api_key_field}）")
+    if not api_key or api_key.startswith("<YOUR_"):
+        report(f"❌ 翻译提供商 '{provider}' 的 API 密钥为空（字段: {api_key_field}）")
         return None
 
     model = CONFIG.get(model_field)
     if not model:
-        logger.error(f"❌ 翻译提供商 '{provider}' 的模型为空（字段: {model_field}）")
+        report(f"❌ 翻译提供商 '{provider}' 的模型为空（字段: {model_field}）")
         return None
 
     endpoint = CONFIG.get(endpoint_field)
     if not endpoint:
-        logger.error(f"❌ 翻译提供商 '{provider}' 的端点为空（字段: {endpoint_field}）")
+        report(f"❌ 翻译提供商 '{provider}' 的端点为空（字段: {endpoint_field}）")
         return None
 
     if provider == "gemini":
-        logger.info(f"✅ 使用翻译提供商: Gemini，模型: {model}")
         return GeminiTranslator(api_key=api_key, model=model, endpoint_template=endpoint, timeout=timeout)
-    else:
-        logger.info(f"✅ 使用翻译提供商: {provider}，模型: {model}，端点: {endpoint}")
-        return OpenAICompatibleTranslator(
-            api_key=api_key, model=model, endpoint=endpoint, timeout=timeout
-        )
+    return OpenAICompatibleTranslator(
+        api_key=api_key, model=model, endpoint=endpoint, timeout=timeout, provider=provider
+    )
+
+
+def get_translator() -> Optional[AbstractTranslator]:
+    """
+    根据 CONFIG['translate_provider'] 实例化对应的翻译器。
+    translate_pool 开启且有多家凭据有效时，返回覆盖所有可用提供商的 TranslatorPool。
+    """
+    provider = CONFIG.get("translate_provider", "").lower().strip()
+
+    if not provider:
+        logger.error("❌ 翻译提供商未配置！")
+        return None
+
+    if CONFIG.get("translate_pool"):
+        members = [t for t in (_build_translator(p, quiet=True) for p in _PROVIDERS) if t]
+        if len(members) > 1:
+            logger.info(f"✅ 使用翻译池: {', '.join(m.provider for m in members)}")
+            return TranslatorPool(members)
+        logger.info("翻译池可用提供商不足 2 家，退回单一提供商模式")
+
+    translator = _build_translator(provider)
+    if translator:
+        logger.info(f"✅ 使用翻译提供商: {provider}，模型: {translator.model}")
+    return translator
+
+
+def llm_budget_covers(texts: List[str], batch_size: int) -> bool:
+    """今日剩余 LLM 额度是否大致够翻译全部文本（按每批 batch_size 条估算请求数）。"""
+    texts = [t for t in texts if t and t.strip()]
+    requests_needed = -(-len(texts) // max(batch_size, 1))
+    return quota.ledger.llm_allows(requests_needed, _estimate_request_tokens(texts))
 
 
-def translate_texts(texts: List[str], batch_size: int = 10) -> List[str]:
+def translate_texts(texts: List[str], batch_size: int = 10,
+                    journal: Optional[Journal] = None) -> List[str]:
     translator = get_translator()
     if not translator:
         logger.error("❌ 无法初始化翻译器，返回原始文本")
         return [f"[翻译器初始化失败] {t[:50]}" for t in texts]
-    return translator.translate_texts(texts, batch_size=batch_size)
+    results = translator.translate_texts(texts, batch_size=batch_size, journal=journal)
+    quota.ledger.save()
+    if journal:
+        journal.sync()
+    if isinstance(translator, TranslatorPool):
+        translator.log_health()
+    return results
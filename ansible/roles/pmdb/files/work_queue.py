@@ -0,0 +1,259 @@
+"""
+跨进程/跨主机的 enrich 工作队列（SQLite 文件 + 租约）。
+
+协调者（enrich 阶段，配置了 work_queue 时）把待查询的候选写入队列，
+任意多个 worker 进程（./run.sh worker，可分布在多台主机、各用各的 OMDb Key）：
+  1. 认领一批条目并获得租约（lease_until），后台线程定期续约（心跳）
+  2. 查询完成后写回结果；Key 耗尽/熔断等可重试失败则放回 pending，退避一段时间（not_before）后
+     再由任意 worker 接手，不会被同一个 worker 在几秒内把重试次数用光
+  3. 进程崩溃或断网时租约过期，条目自动被其它 worker 重新认领
+协调者自己也参与处理，队列清空后收集结果，继续去重、翻译、渲染。
+
+并发控制只依赖 SQLite 文件锁（BEGIN IMMEDIATE），不开 WAL，可放在 NFS/SMB 等共享文件系统上。
+只依赖标准库。
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from movie_record import MovieRecord
+
+logger = logging.getLogger(__name__)
+
+PENDING, LEASED, DONE, SKIPPED, FAILED = "pending", "leased", "done", "skipped", "failed"
+
+LEASE_SECONDS = 120.0
+_HEARTBEAT_SECONDS = LEASE_SECONDS / 4
+# 可重试失败最多重新排队的次数，之后按失败处理（防止程序异常的条目无限循环）
+MAX_ATTEMPTS = 3
+# 可重试失败后的退避：第 n 次失败后至少等 _RETRY_BACKOFF_SECONDS × 2^(n-1) 秒才能再次认领
+_RETRY_BACKOFF_SECONDS = 30.0
+_IDLE_POLL_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+CREATE TABLE IF NOT EXISTS items (
+    seq         INTEGER PRIMARY KEY,
+    name        TEXT UNIQUE NOT NULL,
+    payload     TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    result      TEXT,
+    reason      TEXT,
+    calls       INTEGER,
+    updated_at  REAL,
+    not_before  REAL
+);
+CREATE INDEX IF NOT EXISTS idx_items_state ON items(state, lease_until);
+"""
+
+# (记录, 失败原因, 是否可重试) —— 与 movie_api_service.enrich_one 的返回一致
+ProcessFn = Callable[[MovieRecord], Tuple[Optional[MovieRecord], Optional[str], bool]]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        # 旧版本建的队列文件没有 not_before 列
+        if "not_before" not in {row[1] for row in conn.execute("PRAGMA table_info(items)")}:
+            conn.execute("ALTER TABLE items ADD COLUMN not_before REAL")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：事务由 _tx 显式控制
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """写事务：BEGIN IMMEDIATE 立即拿写锁，多个 worker 的认领互斥。"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ── 协调者 ──────────────────────────────────────────────
+    def publish(self, run_id: str, movies: Iterable[MovieRecord]) -> int:
+        """
+        发布一轮待查询条目。run_id 与队列中现有的一致时视为续跑：已完成的条目保留，
+        只补充新条目；否则清空队列重新开始。返回仍需处理的条目数。
+        """
+        now = time.time()
+        with self._tx() as conn:
+            row = conn.execute("SELECT v FROM meta WHERE k = 'run_id'").fetchone()
+            if not row or row[0] != run_id:
+                conn.execute("DELETE FROM items")
+                conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('run_id', ?)", (run_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO items (name, payload, state, updated_at) VALUES (?, ?, ?, ?)",
+                [(m.name, json.dumps(m.to_dict(), ensure_ascii=False), PENDING, now) for m in movies],
+            )
+            remaining = conn.execute(
+                "SELECT COUNT(*) FROM items WHERE state IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()[0]
+        return remaining
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+        return dict(rows)
+
+    def collect(self) -> Tuple[List[MovieRecord], List[str], Dict[str, int]]:
+        """按发布顺序返回 (成功记录, 失败说明, 每部电影的 OMDb 请求数)。"""
+        rows = self._conn().execute(
+            "SELECT name, state, result, reason, calls FROM items ORDER BY seq"
+        ).fetchall()
+        results, failed, calls = [], [], {}
+        for name, state, result, reason, n_calls in rows:
+            if n_calls is not None:
+                calls[name] = n_calls
+            if state == DONE and result:
+                results.append(MovieRecord.from_dict(json.loads(result)))
+            elif state in (SKIPPED, FAILED):
+                failed.append(f"{name} ({reason})")
+            else:
+                failed.append(f"{name} (队列中未完成)")
+        return results, failed, calls
+
+    # ── worker ─────────────────────────────────────────────
+    def claim(self, worker: str, limit: int) -> List[MovieRecord]:
+        """认领最多 limit 个待处理（已过退避时间）或租约已过期的条目。"""
+        now = time.time()
+        with self._tx() as conn:
+            rows = conn.execute(
+                "SELECT seq, payload FROM items "
+                "WHERE (state = ? AND (not_before IS NULL OR not_before <= ?)) "
+                "OR (state = ? AND lease_until < ?) ORDER BY seq LIMIT ?",
+                (PENDING, now, LEASED, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE items SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE seq = ?",
+                [(LEASED, worker, now + LEASE_SECONDS, now, seq) for seq, _ in rows],
+            )
+        return [MovieRecord.from_dict(json.loads(payload)) for _, payload in rows]
+
+    def next_retry_in(self) -> Optional[float]:
+        """仍在退避中的待处理条目最早还要等几秒；没有这类条目时返回 None。"""
+        row = self._conn().execute(
+            "SELECT MIN(not_before) FROM items WHERE state = ? AND not_before > ?", (PENDING, time.time())
+        ).fetchone()
+        return None if row[0] is None else max(row[0] - time.time(), 0.0)
+
+    def heartbeat(self, worker: str) -> int:
+        """为本 worker 持有的全部租约续期。"""
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE items SET lease_until = ? WHERE state = ? AND worker = ?",
+                (now + LEASE_SECONDS, LEASED, worker),
+            )
+            return cur.rowcount
+
+    def complete(self, worker: str, name: str, result: Optional[MovieRecord], reason: Optional[str],
+                 retryable: bool, calls: Optional[int] = None):
+        """
+        写回结果；只有仍持有该条目租约的 worker 才能写（租约过期被别人接手后的迟到结果作废）。
+        可重试失败放回 pending 并按已尝试次数指数退避，重试次数用完则记为失败。
+        """
+        now = time.time()
+        with self._tx() as conn:
+            if result is not None:
+                state, payload = DONE, json.dumps(result.to_dict(), ensure_ascii=False)
+            elif retryable:
+                state, payload = PENDING, None
+            else:
+                state, payload = SKIPPED, None
+            cur = conn.execute(
+                "UPDATE items SET state = CASE WHEN ? = ? AND attempts >= ? THEN ? ELSE ? END, "
+                "not_before = CASE WHEN ? = ? THEN ? + ? * (1 << (attempts - 1)) END, "
+                "worker = NULL, lease_until = NULL, result = ?, reason = ?, calls = ?, updated_at = ? "
+                "WHERE name = ? AND state = ? AND worker = ?",
+                (state, PENDING, MAX_ATTEMPTS, FAILED, state,
+                 state, PENDING, now, _RETRY_BACKOFF_SECONDS,
+                 payload, reason, calls, now, name, LEASED, worker),
+            )
+            if cur.rowcount == 0:
+                logger.debug("租约已失效，丢弃迟到结果: %s", name)
+
+    def release(self, worker: str):
+        """worker 退出前把手上未完成的条目放回队列。"""
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE items SET state = ?, worker = NULL, lease_until = NULL WHERE state = ? AND worker = ?",
+                (PENDING, LEASED, worker),
+            )
+
+
+def run_worker(queue: WorkQueue, process: ProcessFn, concurrency: int, worker: Optional[str] = None,
+               calls_by_name: Optional[Dict[str, int]] = None,
+               should_stop: Callable[[], bool] = lambda: False, wait_for_others: bool = False) -> int:
+    """
+    认领 → 并行处理 → 写回，直到队列中没有可认领的条目，或 should_stop() 为真（如本机 Key 耗尽）。
+    wait_for_others=True（协调者）时继续等待其它 worker 手上的条目完成或租约过期。
+    返回本 worker 处理的条目数。
+    """
+    worker = worker or default_worker_id()
+    stop = threading.Event()
+    processed = 0
+
+    def _heartbeat():
+        while not stop.wait(_HEARTBEAT_SECONDS):
+            try:
+                queue.heartbeat(worker)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ 续约失败: {e}")
+
+    def _handle(movie: MovieRecord):
+        result, reason, retryable = process(movie)
+        calls = calls_by_name.get(movie.name) if calls_by_name is not None else None
+        queue.complete(worker, movie.name, result, reason, retryable, calls)
+
+    beat = threading.Thread(target=_heartbeat, name="queue-heartbeat", daemon=True)
+    beat.start()
+    logger.info(f"🧵 worker {worker} 开始处理队列 {queue.path}（并发 {concurrency}）")
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while not should_stop():
+                batch = queue.claim(worker, concurrency)
+                if batch:
+                    list(executor.map(_handle, batch))
+                    processed += len(batch)
+                    continue
+                retry_in = queue.next_retry_in()
+                if retry_in is not None:
+                    time.sleep(min(retry_in, _IDLE_POLL_SECONDS))  # 有条目在退避中，到点后再认领
+                    continue
+                counts = queue.counts()
+                if not wait_for_others or not counts.get(LEASED):
+                    break
+                time.sleep(_IDLE_POLL_SECONDS)  # 其它 worker 手上还有条目，等它们完成或租约过期
+    finally:
+        stop.set()
+        queue.release(worker)
+    if should_stop():
+        logger.warning(f"⚠️ worker {worker} 提前停止认领，剩余条目由其它 worker 处理")
+    logger.info(f"🧵 worker {worker} 结束，共处理 {processed} 部；队列状态 {queue.counts()}")
+    return processed
@@ -0,0 +1,106 @@
+"""
+pytest 公共设置。
+
+程序模块平铺在 ansible/roles/pmdb/files/ 下（部署时整目录复制），测试直接从那里导入。
+config_reader 在导入时就读取当前目录的 config.ini，依赖它的模块（movie_api_service 等）
+通过 app_config fixture 导入：先在临时目录写一份测试配置，再在该目录下完成首次导入。
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "ansible", "roles", "pmdb", "files"))
+
+# test_apibay.py 是联网的手动检查脚本（模块顶层直接请求 apibay），不作为用例收集
+collect_ignore = ["test_apibay.py"]
+
+_TEST_CONFIG = """\
+[AI]
+translate_provider = mistral
+translate_pool = false
+mistral_api_key = test-key
+openai_api_key =
+groq_api_key =
+nvidia_api_key =
+gemini_api_key =
+mistral_translate_model = mistral-small-latest
+openai_translate_model =
+groq_translate_model =
+nvidia_translate_model =
+gemini_translate_model =
+mistral_endpoint = http://127.0.0.1:9/v1/chat/completions
+openai_endpoint =
+groq_endpoint =
+nvidia_endpoint =
+gemini_endpoint =
+imdb_lookup_provider = mistral
+imdb_lookup_model = mistral-small-latest
+
+[OMDb_API]
+OMDB_KEYS = key-a,key-b
+
+[Settings]
+max_workers = 4
+max_movies = 20
+fill_to_target = true
+mistral_batch_size = 10
+request_timeout = 10
+hedge_requests = false
+retry_delay_min = 0
+retry_delay_max = 0
+entity_fuzzy_threshold = 0.92
+daemon_refresh_minutes = 360
+daemon_host = 127.0.0.1
+daemon_port = 8765
+work_queue =
+run_deadline_minutes = 0
+stage_budget_weights = 10,55,30,5
+omdb_daily_limit = 1000
+llm_daily_requests = 0
+llm_daily_tokens = 0
+
+[Sources]
+scraper_urls = https://apibay.org/precompiled/data_top100_207.json
+yts_sort_by = seeds
+yts_quality = 1080p
+yts_minimum_rating = 6.0
+yts_minimum_metascore = 20
+ingest_mode = top100
+apibay_categories = 207
+yts_pages = 1
+"""
+
+
+class FakeClock:
+    """可手动拨动的时钟：替换 time.time / time.monotonic，测试里直接改 now。"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """返回 install(target, name, start)：把 target.name 换成从 start 开始的 FakeClock 并返回它。"""
+    def install(target, name: str, start: float = 0.0) -> FakeClock:
+        clock = FakeClock(start)
+        monkeypatch.setattr(target, name, clock)
+        return clock
+    return install
+
+
+@pytest.fixture(scope="session")
+def app_config(tmp_path_factory):
+    """在写有测试配置的临时目录下导入 config_reader，返回 CONFIG。"""
+    root = tmp_path_factory.mktemp("pmdb")
+    (root / "config.ini").write_text(_TEST_CONFIG, encoding="utf-8")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        from config_reader import CONFIG
+    finally:
+        os.chdir(cwd)
+    return CONFIG
@@ -0,0 +1,74 @@
+"""catalog_store：fetched_at 的保留、按时效查询与旧库迁移；MovieBatch 中 fetched_at 的往返。"""
+import sqlite3
+import time
+
+import pytest
+
+import catalog_store
+from movie_record import MovieBatch, MovieRecord
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "output" / "catalog.sqlite")
+
+
+def _fetched(name, imdb_id, rating, fetched_at):
+    r = MovieRecord(name, rank=1)
+    r.apply_omdb(rating, "plot", "http://img", imdb_id, name, "70", fetched_at=fetched_at)
+    return r
+
+
+def test_reuse_without_fetch_keeps_fetched_at(db):
+    catalog_store.export_sqlite([_fetched("Alien 1979", "tt0078748", "8.5", 100.0)], db)
+    # 复用库中数据写回（fetched_at=None）：updated_at 刷新，fetched_at 不变
+    reused = MovieRecord("Alien 1979", imdb_id="tt0078748", rating="8.5", rank=2)
+    catalog_store.export_sqlite([reused], db)
+
+    conn = sqlite3.connect(db)
+    rank, updated_at, fetched_at = conn.execute(
+        "SELECT rank, updated_at, fetched_at FROM movies WHERE imdb_id = 'tt0078748'").fetchone()
+    conn.close()
+    assert rank == 2
+    assert fetched_at == 100.0
+    assert updated_at > fetched_at
+
+
+def test_lookup_filters_by_fetch_age(db):
+    now = time.time()
+    catalog_store.export_sqlite([
+        _fetched("Fresh 2020", "tt1", "7.0", now - 86400),
+        _fetched("Stale 2010", "tt2", "6.0", now - 30 * 86400),
+    ], db)
+
+    assert set(catalog_store.lookup(["tt1", "tt2", "tt3"], max_age_days=7, path=db)) == {"tt1"}
+    found = catalog_store.lookup(["tt1", "tt2"], path=db)
+    assert set(found) == {"tt1", "tt2"}
+    assert found["tt2"].rating == "6.0"
+    assert found["tt2"].fetched_at == pytest.approx(now - 30 * 86400)
+
+
+def test_old_database_is_migrated(db, tmp_path):
+    (tmp_path / "output").mkdir()
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE movies (imdb_id TEXT PRIMARY KEY, name TEXT NOT NULL, year INTEGER, "
+                 "rating REAL, metascore INTEGER, summary_en TEXT, summary_cn TEXT, image_url TEXT, "
+                 "source TEXT, rank INTEGER, updated_at REAL NOT NULL)")
+    conn.execute("INSERT INTO movies (imdb_id, name, rating, rank, updated_at) VALUES ('tt1', 'Old', 7.5, 1, 50.0)")
+    conn.commit()
+    conn.close()
+
+    found = catalog_store.lookup(["tt1"], path=db)
+    assert found["tt1"].fetched_at == 50.0
+    assert catalog_store.lookup(["tt1"], max_age_days=1, path=db) == {}
+
+
+def test_movie_batch_round_trips_fetched_at():
+    fetched = _fetched("Alien 1979", "tt0078748", "8.5", 1_700_000_123.25)
+    batch = MovieBatch.from_records([fetched, MovieRecord("Dune 2021", rank=2)])
+
+    assert batch[0].fetched_at == 1_700_000_123.25
+    assert batch[1].fetched_at is None
+    assert [r.fetched_at for r in batch] == [1_700_000_123.25, None]
+    assert batch[:1][0].fetched_at == 1_700_000_123.25
+    assert MovieBatch.from_dicts(batch.to_dicts())[0].to_dict() == fetched.to_dict()
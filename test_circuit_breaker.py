@@ -0,0 +1,124 @@
+"""circuit_breaker / http_client：熔断状态转换与探测名额释放。"""
+import pytest
+import requests
+
+import circuit_breaker
+import deadline
+import http_client
+from circuit_breaker import CLOSED, FAILURE_THRESHOLD, HALF_OPEN, OPEN, CircuitOpenError, HostCircuit
+
+
+@pytest.fixture
+def clock(fake_clock, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_circuits", {})
+    return fake_clock(circuit_breaker.time, "monotonic", 1000.0)
+
+
+def _open(circuit):
+    for _ in range(FAILURE_THRESHOLD):
+        circuit.before_request()
+        circuit.record_failure()
+    assert circuit.state == OPEN
+
+
+def test_opens_after_consecutive_failures(clock):
+    c = HostCircuit("omdb")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        c.record_failure()
+    assert c.state == CLOSED
+    c.record_failure()
+    assert c.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        c.before_request()
+
+
+def test_success_resets_failure_count(clock):
+    c = HostCircuit("omdb")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        c.record_failure()
+    c.record_success()
+    c.record_failure()
+    assert c.state == CLOSED
+
+
+def test_half_open_admits_single_probe_then_closes(clock):
+    c = HostCircuit("omdb")
+    _open(c)
+    clock.now += c.cooldown + 1
+    c.before_request()                      # 探测请求放行
+    assert c.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        c.before_request()                  # 探测在途，其它请求仍被拒绝
+    c.record_success()
+    assert c.state == CLOSED
+    c.before_request()
+
+
+def test_failed_probe_doubles_cooldown(clock):
+    c = HostCircuit("omdb")
+    _open(c)
+    first = c.cooldown
+    clock.now += first + 1
+    c.before_request()
+    c.record_failure()
+    assert c.state == OPEN
+    assert c.cooldown == min(first * 2, circuit_breaker._MAX_COOLDOWN)
+
+
+def test_release_probe_lets_next_request_probe(clock):
+    c = HostCircuit("omdb")
+    _open(c)
+    clock.now += c.cooldown + 1
+    c.before_request()
+    c.release_probe()
+    assert c.state == HALF_OPEN
+    c.before_request()                      # 不再被"探测在途"挡住
+
+
+def test_retry_budget_is_bounded_and_closed_only(clock):
+    c = HostCircuit("omdb")
+    granted = sum(c.try_acquire_retry() for _ in range(50))
+    assert granted == circuit_breaker._MIN_RETRIES
+    _open(c)
+    assert not c.try_acquire_retry()
+
+
+class _Boom(Exception):
+    pass
+
+
+@pytest.mark.parametrize("exc", [deadline.DeadlineExceeded("budget"), _Boom("replay miss")])
+def test_adapter_releases_probe_on_non_network_exception(clock, monkeypatch, exc):
+    host = "probe-release.test"
+    circuit = circuit_breaker.get_circuit(host)
+    _open(circuit)
+    clock.now += circuit.cooldown + 1
+
+    adapter = http_client._CircuitBreakerAdapter()
+
+    def transport(request, **kwargs):
+        raise exc
+    adapter._transport = transport
+    request = requests.Request("GET", f"http://{host}/").prepare()
+    with pytest.raises(type(exc)):
+        adapter.send(request)
+
+    # 探测名额已释放：下一个请求可以继续探测，不会永远 CircuitOpenError
+    assert circuit.state == HALF_OPEN
+    circuit.before_request()
+
+
+def test_adapter_records_network_failure(clock):
+    host = "probe-fail.test"
+    circuit = circuit_breaker.get_circuit(host)
+    _open(circuit)
+    clock.now += circuit.cooldown + 1
+
+    adapter = http_client._CircuitBreakerAdapter()
+
+    def transport(request, **kwargs):
+        raise requests.ConnectionError("refused")
+    adapter._transport = transport
+    with pytest.raises(requests.ConnectionError):
+        adapter.send(requests.Request("GET", f"http://{host}/").prepare())
+    assert circuit.state == OPEN
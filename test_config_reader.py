@@ -0,0 +1,44 @@
+"""config_reader：必填项缺失时直接退出，不回落到默认值。"""
+import re
+
+import pytest
+
+from conftest import _TEST_CONFIG
+
+
+@pytest.fixture
+def load(app_config, tmp_path):
+    import config_reader
+
+    def _load(text):
+        path = tmp_path / "config.ini"
+        path.write_text(text, encoding="utf-8")
+        return config_reader._load_config(str(path))
+    return _load
+
+
+def _without(key):
+    text, n = re.subn(rf"(?m)^{key} =.*\n", "", _TEST_CONFIG)
+    assert n == 1
+    return text
+
+
+def test_full_config_loads(load):
+    config = load(_TEST_CONFIG)
+    assert config["yts_pages"] == 1
+    assert config["work_queue"] == ""              # 留空表示不启用共享队列，不算缺失
+
+
+@pytest.mark.parametrize("key", [
+    "yts_pages",
+    "entity_fuzzy_threshold",
+    "daemon_refresh_minutes",
+    "daemon_host",
+    "daemon_port",
+    "hedge_requests",
+    "work_queue",
+    "fill_to_target",
+])
+def test_missing_key_exits(load, key):
+    with pytest.raises(SystemExit):
+        load(_without(key))
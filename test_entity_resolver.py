@@ -0,0 +1,79 @@
+"""entity_resolver：并查集归并与结果展开。"""
+from entity_resolver import _UnionFind, expand_groups, resolve_entities
+from movie_record import MovieRecord
+
+
+def _names(groups):
+    return [[m.name for m in g.members] for g in groups]
+
+
+def test_same_torrent_imdb_id_is_one_group():
+    records = [
+        MovieRecord("Dune Part Two 2024", imdb="tt15239678", rank=1),
+        MovieRecord("Dune 2 2024", imdb="tt15239678", rank=2),
+        MovieRecord("Oppenheimer 2023", rank=3),
+    ]
+    groups = resolve_entities(records)
+    assert _names(groups) == [["Dune Part Two 2024", "Dune 2 2024"], ["Oppenheimer 2023"]]
+
+
+def test_normalized_title_and_fuzzy_match_merge():
+    records = [
+        MovieRecord("Fast and Furious 2009", rank=1),
+        MovieRecord("Fast & Furious 2009", rank=2),
+        MovieRecord("Spider-Man Across the Spider-Verse 2023", rank=3),
+        MovieRecord("Spider Man Across the Spider Verse 2023", rank=4),
+        MovieRecord("Spider-Man Across the Spider-Verses 2023", rank=5),
+    ]
+    groups = resolve_entities(records, fuzzy_threshold=0.92)
+    assert len(groups) == 2
+    assert [len(g.members) for g in groups] == [2, 3]
+
+
+def test_same_title_different_year_stays_apart():
+    records = [MovieRecord("Dune 1984", rank=1), MovieRecord("Dune 2021", rank=2)]
+    assert len(resolve_entities(records)) == 2
+
+
+def test_conflicting_imdb_ids_are_never_merged():
+    # 同年同名的两部片，种子各带不同 imdbID：标题键相同也不能并
+    records = [
+        MovieRecord("The Thing 2011", imdb="tt0905372", rank=1),
+        MovieRecord("The Thing 2011", imdb="tt9999999", rank=2),
+        MovieRecord("The Thing 2011", rank=3),
+    ]
+    groups = resolve_entities(records)
+    assert len(groups) == 2
+    assert groups[0].members[0].imdb == "tt0905372"
+
+
+def test_union_find_refuses_transitive_conflict():
+    records = [MovieRecord("A", imdb="tt1"), MovieRecord("B"), MovieRecord("C", imdb="tt2")]
+    uf = _UnionFind(records)
+    assert uf.union(0, 1)
+    # 1 已经并入带 tt1 的组，再与 tt2 合并必须被拒绝
+    assert not uf.union(1, 2)
+    assert uf.find(0) == uf.find(1) != uf.find(2)
+
+
+def test_representative_prefers_torrent_id_then_rank():
+    records = [
+        MovieRecord("Alien 1979", rank=1),
+        MovieRecord("Alien 1979", imdb="tt0078748", rank=2),
+    ]
+    (group,) = resolve_entities(records)
+    assert group.representative.imdb == "tt0078748"
+    assert group.members[0].rank == 1
+
+
+def test_expand_groups_copies_result_to_members():
+    a = MovieRecord("Alien 1979", rank=1)
+    b = MovieRecord("Alien 1979", imdb="tt0078748", rank=2)
+    (group,) = resolve_entities([a, b])
+    result = MovieRecord.from_dict(group.representative.to_dict())
+    result.apply_omdb("8.5", "In space...", "http://img", "tt0078748", "Alien 1979", "89", fetched_at=123.0)
+
+    expanded = expand_groups([group], [result])
+    assert [r.rank for r in expanded] == [1, 2]
+    assert all(r.imdb_id == "tt0078748" and r.rating == "8.5" for r in expanded)
+    assert all(r.fetched_at == 123.0 for r in expanded)
@@ -0,0 +1,129 @@
+"""movie_api_service：凑满目标模式的在途窗口与按排名计入目标。"""
+import pytest
+
+import quota
+from movie_record import MovieRecord
+
+
+@pytest.fixture
+def mas(app_config, tmp_path, monkeypatch):
+    import movie_api_service
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(quota, "ledger", quota.QuotaLedger(str(tmp_path / "quota.json")))
+    return movie_api_service
+
+
+def _candidates(n, start=1):
+    return [MovieRecord(f"Movie {i} 2000", rank=i) for i in range(start, start + n)]
+
+
+def _fake_enrich(queried, fails=()):
+    """按排名记录查询顺序；fails 中的排名返回"评分过低"。"""
+    def enrich(movie):
+        queried.append(movie.rank)
+        if movie.rank in fails:
+            return None, "low", False
+        r = MovieRecord.from_dict(movie.to_dict())
+        r.apply_omdb("7.5", "plot", "http://img", f"tt{movie.rank:07d}", movie.name, "70", fetched_at=1.0)
+        return r, None, False
+    return enrich
+
+
+@pytest.mark.parametrize("need, passed, finished, workers, expected", [
+    (0, 0, 0, 4, 0),        # 已凑满：不再提交
+    (-3, 5, 5, 4, 0),
+    (1, 0, 0, 4, 2),        # 开局按一半通过率估计
+    (10, 0, 0, 4, 4),       # 不超过工作线程数
+    (2, 9, 9, 4, 3),        # 通过率高时只比还差的部数略多
+    (1, 0, 8, 4, 4),        # 连续失败后放宽窗口
+])
+def test_target_window(mas, need, passed, finished, workers, expected):
+    assert mas._target_window(need, passed, finished, workers) == expected
+
+
+def test_stops_submitting_once_target_reached(mas, monkeypatch):
+    queried = []
+    monkeypatch.setattr(mas, "enrich_one", _fake_enrich(queried))
+    results, _ = mas.fetch_imdb_info_batch(_candidates(50), target=5)
+
+    assert len(results) >= 5
+    assert queried == sorted(queried)
+    assert queried[:5] == [1, 2, 3, 4, 5]
+    assert len(queried) <= 5 + mas.CONFIG["max_workers"]
+
+
+def test_failures_are_replaced_by_next_ranked_candidates(mas, monkeypatch):
+    queried = []
+    monkeypatch.setattr(mas, "enrich_one", _fake_enrich(queried, fails={2, 4}))
+    results, failed = mas.fetch_imdb_info_batch(_candidates(50), target=5)
+
+    ranks = sorted(r.rank for r in results)
+    assert ranks[:5] == [1, 3, 5, 6, 7]
+    assert len(failed) == 2
+
+
+def _feed(n):
+    """apibay 榜单形状的输入：榜单名次与片名字母序相反。"""
+    return [{"name": f"{chr(ord('Z') - i)} Movie {2000 + i} 1080p", "imdb": None, "source": "apibay:207"}
+            for i in range(n)]
+
+
+def test_scraped_candidates_are_queried_in_feed_order(mas, monkeypatch):
+    import scraper
+    movies = scraper._dedup_movies(_feed(20))
+    assert movies[0].name.startswith("G ")            # 返回顺序按片名
+    queried = []
+    monkeypatch.setattr(mas, "enrich_one", _fake_enrich(queried))
+    results, _ = mas.fetch_imdb_info_batch(movies, target=3)
+
+    # 按榜单名次（Z、Y、X…）查询，而不是按片名从 G 开始
+    by_rank = sorted(results, key=lambda r: r.rank)
+    assert [r.name[0] for r in by_rank[:3]] == ["Z", "Y", "X"]
+    assert "G" not in {r.name[0] for r in results}
+
+
+def test_low_ranked_local_hits_do_not_count_early(mas, monkeypatch):
+    # 本地目录命中排在 500 名以后：不能让它们提前凑满目标，前面的候选仍要查询
+    local = []
+    for rec in _candidates(5, start=500):
+        rec.apply_omdb("8.0", "plot", "http://img", f"tt{rec.rank:07d}", rec.name, "80")
+        local.append(rec)
+    queried = []
+    monkeypatch.setattr(mas, "enrich_one", _fake_enrich(queried))
+    mas.fetch_imdb_info_batch(_candidates(100), target=5, have=local)
+
+    assert queried[:5] == [1, 2, 3, 4, 5]
+
+
+def test_top_ranked_local_hits_count_immediately(mas, monkeypatch):
+    local = []
+    for rec in _candidates(5, start=1):
+        rec.apply_omdb("8.0", "plot", "http://img", f"tt{rec.rank:07d}", rec.name, "80")
+        local.append(rec)
+    queried = []
+    monkeypatch.setattr(mas, "enrich_one", _fake_enrich(queried))
+    results, _ = mas.fetch_imdb_info_batch(_candidates(100, start=6), target=5, have=local)
+
+    assert queried == [] and results == []
+
+
+def _names_queried(queried, movies):
+    by_rank = {m.rank: m.name for m in movies}
+    return [by_rank[r][0] for r in queried]
+
+
+@pytest.mark.parametrize("queued", [False, True])
+def test_quota_pressure_queries_top_of_feed_first(mas, monkeypatch, tmp_path, queued):
+    import scraper
+    movies = scraper._dedup_movies(_feed(20))
+    quota.ledger.configure(2)                       # 两个 Key 共剩 4 次，远低于预计需求
+    monkeypatch.setitem(mas.CONFIG, "max_workers", 1)
+    queried = []
+    monkeypatch.setattr(mas, "enrich_one", _fake_enrich(queried))
+    if queued:
+        mas.fetch_imdb_info_queued(movies, str(tmp_path / "queue.sqlite"))
+    else:
+        mas.fetch_imdb_info_batch(movies)
+
+    # 额度紧张时先查榜单名次靠前的（Z、Y、X…），而不是片名靠前的
+    assert _names_queried(queried, movies)[:3] == ["Z", "Y", "X"]
@@ -0,0 +1,83 @@
+"""history_store：列式快照的追加、崩溃残留截断与趋势查询。"""
+import os
+import time
+
+import pytest
+
+from history_store import HistoryStore, Run
+from movie_record import MovieRecord
+
+DAY = 86400
+
+
+def _rec(imdb_id, rating="7.0", metascore="70", source="apibay", rank=0):
+    return MovieRecord(f"{imdb_id} 2000", imdb_id=imdb_id, rating=rating, metascore=metascore, source=source,
+                       rank=rank)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history"))
+
+
+def test_append_and_snapshot_roundtrip(store):
+    n = store.append([_rec("tt0111161", "9.3", "82"), MovieRecord("No Id 2000"),
+                      _rec("tt0068646", "N/A", "N/A", source="yts")], ts=100.0)
+    assert n == 2
+    (run,) = store.runs()
+    assert run == Run(100.0, 0, 2)
+
+    snap = store.snapshot(run)
+    shawshank, godfather = snap["tt0111161"], snap["tt0068646"]
+    assert (shawshank.rank, shawshank.rating, shawshank.metascore, shawshank.source) == (1, 9.3, 82, "apibay")
+    # 记录没有来源排名时用列表位置：没有 imdbID 的记录不入库但占位
+    assert (godfather.rank, godfather.rating, godfather.metascore, godfather.source) == (3, None, None, "yts")
+
+
+def test_rank_is_source_rank_not_list_position(store):
+    # 页面顺序按片名排过序，且前面有记录被去重/跳过：存的仍是来源排名
+    store.append([_rec("tt0000003", rank=17), MovieRecord("No Id 2000", rank=1),
+                  _rec("tt0000001", rank=2)], ts=100.0)
+    snap = store.snapshot(store.runs()[0])
+    assert snap["tt0000003"].rank == 17
+    assert snap["tt0000001"].rank == 2
+
+
+def test_empty_append_writes_nothing(store):
+    assert store.append([MovieRecord("No Id 2000")]) == 0
+    assert store.runs() == []
+
+
+def test_crash_leftovers_are_truncated_on_next_append(store):
+    store.append([_rec("tt0000001"), _rec("tt0000002")], ts=100.0)
+    # 模拟崩溃：列文件写了一半，索引记录只写了几个字节
+    for name in ("imdb", "rank", "rating", "metascore", "source"):
+        with open(os.path.join(store.path, f"{name}.col"), "ab") as f:
+            f.write(b"\x07" * 3)
+    with open(os.path.join(store.path, "runs.idx"), "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    assert len(store.runs()) == 1                  # 残缺的索引记录不算
+    assert set(store.snapshot(store.runs()[0])) == {"tt0000001", "tt0000002"}
+
+    store.append([_rec("tt0000003", "8.1")], ts=200.0)
+    runs = store.runs()
+    assert runs == [Run(100.0, 0, 2), Run(200.0, 2, 1)]
+    assert store.snapshot(runs[1])["tt0000003"].rating == 8.1
+    assert os.path.getsize(os.path.join(store.path, "imdb.col")) == 3 * 4
+
+
+def test_new_entries_and_rating_movers(store):
+    now = time.time()
+    store.append([_rec("tt0000001", "7.0"), _rec("tt0000002", "6.0")], ts=now - 10 * DAY)
+    store.append([_rec("tt0000001", "7.4"), _rec("tt0000003", "8.0")], ts=now - 3 * DAY)
+    store.append([_rec("tt0000003", "7.5"), _rec("tt0000001", "7.2"), _rec("tt0000004", "5.0")],
+                 ts=now - 1 * DAY)
+
+    new = [(e.imdb_id, ts) for e, ts in store.new_entries(days=7)]
+    assert new == [("tt0000003", now - 3 * DAY), ("tt0000004", now - 1 * DAY)]
+
+    movers = {e.imdb_id: delta for e, delta in store.rating_movers(days=7)}
+    # tt0000001 与窗口前最后一轮（7.0）相比；tt0000003 与首次出现（8.0）相比
+    assert movers == {"tt0000003": -0.5, "tt0000001": 0.2}
+    assert store.new_entries(days=0.5) == []
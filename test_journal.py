@@ -0,0 +1,78 @@
+"""journal：断点日志的追加、重放与截断行处理。"""
+import os
+import time
+
+import pytest
+
+import journal
+from journal import Journal
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "journal"))
+
+
+def test_replay_returns_last_value_per_key():
+    j = Journal("enrich")
+    j.append("A 2000", {"result": {"name": "A 2000"}})
+    j.append("B 2001", {"reason": "low"})
+    j.append("A 2000", {"result": {"name": "A 2000", "rating": "8.0"}})
+    j.close()
+
+    done = Journal("enrich").load()
+    assert done == {
+        "A 2000": {"result": {"name": "A 2000", "rating": "8.0"}},
+        "B 2001": {"reason": "low"},
+    }
+
+
+def test_truncated_tail_is_skipped():
+    j = Journal("translate")
+    j.append("k1", "一")
+    j.append("k2", "二")
+    j.close()
+    # 模拟写到一半崩溃：末行不完整
+    with open(j.path, "a", encoding="utf-8") as f:
+        f.write('{"k": "k3", "v": "三')
+
+    assert Journal("translate").load() == {"k1": "一", "k2": "二"}
+
+
+def test_appending_after_truncated_tail_keeps_new_entries():
+    j = Journal("translate")
+    j.append("k1", "一")
+    j.close()
+    with open(j.path, "a", encoding="utf-8") as f:
+        f.write('{"k": "k2", "v"')
+    # 续跑时继续追加：新行与残缺行粘在同一行，只丢这一条，之后的行照常恢复
+    j = Journal("translate")
+    j.append("k2", "二")
+    j.append("k3", "三")
+    j.close()
+
+    done = Journal("translate").load()
+    assert done["k1"] == "一" and done["k3"] == "三"
+
+
+def test_stale_journal_is_discarded():
+    j = Journal("enrich")
+    j.append("k", 1)
+    j.close()
+    old = time.time() - journal._MAX_AGE_SECONDS - 60
+    os.utime(j.path, (old, old))
+
+    assert Journal("enrich").load() == {}
+    assert not os.path.exists(j.path)
+
+
+def test_discard_removes_file_and_unregisters():
+    j = Journal("enrich")
+    j.append("k", 1)
+    assert j in journal._OPEN_JOURNALS
+    j.discard()
+
+    assert not os.path.exists(j.path)
+    assert j not in journal._OPEN_JOURNALS
+    assert Journal("enrich").load() == {}
@@ -0,0 +1,121 @@
+"""quota：降级档位的转换、跨进程记账与预计需求。"""
+import json
+
+import pytest
+
+import quota
+from quota import FULL, MINIMAL, NARROW, NO_AI, QuotaLedger
+
+KEYS = ["key-a"]
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(quota, "_today", lambda: "2026-01-01")
+    lg = QuotaLedger(str(tmp_path / "quota.json"))
+    lg.configure(100)
+    return lg
+
+
+@pytest.mark.parametrize("remaining, need, expected", [
+    (100, 0, FULL),
+    (100, 100, FULL),
+    (99, 100, NO_AI),
+    (59, 100, NARROW),
+    (29, 100, MINIMAL),
+    (0, 100, MINIMAL),
+])
+def test_level_for_thresholds(remaining, need, expected):
+    assert quota._level_for(remaining, need) == expected
+
+
+def test_unlimited_ledger_stays_full(tmp_path):
+    lg = QuotaLedger(str(tmp_path / "quota.json"))
+    assert lg.begin(10_000, KEYS) == FULL
+    assert lg.omdb_remaining(KEYS) is None
+    assert lg.level(KEYS) == FULL
+
+
+def test_level_degrades_as_quota_is_spent(ledger):
+    assert ledger.begin(80, KEYS) == FULL
+    ledger.record_omdb("key-a", 30)               # 剩 70 / 需 80
+    assert ledger.level(KEYS) == NO_AI
+    ledger.record_omdb("key-a", 30)               # 剩 40 / 需 80
+    assert ledger.level(KEYS) == NARROW
+    ledger.record_omdb("key-a", 20)               # 剩 20 / 需 80
+    assert ledger.level(KEYS) == MINIMAL
+
+
+def test_level_never_recovers_within_a_run(ledger):
+    ledger.begin(200, KEYS)
+    assert ledger.level(KEYS) == NARROW
+    ledger.finish(150)                             # 剩 100 / 需 50：比值够 FULL，但档位只升不降
+    assert ledger.level(KEYS) == NARROW
+
+
+def test_reforecast_replaces_need(ledger):
+    ledger.begin(1000, KEYS)
+    ledger.reforecast(90)
+    assert quota._level_for(ledger.omdb_remaining(KEYS), ledger._need) == FULL
+    ledger.reforecast(-5)
+    assert ledger._need == 0.0
+
+
+def test_mark_spent_exhausts_key(ledger):
+    ledger.record_omdb("key-a", 10)
+    ledger.mark_spent("key-a")
+    assert ledger.omdb_remaining(["key-a", "key-b"]) == 100
+
+
+def test_save_merges_deltas_from_other_processes(ledger, tmp_path):
+    other = QuotaLedger(ledger.path)
+    other.configure(100)
+    ledger.record_omdb("key-a", 5)
+    other.record_omdb("key-a", 7)
+    ledger.save()
+    other.save()
+
+    fresh = QuotaLedger(ledger.path)
+    fresh.configure(100)
+    assert fresh.omdb_remaining(KEYS) == 88
+
+
+def test_usage_resets_on_new_day(ledger, monkeypatch):
+    ledger.record_omdb("key-a", 40)
+    ledger.save()
+    monkeypatch.setattr(quota, "_today", lambda: "2026-01-02")
+    assert ledger.omdb_remaining(KEYS) == 100
+    with open(ledger.path, encoding="utf-8") as f:
+        assert json.load(f)["date"] == "2026-01-01"
+
+
+def test_llm_limits(ledger):
+    ledger.configure(100, llm_daily_requests=4, llm_daily_tokens=1000)
+    assert ledger.llm_plentiful()
+    ledger.record_llm(300)
+    ledger.record_llm(300)
+    assert ledger.llm_allows(tokens=400)
+    assert not ledger.llm_allows(tokens=401)
+    assert not ledger.llm_plentiful()              # token 只剩四成，不再花在 AI 兜底上
+    ledger.record_llm(0)
+    ledger.record_llm(0)
+    assert not ledger.llm_allows()
+
+
+def test_tokens_used_prefers_reported_usage():
+    assert quota.tokens_used({"usage": {"total_tokens": 42}}, 7) == 42
+    assert quota.tokens_used({"usageMetadata": {"totalTokenCount": 9}}, 7) == 9
+    assert quota.tokens_used({}, 7) == 7
+
+
+def test_expected_need_scales_with_pass_rate(app_config):
+    from movie_api_service import _expected_need
+    # 不设目标：全部未提交候选的成本
+    assert _expected_need(3000.0, 1000) == 3000.0
+    # 目标 20，开局通过率按一半估计：约 40 部 × 平均 3 次
+    assert _expected_need(3000.0, 1000, target=20) == 120.0
+    # 已计入 15 部、通过率 9/10 → 还需 ceil(5 / (10/12)) = 6 部，扣掉在途 2 部
+    assert _expected_need(3000.0, 1000, target=20, counted=15, passed=9, finished=10, in_flight=2) == 12.0
+    # 已凑满或候选不足
+    assert _expected_need(3000.0, 1000, target=20, counted=20) == 0.0
+    assert _expected_need(30.0, 10, target=20) == 30.0
@@ -0,0 +1,36 @@
+"""scraper：去重后的 rank 保持来源排名（与返回顺序无关）。"""
+import pytest
+
+# apibay 预编译榜单的形状：按榜单名次排列，同一部电影可能在多个榜单或多个种子中出现
+FEED_207 = [
+    {"name": "Zootopia 2 (2025) 1080p WEBRip", "imdb": "tt26443597", "source": "apibay:207"},
+    {"name": "Mickey 17 2025 1080p", "imdb": None, "source": "apibay:207"},
+    {"name": "Zootopia.2.2025.2160p", "imdb": "tt26443597", "source": "apibay:207"},
+    {"name": "Anora 2024 1080p BluRay", "imdb": "tt28607951", "source": "apibay:207"},
+]
+FEED_202 = [
+    {"name": "Mickey.17.2025.720p", "imdb": None, "source": "apibay:202"},
+    {"name": "Babygirl 2024 720p", "imdb": "tt21823606", "source": "apibay:202"},
+]
+
+
+@pytest.fixture
+def scraper(app_config):
+    import scraper
+    return scraper
+
+
+def test_rank_follows_feed_order_not_name(scraper):
+    movies = scraper._dedup_movies(FEED_207 + FEED_202)
+    # 返回顺序按片名排序，rank 仍是首次出现时的榜单名次
+    assert [m.name for m in movies] == ["Anora 2024", "Babygirl 2024", "Mickey 17 2025", "Zootopia 2 2025"]
+    assert {m.name: m.rank for m in movies} == {
+        "Zootopia 2 2025": 1, "Mickey 17 2025": 2, "Anora 2024": 3, "Babygirl 2024": 4,
+    }
+
+
+def test_unsorted_keeps_input_order(scraper):
+    movies = scraper._dedup_movies(FEED_207 + FEED_202, sort=False)
+    assert [(m.rank, m.name) for m in movies] == [
+        (1, "Zootopia 2 2025"), (2, "Mickey 17 2025"), (3, "Anora 2024"), (4, "Babygirl 2024"),
+    ]
@@ -0,0 +1,105 @@
+"""search_index：倒排索引的构建，以及与 template.js 的分词一致性。"""
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from movie_record import MovieRecord
+from search_index import build_index, index_json, tokenize
+
+TEMPLATE_JS = os.path.join(os.path.dirname(__file__), "ansible", "roles", "pmdb", "files", "output", "template.js")
+
+SAMPLES = [
+    "The Shawshank Redemption",
+    "肖申克的救赎",
+    "Ｆａｓｔ＆Ｆｕｒｉｏｕｓ　２",          # 全角字母数字
+    "千と千尋の神隠し Spirited Away 2001",
+    "기생충 Parasite",
+    "WALL·E — Über-Café déjà vu",
+    "Ocean's Eleven (2001) 十一罗汉",
+    "a_b c-d 3.14",
+    "單",
+]
+
+
+def test_tokenize_rules():
+    assert tokenize("肖申克的救赎") == ["肖申", "申克", "克的", "的救", "救赎", "赎"]
+    assert tokenize("Ｆａｓｔ＆Ｆｕｒｉｏｕｓ　２") == ["fast", "furious", "2"]
+    assert tokenize("Spirited Away千と千尋") == ["spirited", "away", "千と", "と千", "千尋", "尋"]
+    assert tokenize("") == []
+
+
+def test_build_index():
+    movies = [
+        MovieRecord("Alien 1979", rating="8.5", summary_cn="太空中的异形", summary_en="N/A"),
+        MovieRecord("Aliens 1986", rating="N/A"),
+    ]
+    index = build_index(movies)
+    assert index["year"] == [1979, 1986]
+    assert index["rating"] == [85, -1]
+    assert index["terms"] == sorted(index["terms"])
+    postings = dict(zip(index["terms"], index["postings"]))
+    assert postings["alien"] == [0] and postings["aliens"] == [1]
+    assert postings["1979"] == [0]
+    assert postings["异形"] == [0]
+    assert "n" not in postings and "a" not in postings
+
+
+def test_index_json_escapes_script_end():
+    movies = [MovieRecord("X 2000", summary_en="</script><b>")]
+    text = index_json(movies)
+    assert "<" not in text
+    assert json.loads(text) == build_index(movies)
+
+
+def _run_js(payload: dict) -> dict:
+    """在 node 里执行 template.js，取出闭包内的 tokenize() / search() 供测试调用。"""
+    script = r"""
+const fs = require('fs'), vm = require('vm');
+const payload = JSON.parse(fs.readFileSync(0, 'utf8'));
+let src = fs.readFileSync(payload.path, 'utf8');
+src = src.replace(/\}\)\(\);\s*$/, 'return {tokenize: tokenize, search: search};\n})();');
+const api = vm.runInNewContext(src, {document: {addEventListener: function () {}}});
+const out = {
+    tokens: payload.texts.map(function (t) { return api.tokenize(t); }),
+    hits: payload.queries.map(function (q) {
+        const r = api.search(payload.index, q);
+        return r === null ? null : Array.from(r).sort(function (a, b) { return a - b; });
+    }),
+};
+process.stdout.write(JSON.stringify(out));
+"""
+    proc = subprocess.run(["node", "-e", script], input=json.dumps({"path": TEMPLATE_JS, **payload}),
+                          capture_output=True, text=True, encoding="utf-8", check=True)
+    return json.loads(proc.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="需要 node 执行 template.js")
+def test_tokenizer_parity_with_template_js():
+    out = _run_js({"texts": SAMPLES, "queries": [], "index": {}})
+    for text, js_tokens in zip(SAMPLES, out["tokens"]):
+        py_tokens = tokenize(text)
+        # 查询端只切二元组（段尾单字不单独输出），其余与索引端完全一致
+        assert set(js_tokens) <= set(py_tokens), text
+        assert all(len(t) == 1 and not t.isascii() for t in set(py_tokens) - set(js_tokens)), text
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="需要 node 执行 template.js")
+def test_template_js_search_finds_indexed_cards():
+    movies = [MovieRecord(text, summary_en="N/A") for text in SAMPLES]
+    index = build_index(movies)
+    queries = ["shaw", "申克", "救", "ｆａｓｔ", "千尋", "기생", "über café", "罗汉 ocean", "單", "nothing", ""]
+    out = _run_js({"texts": [], "queries": queries, "index": index})
+    hits = dict(zip(queries, out["hits"]))
+    assert hits["shaw"] == [0]
+    assert hits["申克"] == [1] and hits["救"] == [1]
+    assert hits["ｆａｓｔ"] == [2]
+    assert hits["千尋"] == [3]
+    assert hits["기생"] == [4]
+    assert hits["über café"] == [5]
+    assert hits["罗汉 ocean"] == [6]
+    assert hits["單"] == [8]
+    assert hits["nothing"] == []
+    assert hits[""] is None
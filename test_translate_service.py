@@ -0,0 +1,50 @@
+"""translate_service：拆分重试的子请求同样受 LLM 每日额度约束。"""
+import pytest
+
+import quota
+
+
+@pytest.fixture
+def ts(app_config, tmp_path, monkeypatch):
+    import translate_service
+    monkeypatch.setattr(quota, "ledger", quota.QuotaLedger(str(tmp_path / "quota.json")))
+    return translate_service
+
+
+@pytest.fixture
+def mismatching(ts):
+    class Mismatching(ts.AbstractTranslator):
+        """多条的批次总是少返回一条（触发对半拆分），单条正常翻译；每次请求都记入 LLM 用量。"""
+        provider = "fake"
+        calls = 0
+
+        def _token_limits(self):
+            return 10_000, 10_000
+
+        def _translate_batch(self, texts):
+            self.calls += 1
+            quota.ledger.record_llm(10)
+            if len(texts) > 1:
+                return [f"译{t}" for t in texts[:-1]]
+            return [f"译{texts[0]}"]
+    return Mismatching()
+
+
+def test_bisect_sub_requests_respect_daily_request_limit(mismatching):
+    quota.ledger.configure(0, llm_daily_requests=4)
+    texts = [f"text {i}" for i in range(8)]
+    results = mismatching.translate_texts(texts, batch_size=8)
+
+    # 8 条 → 4+4 → 2+2… 不受限时要 15 次请求；额度只允许 4 次
+    assert mismatching.calls == 4
+    assert results[0] == "译text 0"
+    assert results[-1] == "text 7"                 # 额度用尽的部分保留英文原文
+
+
+def test_bisect_without_limit_translates_everything(mismatching):
+    quota.ledger.configure(0)
+    texts = [f"text {i}" for i in range(8)]
+    results = mismatching.translate_texts(texts, batch_size=8)
+
+    assert mismatching.calls == 15
+    assert results == [f"译{t}" for t in texts]
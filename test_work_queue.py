@@ -0,0 +1,109 @@
+"""work_queue：租约过期接手、迟到结果作废、可重试失败的退避。"""
+import pytest
+
+import work_queue
+from movie_record import MovieRecord
+from work_queue import DONE, FAILED, LEASED, MAX_ATTEMPTS, PENDING, WorkQueue
+
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(work_queue.time, "time", 1_000_000.0)
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    q = WorkQueue(str(tmp_path / "queue.sqlite"))
+    q.publish("run-1", [MovieRecord("A 2000", rank=1), MovieRecord("B 2001", rank=2)])
+    return q
+
+
+def _done(name):
+    return MovieRecord(name, imdb_id="tt0000001", rating="8.0")
+
+
+def test_claim_is_exclusive_until_lease_expires(queue, clock):
+    assert [m.name for m in queue.claim("w1", 10)] == ["A 2000", "B 2001"]
+    assert queue.claim("w2", 10) == []
+
+    clock.now += work_queue.LEASE_SECONDS + 1
+    assert [m.name for m in queue.claim("w2", 1)] == ["A 2000"]
+
+
+def test_heartbeat_keeps_lease(queue, clock):
+    queue.claim("w1", 10)
+    clock.now += work_queue.LEASE_SECONDS - 1
+    assert queue.heartbeat("w1") == 2
+    clock.now += work_queue.LEASE_SECONDS - 1
+    assert queue.claim("w2", 10) == []
+
+
+def test_late_result_after_takeover_is_discarded(queue, clock):
+    queue.claim("w1", 1)
+    clock.now += work_queue.LEASE_SECONDS + 1
+    queue.claim("w2", 1)
+
+    queue.complete("w1", "A 2000", _done("A 2000"), None, False)
+    assert queue.counts().get(DONE) is None
+    queue.complete("w2", "A 2000", _done("A 2000"), None, False)
+    assert queue.counts()[DONE] == 1
+
+
+def test_retryable_failure_backs_off_before_reclaim(queue, clock):
+    queue.claim("w1", 1)
+    queue.complete("w1", "A 2000", None, "circuit open", True)
+
+    # 同一个 worker 立即再认领：A 还在退避中，只能拿到 B
+    assert [m.name for m in queue.claim("w1", 10)] == ["B 2001"]
+    assert queue.next_retry_in() == pytest.approx(work_queue._RETRY_BACKOFF_SECONDS)
+
+    clock.now += work_queue._RETRY_BACKOFF_SECONDS
+    assert [m.name for m in queue.claim("w1", 10)] == ["A 2000"]
+    queue.complete("w1", "A 2000", None, "circuit open", True)
+    # 第二次失败后退避翻倍
+    assert queue.next_retry_in() == pytest.approx(work_queue._RETRY_BACKOFF_SECONDS * 2)
+
+
+def test_attempts_exhausted_marks_failed(queue, clock):
+    for attempt in range(MAX_ATTEMPTS):
+        clock.now += work_queue._RETRY_BACKOFF_SECONDS * 2 ** attempt
+        claimed = [m.name for m in queue.claim("w1", 1)]
+        assert claimed == ["A 2000"]
+        queue.complete("w1", "A 2000", None, "transient", True)
+
+    counts = queue.counts()
+    assert counts[FAILED] == 1 and counts[PENDING] == 1
+    assert queue.next_retry_in() is None
+
+
+def test_release_returns_items_immediately(queue):
+    queue.claim("w1", 10)
+    queue.release("w1")
+    assert queue.counts() == {PENDING: 2}
+    assert len(queue.claim("w2", 10)) == 2
+
+
+def test_republish_same_run_keeps_finished_items(queue):
+    queue.claim("w1", 1)
+    queue.complete("w1", "A 2000", _done("A 2000"), None, False)
+    remaining = queue.publish("run-1", [MovieRecord("A 2000"), MovieRecord("B 2001"), MovieRecord("C 2002")])
+    assert remaining == 2
+    results, failed, _ = queue.collect()
+    assert [r.name for r in results] == ["A 2000"]
+    assert len(failed) == 2
+
+    assert queue.publish("run-2", [MovieRecord("D 2003")]) == 1
+    assert queue.counts() == {PENDING: 1}
+
+
+def test_run_worker_waits_out_backoff(tmp_path, monkeypatch):
+    q = WorkQueue(str(tmp_path / "queue.sqlite"))
+    q.publish("run-1", [MovieRecord("A 2000")])
+    monkeypatch.setattr(work_queue, "_RETRY_BACKOFF_SECONDS", 0.05)
+    monkeypatch.setattr(work_queue, "_IDLE_POLL_SECONDS", 0.01)
+    outcomes = iter([(None, "transient", True), (_done("A 2000"), None, False)])
+
+    processed = work_queue.run_worker(q, lambda m: next(outcomes), concurrency=1, worker="w1")
+    assert processed == 2
+    assert q.counts() == {DONE: 1}
+    assert LEASED not in q.counts()